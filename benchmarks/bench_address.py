@@ -0,0 +1,123 @@
+"""
+西门子地址计算的正确性和性能测试
+用法：python -m benchmarks.bench_address [设备数量] [--check]
+
+1. 随机生成大量 字节.位 基址和偏移，与逐位进位的参考实现比对（覆盖位进位）
+2. 拼接地址为整数字节时，所有西门子模板的输出与原浮点实现完全一致
+3. 对比原浮点实现和整数位偏移实现的地址计算速度
+
+加 --check 时只做正确性检查，不测速度；任意检查不通过时返回非零退出码，可用于提交前检查
+"""
+import json
+import os
+import random
+import sys
+import time
+
+from benchmarks.bench_row_plan import BASE_DIR, best_of, legacy_rows_kingscdada, make_devices, make_inputs
+from src.core.address import AddressEngine, AddressError, parse_bit_address
+from src.core.csv_manager import CSVManager
+
+
+def reference_add(base, offset):
+    """参考实现：按十进制字符串逐位进位"""
+    base_byte, _, base_bit = base.partition(".")
+    offset_byte, _, offset_bit = offset.partition(".")
+    bit = int(base_bit or 0) + int(offset_bit or 0)
+    byte = int(base_byte) + int(offset_byte) + bit // 8
+    return f"{byte}.{bit % 8}"
+
+
+def check_random(count, seed=20240601):
+    """
+    随机地址与参考实现比对
+    Returns:
+        (比对的地址数, 不一致的说明列表)
+    """
+    failures = []
+    rng = random.Random(seed)
+    bases = [f"{rng.randrange(0, 65536)}.{rng.randrange(8)}" for _ in range(count)]
+    offsets = [f"{rng.randrange(0, 256)}.{rng.randrange(8)}" for _ in range(64)]
+    engine = AddressEngine("DB3.", [(True, offset) for offset in offsets])
+    for base, names in zip(bases, engine.batch(bases)):
+        expected = [f"DB3.{reference_add(base, offset)}" for offset in offsets]
+        if names != expected:
+            failures.append(f"{base}：{names[:4]} != {expected[:4]}")
+    #典型的进位场景
+    names = AddressEngine("DB3.", [(True, "0.1")]).item_names(parse_bit_address("0.7"))
+    if names != ["DB3.1.0"]:
+        failures.append(f"0.7 + 0.1：{names} != ['DB3.1.0']")
+    for bad in ("0.8", "1.x", "-1", "", "1e2"):
+        try:
+            parse_bit_address(bad)
+        except AddressError:
+            continue
+        failures.append(f"未检出错误地址：{bad!r}")
+    return count * len(offsets), failures
+
+
+def check_templates(devices):
+    """
+    整数字节拼接地址时与原实现的输出一致
+    Returns:
+        不一致的模板说明列表
+    """
+    failures = []
+    manager = CSVManager(BASE_DIR)
+    template_dir = os.path.join(BASE_DIR, "config_kingscada", "SIEMENS")
+    for template in sorted(os.listdir(template_dir)):
+        with open(os.path.join(template_dir, template), encoding='utf-8') as f:
+            template_data = json.load(f)
+        user_inputs = make_inputs("SIEMENS")
+        csv_data = make_devices("SIEMENS", devices)
+        manager.last_error = None
+        manager.rows_kingscdada(template_data, user_inputs, csv_data)
+        if manager.last_error:
+            failures.append(f"{template}：{manager.last_error}")
+        elif manager.rows != legacy_rows_kingscdada(template_data, user_inputs, csv_data):
+            failures.append(f"{template}：输出与原实现不一致")
+    return failures
+
+
+def legacy_item_names(prefix, bases, offsets):
+    """原实现：每行浮点相加并格式化"""
+    names = []
+    for base in bases:
+        base_offset = float(base)
+        for is_bit, offset in offsets:
+            if is_bit:
+                names.append(f"{prefix}{base_offset + float(offset):.1f}")
+            else:
+                names.append(f"{prefix}{int(base_offset) + int(offset)}")
+    return names
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--check"]
+    check_only = len(args) < len(sys.argv) - 1
+    devices = int(args[0]) if args else 100000
+    start = time.perf_counter()
+    checked, failures = check_random(devices)
+    print(f"随机位地址比对：{checked:,} 个地址，不一致 {len(failures)} 处（{time.perf_counter() - start:.2f} s）")
+    template_failures = check_templates(min(devices, 2000))
+    print(f"西门子模板输出与原实现比对：不一致 {len(template_failures)} 个模板")
+    failures += template_failures
+    for failure in failures[:20]:
+        print(f"  {failure}")
+    if failures:
+        sys.exit(1)
+    if check_only:
+        return
+
+    with open(os.path.join(BASE_DIR, "config_kingscada", "SIEMENS", "手动电机采集模板.json"), encoding='utf-8') as f:
+        offsets = [(tpl['type'] == "IODisc", tpl['address']) for tpl in json.load(f)]
+    bases = [str(i * 50) for i in range(devices)]
+    count = devices * len(offsets)
+    legacy_time, _ = best_of(lambda: legacy_item_names("DB3.", bases, offsets))
+    engine_time, _ = best_of(lambda: AddressEngine("DB3.", offsets).batch(bases))
+    print(f"{count:,} 个地址  原实现 {count / legacy_time:,.0f} 个/秒  "
+          f"整数位偏移 {count / engine_time:,.0f} 个/秒  加速 {legacy_time / engine_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
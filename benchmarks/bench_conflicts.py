@@ -0,0 +1,61 @@
+"""
+点表冲突检查的速度测试
+用法：python -m benchmarks.bench_conflicts [已有变量数]
+
+已有点表为模拟设备生成的 KingSCADA 点表，分别测试：
+首次载入（解析 CSV 并保存索引缓存）、再次载入（读取索引缓存）、
+一次普通规模生成（1 万行）的检查、与已有点表同样规模的检查，
+以及每次运行实际的耗时：再次载入加一次普通规模的检查
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_row_plan import BASE_DIR, make_devices, make_inputs
+from src.core.conflict_index import ConflictIndex
+from src.core.csv_manager import CSVManager
+
+#基准测试使用的编码，ANSI 只在 Windows 上可用
+ENCODING = 'gbk'
+
+
+def main():
+    tags = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    with open(os.path.join(BASE_DIR, "config_kingscada", "SIEMENS", "手动电机采集模板.json"), encoding='utf-8') as f:
+        template_data = json.load(f)
+    per_device = len(template_data)
+    with tempfile.TemporaryDirectory() as work_dir:
+        manager = CSVManager(work_dir)
+        manager.rows_kingscdada(template_data, make_inputs("SIEMENS"), make_devices("SIEMENS", tags // per_device))
+        manager.generate_output("existing", "existing", encoding=ENCODING)
+
+        existing = os.path.join(work_dir, "existing")
+        start = time.perf_counter()
+        count = ConflictIndex().load_path(existing)
+        print(f"首次载入已有点表 {count:,} 行：{time.perf_counter() - start:.2f} s")
+        start = time.perf_counter()
+        index = ConflictIndex()
+        index.load_path(existing)
+        load_time = time.perf_counter() - start
+        print(f"再次载入已有点表（索引缓存）：{load_time:.2f} s")
+
+        #新的一批设备：代号、TagID 不重复，同一个 DB 块中接在已有地址之后
+        first = tags // per_device
+        for devices in (10000 // per_device, tags // per_device):
+            csv_data = [{"设备代号": f"N{i:06d}", "设备描述": f"新设备{i}", "拼接地址": str((first + i) * 50)}
+                        for i in range(devices)]
+            inputs = dict(make_inputs("SIEMENS"), start_id=str(10000000))
+            manager.rows_kingscdada(template_data, inputs, csv_data)
+            start = time.perf_counter()
+            report = index.check(manager.headers, manager.rows)
+            check_time = time.perf_counter() - start
+            print(f"检查 {len(manager.rows):,} 行（已有 {len(index):,} 个变量）：{check_time:.3f} s  "
+                  f"{'无冲突' if not report else f'{len(report)} 处冲突'}")
+            if devices == 10000 // per_device:
+                print(f"载入索引缓存并检查 {len(manager.rows):,} 行：{load_time + check_time:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+预编码 CSV 写入与 csv 模块写入的速度对比
+用法：python -m benchmarks.bench_encoder [设备数量]
+
+两种方式都从行计划流式生成同一份点表（编码 ANSI，即 cp936），检查输出逐字节相同，输出行/秒和 MB/s
+"""
+import filecmp
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_row_plan import BASE_DIR, make_devices, make_inputs
+from src.core.csv_manager import CSVManager
+from src.core.row_plan import BEWGSEDPlan, KingSCADAPlan, iter_plan_rows
+
+#北控SED 参数
+SED_INPUTS = {"device": "SIEMENS", "channel": "通道1", "drive": "S7", "dev_name": "PLC1", "db_num": "3"}
+
+
+def newest_file(folder):
+    return max((os.path.join(folder, name) for name in os.listdir(folder)), key=os.path.getmtime)
+
+
+def run(manager, folder, rows):
+    start = time.perf_counter()
+    if not manager.generate_output(folder, "output", rows):
+        raise RuntimeError(manager.last_error)
+    elapsed = time.perf_counter() - start
+    return elapsed, newest_file(os.path.join(manager.base_dir, folder))
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    cases = [
+        ("KingSCADA", KingSCADAPlan, os.path.join("config_kingscada", "SIEMENS", "手动电机采集模板.json"),
+         make_inputs("SIEMENS")),
+        ("北控SED", BEWGSEDPlan, os.path.join("config_bewgsed", "SIEMENS", "电机上传模板.json"), SED_INPUTS),
+    ]
+    csv_data = make_devices("SIEMENS", devices)
+    with tempfile.TemporaryDirectory() as work_dir:
+        manager = CSVManager(work_dir)
+        for name, plan_class, template, inputs in cases:
+            with open(os.path.join(BASE_DIR, template), encoding='utf-8') as f:
+                plan = plan_class(json.load(f), inputs)
+            manager.headers = plan.headers
+            rows = len(plan) * devices
+            #普通迭代器走 csv 模块，PlanRows 走预编码写入
+            csv_time, csv_path = run(manager, f"{name}_csv", iter(iter_plan_rows(plan, csv_data)))
+            fast_time, fast_path = run(manager, f"{name}_encoded", iter_plan_rows(plan, csv_data))
+            size = os.path.getsize(fast_path) / 1024 / 1024
+            same = filecmp.cmp(csv_path, fast_path, shallow=False)
+            print(f"{name}  {rows:,} 行  {size:.1f} MB  {'一致' if same else '不一致'}")
+            for label, elapsed in (("csv 模块", csv_time), ("预编码", fast_time)):
+                print(f"  {label:<8} {rows / elapsed:>12,.0f} 行/秒  {size / elapsed:8.1f} MB/s  {elapsed:6.2f} s")
+            if not same:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+KingSCADA 与北控SED 点表合并生成的速度测试
+用法：python -m benchmarks.bench_fused [设备数量] [轮数]
+
+模拟设备写入 CSV 文件后，分别测试：两个目标各自重新读取和解析设备数据并生成（与界面两个页签分别生成相同），
+以及设备数据只读取一次、按块依次为两个目标生成。检查两种方式的输出逐字节相同。
+两种方式交替运行若干轮，各取最快的一轮，减少机器负载波动的影响
+"""
+import csv
+import filecmp
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_row_plan import BASE_DIR, make_devices, make_inputs
+from src.core.csv_manager import CSVManager
+from src.core.row_plan import BEWGSEDPlan, KingSCADAPlan, iter_plan_rows
+
+#基准测试使用的编码，ANSI 只在 Windows 上可用
+ENCODING = 'gbk'
+#默认运行轮数
+REPEAT = 3
+#北控SED 参数
+SED_INPUTS = {"device": "SIEMENS", "channel": "通道1", "drive": "S7", "dev_name": "PLC1", "db_num": "3"}
+
+
+def newest_file(folder):
+    return max((os.path.join(folder, name) for name in os.listdir(folder)), key=os.path.getmtime)
+
+
+def load_template(*parts):
+    with open(os.path.join(BASE_DIR, *parts), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else REPEAT
+    kingscada = KingSCADAPlan(load_template("config_kingscada", "SIEMENS", "手动电机采集模板.json"),
+                              make_inputs("SIEMENS"))
+    bewgsed = BEWGSEDPlan(load_template("config_bewgsed", "SIEMENS", "电机上传模板.json"), SED_INPUTS)
+    targets = (("kingscada", kingscada), ("bewgsed", bewgsed))
+    with tempfile.TemporaryDirectory() as work_dir:
+        csv_path = os.path.join(work_dir, "devices.csv")
+        with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=["设备代号", "设备描述", "拼接地址"])
+            writer.writeheader()
+            writer.writerows(make_devices("SIEMENS", devices))
+        manager = CSVManager(work_dir)
+        rows = devices * (len(kingscada) + len(bewgsed))
+
+        separate_time = fused_time = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for folder, plan in targets:
+                csv_data = manager.load_csv(csv_path)
+                manager.headers = plan.headers
+                manager.generate_output(f"separate_{folder}", "output", iter_plan_rows(plan, csv_data),
+                                        encoding=ENCODING)
+            separate_time = min(separate_time, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            csv_data = manager.load_csv(csv_path)
+            results = manager.generate_fused([(f"fused_{folder}", "output", plan, "csv") for folder, plan in targets],
+                                             csv_data, encoding=ENCODING)
+            fused_time = min(fused_time, time.perf_counter() - start)
+            if not results:
+                raise RuntimeError(manager.last_error)
+
+        same = all(filecmp.cmp(newest_file(os.path.join(work_dir, f"separate_{folder}")),
+                               newest_file(os.path.join(work_dir, f"fused_{folder}")), shallow=False)
+                   for folder, _ in targets)
+        print(f"{devices:,} 个设备，两个点表共 {rows:,} 行，{repeat} 轮取最快  {'一致' if same else '不一致'}")
+        for label, elapsed in (("分别生成", separate_time), ("合并生成", fused_time)):
+            print(f"  {label}  {elapsed:6.2f} s  {rows / elapsed:>12,.0f} 行/秒")
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+L5X 模板导入的速度和内存测试
+用法：python -m benchmarks.bench_l5x [UDT 数量] [标签数量]
+
+生成模拟的 L5X 导出文件（UDT 含 BOOL 位成员、数值成员、数组、嵌套 UDT 和 TIMER，
+后面是带数据的大量标签），分别测试首次导入、再次导入（全部未变化）和修改一个 UDT 后的导入，
+输出耗时，并单独测量解析过程的峰值内存
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.core.l5x_import import import_l5x, read_udts
+
+#每个标签的数据，模拟导出文件中占大部分体积的标签值
+TAG_DATA = "".join(f'<DataValueMember Name="V{i}" DataType="REAL" Radix="Float" Value="{i}.0"/>' for i in range(20))
+
+
+def udt_xml(i, desc="电机"):
+    bits = "".join(
+        f'<Member Name="C_{b}" DataType="BIT" Dimension="0" Radix="Decimal" Hidden="false" '
+        f'Target="ZZZZZZZZZZUDT_{i}0" BitNumber="{b}" ExternalAccess="Read/Write">'
+        f'<Description><![CDATA[按钮{b}]]></Description></Member>' for b in range(8))
+    return (
+        f'<DataType Name="UDT_{i}" Family="NoFamily" Class="User"><Description><![CDATA[{desc}{i}]]></Description>'
+        f'<Members><Member Name="ZZZZZZZZZZUDT_{i}0" DataType="SINT" Dimension="0" Radix="Decimal" Hidden="true" '
+        f'ExternalAccess="Read/Write"/>{bits}'
+        f'<Member Name="PV" DataType="REAL" Dimension="0" Radix="Float" Hidden="false" ExternalAccess="Read Only">'
+        f'<Description><![CDATA[测量值]]></Description></Member>'
+        f'<Member Name="SP" DataType="INT" Dimension="4" Radix="Decimal" Hidden="false" ExternalAccess="Read/Write">'
+        f'<Description><![CDATA[设定值]]></Description></Member>'
+        f'<Member Name="T" DataType="TIMER" Dimension="0" Radix="NullType" Hidden="false" ExternalAccess="Read/Write">'
+        f'<Description><![CDATA[延时]]></Description></Member>'
+        + (f'<Member Name="Sub" DataType="UDT_{i - 1}" Dimension="0" Radix="NullType" Hidden="false" '
+           f'ExternalAccess="Read Only"><Description><![CDATA[子设备]]></Description></Member>' if i % 10 else "")
+        + '</Members></DataType>'
+    )
+
+
+def make_l5x(path, udts, tags, changed=None):
+    """写入模拟的 L5X 文件，changed 为描述被修改的 UDT 序号"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<RSLogix5000Content SchemaRevision="1.0" SoftwareRevision="33.00" TargetName="PLC" '
+                'TargetType="Controller"><Controller Use="Target" Name="PLC"><DataTypes>')
+        for i in range(udts):
+            f.write(udt_xml(i, "修改" if i == changed else "电机"))
+        f.write('</DataTypes><Tags>')
+        for i in range(tags):
+            f.write(f'<Tag Name="TAG{i:06d}" TagType="Base" DataType="UDT_{i % udts}" ExternalAccess="Read/Write">'
+                    f'<Data Format="Decorated"><Structure DataType="UDT_{i % udts}">{TAG_DATA}</Structure></Data></Tag>')
+        f.write('</Tags></Controller></RSLogix5000Content>\n')
+
+
+def measure(label, base_dir, path):
+    start = time.perf_counter()
+    report = import_l5x(base_dir, path)
+    print(f"  {label:<8} {time.perf_counter() - start:6.2f} s  生成 {len(report.written)}  跳过 {len(report.unchanged)}")
+
+
+def measure_memory(path):
+    """解析过程的峰值内存，单独测量（tracemalloc 会显著拖慢解析）"""
+    tracemalloc.start()
+    udts = read_udts(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  解析 {len(udts)} 个 UDT 的峰值内存 {peak / 1024 / 1024:.1f} MB")
+
+
+def main():
+    udts = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    tags = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "project.L5X")
+        make_l5x(path, udts, tags)
+        print(f"{udts} 个 UDT，{tags:,} 个标签，文件 {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+        measure("首次导入", work_dir, path)
+        measure("再次导入", work_dir, path)
+        make_l5x(path, udts, tags, changed=udts // 2)
+        measure("修改一个", work_dir, path)
+        measure_memory(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+各输出格式的写入速度和文件大小对比
+用法：python -m benchmarks.bench_output [设备数量]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_row_plan import BASE_DIR, make_devices, make_inputs
+from src.core.csv_manager import CSVManager
+from src.core.output_writers import OUTPUT_FORMATS
+
+#基准测试使用的编码，ANSI 只在 Windows 上可用
+ENCODING = 'gbk'
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with open(os.path.join(BASE_DIR, "config_kingscada", "SIEMENS", "手动电机采集模板.json"), encoding='utf-8') as f:
+        template_data = json.load(f)
+    with tempfile.TemporaryDirectory() as work_dir:
+        manager = CSVManager(work_dir)
+        manager.rows_kingscdada(template_data, make_inputs("SIEMENS"), make_devices("SIEMENS", devices))
+        rows = len(manager.rows)
+        print(f"{rows:,} 行")
+        for output_format in OUTPUT_FORMATS:
+            start = time.perf_counter()
+            result = manager.generate_output("output", output_format.replace(".", "_"), manager.rows,
+                                             output_format=output_format, encoding=ENCODING)
+            elapsed = time.perf_counter() - start
+            if not result:
+                print(f"{output_format:<8} 失败：{manager.last_error}")
+                continue
+            path = max((os.path.join(work_dir, "output", name) for name in os.listdir(os.path.join(work_dir, "output"))),
+                       key=os.path.getmtime)
+            size = os.path.getsize(path) / 1024 / 1024
+            print(f"{output_format:<8} {rows / elapsed:>12,.0f} 行/秒  {elapsed:6.2f} s  文件 {size:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
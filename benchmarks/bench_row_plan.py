@@ -0,0 +1,132 @@
+"""
+KingSCADA 行计划性能对比
+用法：python -m benchmarks.bench_row_plan [设备数量]
+"""
+import json
+import os
+import sys
+import time
+
+from src.core.csv_manager import CSVManager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_rows_kingscdada(template_data, user_inputs, csv_data):
+    """改造前逐行判断、逐行插入固定数据的实现，仅用于对比"""
+    fixeddata1 = ["0","否","1000","0","0","0","是","否"]
+    fixeddata2 = ["不记录","0","60"]
+    fixeddata3 = ["0","0","","-1","1","0","0","0","0","0",""]
+    DataType_IODisc = ["","","","","","","",""]
+    DataType_IOShort = ["32767","-32767","32767","-32767","","无","否","0"]
+    DataType_IOFloat = ["1000000000","-1000000000","1000000000","-1000000000","","无","否","0"]
+    rows = []
+    count = 0
+    for device_row in csv_data:
+        code = device_row['设备代号']
+        desc = device_row['设备描述']
+        if user_inputs['device'] == "SIEMENS":
+            base_offset = float(device_row['拼接地址'])
+        else:
+            base_offset = device_row['拼接地址']
+        for tpl in template_data:
+            TagName = f"{code}{tpl['name']}"
+            Description = f"{desc}{tpl['desc']}"
+            if tpl['type'] =="IOFloat":
+                DataType = DataType_IOFloat
+                ItemDataType = "FLOAT"
+            elif tpl['type'] =="IOShort":
+                DataType = DataType_IOShort
+                ItemDataType = "SHORT"
+            else:
+                DataType = DataType_IODisc
+                ItemDataType = "BIT"
+            if user_inputs['link'] == "COM":
+                ChannelName = f"{user_inputs['link']}{user_inputs['link_com']}"
+            elif user_inputs['link'] == "以太网":
+                ChannelName = f"{user_inputs['link']}<{user_inputs['link_ip']}>"
+            else:
+                ChannelName = ""
+            if user_inputs['device'] == "SIEMENS":
+                if tpl['type'] == "IODisc":
+                    ItemName = f"DB{user_inputs['db_num']}.{base_offset + float(tpl['address']):.1f}"
+                else:
+                    ItemName = f"DB{user_inputs['db_num']}.{int(base_offset) + int(tpl['address'])}"
+                RegName = "DB"
+                RegType = "3"
+            elif user_inputs['device'] == "AB":
+                if tpl['address'] != "":
+                    ItemName = f"TAG{base_offset}.{tpl['address']}"
+                else:
+                    ItemName = ""
+                RegName = "TAG"
+                RegType = "0"
+            else:
+                ItemName = ""
+                RegName = ""
+                RegType = ""
+            if user_inputs['group_name_en'] == "启用":
+                group_name = f"{user_inputs['group_name']}.{code}"
+            else:
+                group_name = user_inputs['group_name']
+            row = [
+                int(user_inputs['start_id']) + count, TagName, Description, "用户变量", tpl['type'], "",
+                ChannelName, user_inputs['device_name'], user_inputs['channeldriver'], user_inputs['deviceseries'],
+                ItemName, RegName, RegType, ItemDataType, tpl['access'], group_name
+            ]
+            row[5:5]=DataType
+            row[18:18]=fixeddata1
+            row[31:31]=fixeddata2
+            row[35:35]=fixeddata3
+            rows.append(row)
+            count += 1
+    return rows
+
+
+def make_inputs(device):
+    return {
+        "start_id": "1001", "ip": "192.168.10.11", "device_name": "PLC1", "group_name": "TEST.一期",
+        "link": "以太网", "link_ip": "192.168.10.11", "link_com": "11",
+        "deviceseries": "S7-1500", "channeldriver": "S71500Tcp", "db_num": "3",
+        "device": device, "group_name_en": "启用",
+    }
+
+
+def make_devices(device, count):
+    if device == "SIEMENS":
+        return [{"设备代号": f"M{i:05d}", "设备描述": f"设备{i}", "拼接地址": str(i * 50)} for i in range(count)]
+    return [{"设备代号": f"M{i:05d}", "设备描述": f"设备{i}", "拼接地址": f"M{i:05d}"} for i in range(count)]
+
+
+def best_of(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    manager = CSVManager(BASE_DIR)
+    for device, template in (("SIEMENS", "手动电机采集模板.json"), ("SIEMENS", "普通仪表采集模板.json"),
+                             ("AB", "普通仪表采集模板.json")):
+        with open(os.path.join(BASE_DIR, "config_kingscada", device, template), encoding='utf-8') as f:
+            template_data = json.load(f)
+        user_inputs = make_inputs(device)
+        csv_data = make_devices(device, devices)
+
+        legacy_time, legacy_rows = best_of(lambda: legacy_rows_kingscdada(template_data, user_inputs, csv_data))
+        plan_time, _ = best_of(lambda: manager.rows_kingscdada(template_data, user_inputs, csv_data))
+        assert manager.rows == legacy_rows, f"{device}/{template} 输出与原实现不一致"
+
+        rows = len(legacy_rows)
+        print(f"{device}/{template}：{rows} 行  "
+              f"原实现 {rows / legacy_time:,.0f} 行/秒  行计划 {rows / plan_time:,.0f} 行/秒  "
+              f"加速 {legacy_time / plan_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
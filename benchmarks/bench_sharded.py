@@ -0,0 +1,61 @@
+"""
+多进程分片生成的速度和一致性测试
+用法：python -m benchmarks.bench_sharded [设备数量] [最大进程数]
+
+对 1、2、4 … 个进程分别分片生成同一份点表，检查输出文件与单进程生成逐字节相同，并输出加速比
+"""
+import filecmp
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_row_plan import BASE_DIR, make_devices, make_inputs
+from src.core.csv_manager import CSVManager
+from src.core.row_plan import KingSCADAPlan, iter_plan_rows
+
+#基准测试使用的编码，ANSI 只在 Windows 上可用
+ENCODING = 'gbk'
+
+
+def newest_file(folder):
+    return max((os.path.join(folder, name) for name in os.listdir(folder)), key=os.path.getmtime)
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    with open(os.path.join(BASE_DIR, "config_kingscada", "SIEMENS", "手动电机采集模板.json"), encoding='utf-8') as f:
+        template_data = json.load(f)
+    plan = KingSCADAPlan(template_data, make_inputs("SIEMENS"))
+    csv_data = make_devices("SIEMENS", devices)
+    with tempfile.TemporaryDirectory() as work_dir:
+        manager = CSVManager(work_dir)
+        manager.headers = plan.headers
+        start = time.perf_counter()
+        manager.generate_output("serial", "output", iter_plan_rows(plan, csv_data), encoding=ENCODING)
+        serial_time = time.perf_counter() - start
+        serial_path = newest_file(os.path.join(work_dir, "serial"))
+        rows = devices * len(plan)
+        print(f"{rows:,} 行  单进程 {serial_time:.2f} s")
+
+        workers = 1
+        while workers <= max_workers:
+            folder = f"workers_{workers}"
+            start = time.perf_counter()
+            result = manager.generate_sharded(folder, "output", plan, csv_data, workers, encoding=ENCODING)
+            elapsed = time.perf_counter() - start
+            if not result:
+                print(f"{workers} 个进程 失败：{manager.last_error}")
+                break
+            same = filecmp.cmp(serial_path, newest_file(os.path.join(work_dir, folder)), shallow=False)
+            print(f"{workers:>2} 个进程 {elapsed:6.2f} s  {rows / elapsed:>12,.0f} 行/秒  "
+                  f"加速 {serial_time / elapsed:.2f}x  {'一致' if same else '不一致'}")
+            if not same:
+                sys.exit(1)
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
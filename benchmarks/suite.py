@@ -0,0 +1,227 @@
+"""
+点表生成和批量语音的基准测试，完全离线运行
+每个用例在独立进程中执行，分别统计 CSV 读取、数据行生成、文件写入各阶段的耗时、行/秒和峰值内存，
+语音合成使用本地模拟服务，可设置响应延迟。结果保存为 JSON，可与其他版本的结果对比
+
+用法：
+    python -m benchmarks.suite                              #默认 10 / 1000 个设备
+    python -m benchmarks.suite --devices 10 1000 100000 --all-templates
+    python -m benchmarks.suite --tts 500 --latency 50
+    python -m benchmarks.suite --compare benchmarks/results/abc1234.json
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.csv_manager import CSVManager
+from src.core.jobs import TARGETS, make_user_inputs
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, "benchmarks", "results")
+#默认设备数量
+DEFAULT_DEVICES = (10, 1000)
+#模拟语音文件内容
+FAKE_WAV = b"RIFF\x24\x00\x00\x00WAVEfmt " + bytes(28)
+
+
+def peak_rss_mb():
+    """当前进程的峰值内存（MB），无法获取时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #macOS 单位为字节，Linux 为 KB
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def revision():
+    """当前代码版本，不是 git 仓库时返回 local"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "local"
+
+
+def make_devices(device, count):
+    """确定性的设备数据，西门子设备拼接地址按 50 字节递增，AB 设备为标签名"""
+    if device == "SIEMENS":
+        return [{"设备代号": f"M{i:06d}", "设备描述": f"{i % 97}号泵房{i}号设备", "拼接地址": str(i * 50)}
+                for i in range(count)]
+    return [{"设备代号": f"M{i:06d}", "设备描述": f"{i % 97}号泵房{i}号设备", "拼接地址": f"M{i:06d}"}
+            for i in range(count)]
+
+
+def write_devices(path, devices):
+    with open(path, 'w', encoding='gbk', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["设备代号", "设备描述", "拼接地址"])
+        writer.writerows([row["设备代号"], row["设备描述"], row["拼接地址"]] for row in devices)
+
+
+def list_cases(devices, all_templates):
+    """用例：(目标, 设备类型, 模板, 设备数量)，默认每种目标和设备类型只取第一个模板"""
+    cases = []
+    for target, (config, _) in TARGETS.items():
+        config_dir = os.path.join(BASE_DIR, config)
+        for device in sorted(os.listdir(config_dir)):
+            templates = sorted(name for name in os.listdir(os.path.join(config_dir, device)) if name.endswith(".json"))
+            for template in templates if all_templates else templates[:1]:
+                cases.extend((target, device, template, count) for count in devices)
+    return cases
+
+
+def run_case(target, device, template, count, work_dir):
+    """在独立进程中执行一个用例，返回各阶段耗时"""
+    config, _ = TARGETS[target]
+    with open(os.path.join(BASE_DIR, config, device, template), encoding='utf-8') as f:
+        template_data = json.load(f)
+    user_inputs = make_user_inputs(target, device)
+    csv_path = os.path.join(work_dir, f"{device}_{count}.csv")
+    write_devices(csv_path, make_devices(device, count))
+    manager = CSVManager(work_dir)
+    stages = {}
+
+    start = time.perf_counter()
+    csv_data = manager.load_csv(csv_path)
+    stages["load_csv"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if target == "kingscada":
+        manager.rows_kingscdada(template_data, user_inputs, csv_data)
+    else:
+        manager.rows_bewgsed(template_data, user_inputs)
+    stages["rows"] = time.perf_counter() - start
+    rows = len(manager.rows)
+
+    start = time.perf_counter()
+    output = manager.generate_output("output", f"{target}_{device}_{count}", manager.rows)
+    stages["generate_output"] = time.perf_counter() - start
+    manager.rows = []
+
+    #流式生成：数据行边生成边写入，与界面批量生成相同
+    start = time.perf_counter()
+    if target == "kingscada":
+        stream = manager.iter_rows_kingscdada(template_data, user_inputs, csv_data)
+    else:
+        stream = manager.iter_rows_bewgsed(template_data, user_inputs, csv_data)
+    manager.generate_output("output", f"{target}_{device}_{count}_stream", stream)
+    stages["streaming"] = time.perf_counter() - start
+
+    return {
+        "case": f"{target}/{device}/{template}/{count}",
+        "rows": rows,
+        "ok": output is not None,
+        "error": manager.last_error,
+        "stages": stages,
+        #CSV 读取按设备行数计，其余阶段按点表行数计
+        "rows_per_sec": {stage: (count if stage == "load_csv" else rows) / elapsed if elapsed > 0 else None
+                         for stage, elapsed in stages.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def fake_communicate(latency):
+    """本地模拟的语音合成类，接口与 edge_tts.Communicate 相同"""
+    class FakeCommunicate:
+        def __init__(self, text, voice, rate="+0%", pitch="+0Hz"):
+            self.text = text
+
+        async def save(self, path):
+            await asyncio.sleep(latency)
+            with open(path, 'wb') as f:
+                f.write(FAKE_WAV + self.text.encode('utf-8'))
+    return FakeCommunicate
+
+
+def run_tts_case(count, latency, work_dir):
+    """批量语音：先冷启动全部合成，再全部命中缓存"""
+    from src.core.edgetts_manager import EdgeTTSManager
+    #十分之一的文本重复，覆盖去重逻辑
+    unique = max(1, count - count // 10)
+    texts = [f"{i % unique}号泵故障" for i in range(count)]
+    manager = EdgeTTSManager(work_dir, communicate=fake_communicate(latency / 1000))
+    stages = {}
+    for stage in ("cold", "cached"):
+        start = time.perf_counter()
+        _, done = asyncio.run(manager.generate_batch(texts))
+        stages[stage] = time.perf_counter() - start
+    return {
+        "case": f"tts/{count}/{latency}ms",
+        "rows": done,
+        "ok": done == count,
+        "error": None,
+        "stages": stages,
+        "rows_per_sec": {stage: count / elapsed if elapsed > 0 else None for stage, elapsed in stages.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(func, *args):
+    """在新进程中执行，峰值内存只统计该用例"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(func, *args).result()
+
+
+def print_result(result, baseline=None):
+    rates = "  ".join(f"{stage} {rate:,.0f}/s" for stage, rate in result["rows_per_sec"].items() if rate)
+    peak = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] else "-"
+    line = f"{result['case']:<48} {result['rows']:>9} 行  {rates}  峰值内存 {peak}"
+    if not result["ok"]:
+        line += f"  失败：{result['error']}"
+    if baseline:
+        ratios = [f"{stage} {baseline['stages'][stage] / elapsed:.2f}x"
+                  for stage, elapsed in result["stages"].items() if elapsed > 0 and baseline["stages"].get(stage)]
+        line += "  对比：" + " ".join(ratios)
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description="点表生成和批量语音基准测试")
+    parser.add_argument("--devices", type=int, nargs="+", default=list(DEFAULT_DEVICES), help="设备数量")
+    parser.add_argument("--all-templates", action="store_true", help="测试所有模板，默认每种设备类型一个")
+    parser.add_argument("--tts", type=int, default=200, help="批量语音条数，0 表示不测试")
+    parser.add_argument("--latency", type=float, default=20, help="模拟语音服务响应延迟（毫秒）")
+    parser.add_argument("--save", help="结果文件，默认 benchmarks/results/<版本>.json")
+    parser.add_argument("--compare", help="用于对比的结果文件")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = {result["case"]: result for result in json.load(f)["results"]}
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for case in list_cases(args.devices, args.all_templates):
+            results.append(run_isolated(run_case, *case, work_dir))
+            print_result(results[-1], baseline.get(results[-1]["case"]))
+        if args.tts:
+            results.append(run_isolated(run_tts_case, args.tts, args.latency, work_dir))
+            print_result(results[-1], baseline.get(results[-1]["case"]))
+
+    rev = revision()
+    save_path = args.save or os.path.join(RESULTS_DIR, f"{rev}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+    with open(save_path, 'w', encoding='utf-8') as f:
+        json.dump({"revision": rev, "python": platform.python_version(), "platform": platform.platform(),
+                   "time": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存：{save_path}")
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
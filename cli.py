@@ -0,0 +1,241 @@
+"""
+SCADA Tools 命令行入口，不加载界面，可用于脚本和构建流程
+
+示例：
+    python cli.py kingscada --device SIEMENS --template 手动电机采集模板.json --csv input_data/SIEMENS.csv
+    python cli.py bewgsed --device SIEMENS --template 电机上传模板.json --csv input_data/SIEMENS.csv --db-num 5
+    python cli.py fused --device SIEMENS --csv input_data/SIEMENS.csv --target kingscada=手动电机采集模板.json \
+        --target bewgsed=电机上传模板.json --set bewgsed.db_num=5
+    python cli.py tts --csv input_data/TTS.csv
+    python cli.py run jobs.json
+    python cli.py build project.json --workers 4 --merge
+    python cli.py import-l5x Project.L5X
+"""
+import time
+_START = time.perf_counter()
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+from src.core.logger_config import get_base_dir, setup_logger
+from src.core.output_writers import OUTPUT_FORMATS
+
+logger = logging.getLogger(__name__)
+
+#命令行参数与 user_inputs 键名的对应关系
+KINGSCADA_OPTIONS = {
+    "start_id": "起始ID",
+    "device_name": "设备名称",
+    "group_name": "分组路径",
+    "link": "采集链路：以太网 / COM",
+    "link_ip": "IP地址",
+    "link_com": "串口号",
+    "deviceseries": "设备系列",
+    "channeldriver": "通道驱动",
+    "db_num": "DB块号",
+}
+BEWGSED_OPTIONS = {
+    "channel": "所属通道",
+    "dev_name": "所属设备",
+    "drive": "驱动",
+    "db_num": "DB块号",
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="SCADA Tools 命令行")
+    parser.add_argument("--base-dir", default=get_base_dir(), help="程序目录（模板和输出目录所在位置）")
+    parser.add_argument("--timing", action="store_true", help="输出启动和执行耗时")
+    parser.add_argument("--stats", metavar="JSON", help="统计各阶段耗时，结束时写入该文件")
+    parser.add_argument("--profile", metavar="PROF", help="开启 cProfile，结束时写入该文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for target, options, help_text in (("kingscada", KINGSCADA_OPTIONS, "KingSCADA 点表生成"),
+                                       ("bewgsed", BEWGSED_OPTIONS, "北控SED 上传点表生成")):
+        p = sub.add_parser(target, help=help_text)
+        p.add_argument("--device", required=True, help="设备类型，如 SIEMENS / AB")
+        p.add_argument("--template", required=True, help="模板文件名")
+        p.add_argument("--csv", required=True, help="设备数据 CSV")
+        for key, label in options.items():
+            p.add_argument("--" + key.replace("_", "-"), dest=key, help=label)
+        if target == "kingscada":
+            p.add_argument("--group-by-device", action="store_true", help="启用设备分组")
+            p.add_argument("--incremental", action="store_true", help="增量生成，已有变量沿用上一次的 TagID")
+            p.add_argument("--delta", action="store_true", help="增量生成时另外输出只包含新增和变化行的点表")
+        p.add_argument("--format", choices=OUTPUT_FORMATS, default="csv", help="输出格式")
+        p.add_argument("--encoding", help="CSV 文本编码，默认 ANSI")
+        p.add_argument("--workers", type=int, help="多进程分片生成的进程数（只支持 csv），默认单进程")
+        p.add_argument("--check-against", metavar="PATH", action="append", dest="conflicts",
+                       help="已有点表文件或目录，生成前检查变量名、TagID 和 DB 地址冲突（可重复）")
+
+    p = sub.add_parser("fused", help="设备数据只读取一次，同时生成多个目标的点表")
+    p.add_argument("--device", required=True, help="设备类型，如 SIEMENS / AB")
+    p.add_argument("--csv", required=True, help="设备数据 CSV")
+    p.add_argument("--target", required=True, action="append", dest="targets", metavar="TARGET=TEMPLATE",
+                   help="生成目标和模板文件名，如 kingscada=手动电机采集模板.json（可重复）")
+    p.add_argument("--set", action="append", dest="settings", default=[], metavar="TARGET.KEY=VALUE",
+                   help="目标参数，如 kingscada.start_id=2001、bewgsed.db_num=5（可重复）")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, default="csv", help="输出格式")
+    p.add_argument("--encoding", help="CSV 文本编码，默认 ANSI")
+    p.add_argument("--check-against", metavar="PATH", action="append", dest="conflicts",
+                   help="已有点表文件或目录，生成前检查变量名、TagID 和 DB 地址冲突（可重复）")
+
+    p = sub.add_parser("tts", help="批量文本转语音")
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument("--csv", help="语音文本 CSV（文本列）")
+    group.add_argument("--text", help="单条语音文本")
+    p.add_argument("--voice", help="语音名称")
+
+    p = sub.add_parser("run", help="执行任务文件中的所有任务")
+    p.add_argument("job_file", help='任务文件（JSON）：{"jobs": [{"target": ..., "device": ..., ...}]}')
+
+    p = sub.add_parser("import-l5x", help="从 Studio 5000 导出的 L5X 文件生成 AB 采集模板")
+    p.add_argument("l5x", help="L5X 文件")
+    p.add_argument("--udt", action="append", dest="udts", help="只导入指定的 UDT（可重复），默认全部")
+    p.add_argument("--force", action="store_true", help="全部重新生成，并覆盖同名的已有模板")
+    p.add_argument("--max-array", type=int, help="数组成员最多展开的元素个数，默认 64")
+
+    p = sub.add_parser("build", help="多进程执行工程清单，自动分配不重叠的 TagID")
+    p.add_argument("manifest", help='工程清单（JSON）：{"start_id": 1001, "merge": false, "jobs": [...]}')
+    p.add_argument("--workers", type=int, help="进程数，默认为 CPU 核数")
+    p.add_argument("--merge", action="store_true", default=None, help="同一目标的所有任务合并为一个点表")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, help="各任务默认的输出格式")
+    return parser
+
+
+def job_from_args(args):
+    """将命令行参数转换为任务"""
+    if args.command == "tts":
+        return {"target": "tts", "csv": args.csv, "text": args.text, "voice": args.voice}
+    if args.command == "fused":
+        return fused_job_from_args(args)
+    options = KINGSCADA_OPTIONS if args.command == "kingscada" else BEWGSED_OPTIONS
+    inputs = {key: getattr(args, key) for key in options if getattr(args, key) is not None}
+    if getattr(args, "group_by_device", False):
+        inputs["group_name_en"] = "启用"
+    job = {"target": args.command, "device": args.device, "template": args.template,
+           "csv": args.csv, "inputs": inputs, "format": args.format, "encoding": args.encoding,
+           "workers": args.workers, "conflicts": args.conflicts}
+    if getattr(args, "incremental", False) or getattr(args, "delta", False):
+        job["incremental"] = True
+        job["delta"] = args.delta
+    return job
+
+
+def fused_job_from_args(args):
+    """将 fused 命令的参数转换为多目标合并生成任务"""
+    targets = []
+    for value in args.targets:
+        target, sep, template = value.partition("=")
+        if not sep or not template:
+            raise SystemExit(f"--target 格式应为 TARGET=TEMPLATE：{value}")
+        targets.append({"target": target, "template": template, "inputs": {}})
+    for value in args.settings:
+        name, sep, setting = value.partition(".")
+        key, sep2, setting_value = setting.partition("=")
+        items = [item for item in targets if item["target"] == name]
+        if not sep or not sep2 or not key or not items:
+            raise SystemExit(f"--set 格式应为 TARGET.KEY=VALUE，且 TARGET 为已指定的目标：{value}")
+        for item in items:
+            item["inputs"][key] = setting_value
+    return {"target": "fused", "device": args.device, "csv": args.csv, "targets": targets,
+            "format": args.format, "encoding": args.encoding, "conflicts": args.conflicts}
+
+
+def load_job_file(job_file):
+    """读取任务文件，相对路径按任务文件所在目录处理"""
+    with open(job_file, 'r', encoding='utf-8') as f:
+        jobs = json.load(f)
+    if isinstance(jobs, dict):
+        jobs = jobs.get("jobs", [])
+    job_dir = os.path.dirname(os.path.abspath(job_file))
+    for job in jobs:
+        if job.get("csv"):
+            job["csv"] = os.path.join(job_dir, job["csv"])
+        if job.get("conflicts"):
+            paths = job["conflicts"]
+            if isinstance(paths, str):
+                paths = [paths]
+            job["conflicts"] = [os.path.join(job_dir, path) for path in paths]
+    return jobs
+
+
+def run_job(base_dir, job):
+    #按需导入，只生成点表时不加载语音相关模块
+    from src.core.jobs import run_generate_job, run_tts_job
+    if job.get("target") == "tts":
+        return run_tts_job(base_dir, job)
+    return run_generate_job(base_dir, job)
+
+
+def build(args):
+    """执行工程清单"""
+    from src.core.project_build import ProjectError, build_project, load_manifest
+    start = time.perf_counter()
+    try:
+        manifest = load_manifest(args.manifest)
+        if args.format:
+            manifest["format"] = args.format
+        results = build_project(args.base_dir, manifest, args.workers, args.merge)
+    except (ProjectError, OSError, ValueError) as e:
+        logger.error(f"工程生成失败：{e}")
+        return 1
+    for result in results:
+        print(result)
+    if args.timing:
+        logger.info(f"工程生成耗时：{time.perf_counter() - start:.2f} s")
+    return 0
+
+
+def import_l5x(args):
+    """从 L5X 文件生成模板"""
+    from src.core.l5x_import import MAX_ARRAY_ELEMENTS, L5XError, import_l5x
+    start = time.perf_counter()
+    try:
+        report = import_l5x(args.base_dir, args.l5x, args.udts, args.force, args.max_array or MAX_ARRAY_ELEMENTS)
+    except (L5XError, OSError) as e:
+        logger.error(f"L5X 导入失败：{e}")
+        return 1
+    print(report.summary())
+    if args.timing:
+        logger.info(f"L5X 导入耗时：{time.perf_counter() - start:.2f} s")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logger()
+    if args.stats or args.profile:
+        from src.core import instrument
+        instrument.enable(args.stats, args.profile)
+    if args.timing:
+        logger.info(f"命令行启动耗时：{(time.perf_counter() - _START) * 1000:.0f} ms")
+    if args.command == "build":
+        return build(args)
+    if args.command == "import-l5x":
+        return import_l5x(args)
+
+    jobs = load_job_file(args.job_file) if args.command == "run" else [job_from_args(args)]
+    from src.core.jobs import JobError
+    failed = 0
+    for job in jobs:
+        start = time.perf_counter()
+        try:
+            result = run_job(args.base_dir, job)
+        except (JobError, OSError, ValueError) as e:
+            failed += 1
+            logger.error(f"任务失败：{job.get('target')} {job.get('template', '')}：{e}")
+            continue
+        print(result)
+        if args.timing:
+            logger.info(f"任务耗时：{time.perf_counter() - start:.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,20 +1,19 @@
+import time
+_START = time.perf_counter()
+
 import sys
 import os
 import tkinter as tk
 
+from src.core import instrument
 from src.core.logger_config import setup_logger
 from src.ui.ui_main import MainUI
 
 if __name__ == "__main__":
     # 进行日志配置
     setup_logger()
-    # EdgeTTS 打包后 SSL 证书修复 
-    try:
-        import certifi
-        # 强制指定 SSL 证书位置（解决 401 Invalid response）
-        os.environ["SSL_CERT_FILE"] = certifi.where()
-    except Exception:
-        pass
+    # 设置了 SCADA_STATS / SCADA_PROFILE 环境变量时统计各阶段耗时
+    instrument.enable_from_env()
     # 判断是否是打包后的环境
     if getattr(sys, 'frozen', False):
         # 打包后的路径（exe所在的目录）
@@ -24,5 +23,5 @@ if __name__ == "__main__":
         base_dir = os.path.dirname(os.path.abspath(__file__))
     # 启动主界面
     root = tk.Tk()
-    app = MainUI(root,base_dir)
+    app = MainUI(root, base_dir, start_time=_START)
     root.mainloop()
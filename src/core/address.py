@@ -0,0 +1,78 @@
+"""
+西门子 DB 地址计算
+位地址 字节.位 统一换算成整数位偏移（字节 × 8 + 位）后相加，进位精确，
+不使用浮点运算：DB3.0.7 偏移 0.1 得到 DB3.1.0，而不是 DB3.0.8
+"""
+#每字节位数
+BITS_PER_BYTE = 8
+
+
+class AddressError(ValueError):
+    """设备数据中的拼接地址和设备类型不匹配"""
+
+
+def parse_bit_address(value):
+    """
+    将 字节.位 格式的地址转换为位偏移
+    模板中的地址可能是数字（JSON 中的 0.1、48.0）或字符串，位号必须为 0~7
+    Raises:
+        AddressError：地址格式错误
+    """
+    text = str(value).strip()
+    byte, sep, bit = text.partition(".")
+    if not byte.isdigit() or (sep and not bit.isdigit()):
+        raise AddressError(f"地址格式错误：{value}")
+    bit = int(bit) if bit else 0
+    if bit >= BITS_PER_BYTE:
+        raise AddressError(f"位号超出 0~7：{value}")
+    return int(byte) * BITS_PER_BYTE + bit
+
+
+def format_bit_address(bits):
+    """位偏移转换为 字节.位 格式"""
+    return f"{bits >> 3}.{bits & 7}"
+
+
+class AddressEngine:
+    """
+    一组模板地址的批量计算
+    模板地址只解析一次；每个设备只需一次整数加法和格式化即可得到全部 ItemName
+    """
+    def __init__(self, prefix, offsets):
+        """
+        Args:
+            prefix：地址前缀，如 DB3.
+            offsets：[(是否位地址, 模板地址)]，位地址为位偏移，字地址为字节偏移
+        """
+        self.prefix = prefix
+        self.offsets = [(is_bit, parse_bit_address(address) if is_bit else parse_bit_address(address) >> 3)
+                        for is_bit, address in offsets]
+        #拼接地址为整字节时位号不会进位，预先拆成 (字节偏移, 位号后缀)，每个地址只需一次整数加法
+        self.byte_suffixes = [(offset >> 3, f".{offset & 7}") if is_bit else (offset, "")
+                              for is_bit, offset in self.offsets]
+
+    def item_names(self, base_bits):
+        """
+        一个设备的全部地址
+        Args:
+            base_bits：设备拼接地址的位偏移（parse_bit_address 的结果）
+        """
+        prefix = self.prefix
+        base_byte = base_bits >> 3
+        if not base_bits & 7:
+            return [f"{prefix}{base_byte + offset}{suffix}" for offset, suffix in self.byte_suffixes]
+        return [f"{prefix}{(base_bits + offset) >> 3}.{(base_bits + offset) & 7}" if is_bit
+                else f"{prefix}{base_byte + offset}"
+                for is_bit, offset in self.offsets]
+
+    def batch(self, bases):
+        """
+        批量计算多个设备的地址
+        Args:
+            bases：各设备拼接地址（字符串或数字）
+        Returns:
+            每个设备一组地址
+        Raises:
+            AddressError：拼接地址格式错误
+        """
+        return [self.item_names(parse_bit_address(base)) for base in bases]
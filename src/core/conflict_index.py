@@ -0,0 +1,382 @@
+"""
+点表冲突检查
+把已有点表（本程序生成的和从 IOServer 导出的）载入索引：变量名和 TagID 放入哈希集合，
+KingSCADA 西门子地址按（通道, 设备, DB 块）建立占用区间的有序索引。
+新生成的数据行与索引以及自身比对，找出重复的变量名、TagID 和重叠的 DB 地址，
+集合查询 O(1)，区间查询 O(log n)，整体接近线性。
+解析 CSV 是载入的主要耗时，每个点表建好的索引保存在点表目录的 .state/conflicts 下，
+点表未修改（大小和修改时间不变）时直接读取，不再重新解析
+"""
+import csv
+import marshal
+import os
+import re
+from bisect import bisect_left
+from collections import Counter
+from itertools import islice
+
+from src.core.csv_loader import LOAD_CHUNK_SIZE, detect_encoding
+from src.core.tag_state import STATE_DIR
+
+import logging
+logger = logging.getLogger(__name__)
+
+#KingSCADA 变量类型占用的位数，位变量按位地址占 1 位
+TYPE_BITS = {
+    "IODisc": 1,
+    "IOChar": 8,
+    "IOByte": 8,
+    "IOShort": 16,
+    "IOUShort": 16,
+    "IOLong": 32,
+    "IOULong": 32,
+    "IOFloat": 32,
+    "IODouble": 64,
+}
+#未知变量类型按字处理
+DEFAULT_TYPE_BITS = 16
+#西门子 DB 地址：DB块号.字节[.位]
+_DB_ADDRESS = re.compile(r"DB(\d+)\.(\d+)(?:\.([0-7]))?").fullmatch
+#冲突报告中每类最多列出的条数
+REPORT_LIMIT = 20
+#点表索引缓存的子目录和格式版本，索引结构变化时递增版本
+INDEX_CACHE_DIR = "conflicts"
+INDEX_CACHE_VERSION = 1
+
+#各点表中需要检查的列：(变量名, TagID, 变量类型, 通道, 设备, 采集地址)
+KINGSCADA_COLUMNS = ("TagName", "TagID", "TagDataType", "ChannelName", "DeviceName", "ItemName")
+BEWGSED_COLUMNS = ("点名", None, None, None, None, None)
+
+
+def table_columns(headers):
+    """
+    根据表头确定各检查列的序号，不是支持的点表时返回 None
+    导出的点表缺少地址相关的列时不检查地址（采集地址列为 None）
+    """
+    index = {name: i for i, name in enumerate(headers)}
+    if KINGSCADA_COLUMNS[0] in index:
+        names = KINGSCADA_COLUMNS
+    elif BEWGSED_COLUMNS[0] in index:
+        names = BEWGSED_COLUMNS
+    else:
+        return None
+    columns = [index.get(name) if name else None for name in names]
+    if None in columns[2:]:
+        columns[5] = None
+    return tuple(columns)
+
+
+def item_interval(item_name, data_type):
+    """
+    西门子 DB 地址占用的位区间
+    Args:
+        item_name：ItemName，如 DB3.48.1（位）、DB3.50（字）
+        data_type：TagDataType，决定字地址占用的长度
+    Returns:
+        (DB 块号, 起始位, 结束位)，不是 DB 地址时返回 None
+    """
+    match = _DB_ADDRESS(item_name) if item_name else None
+    if match is None:
+        return None
+    db, byte, bit = match.groups()
+    if bit is not None:
+        start = int(byte) * 8 + int(bit)
+        return db, start, start + 1
+    start = int(byte) * 8
+    return db, start, start + TYPE_BITS.get(data_type, DEFAULT_TYPE_BITS)
+
+
+class ConflictReport:
+    """
+    一次检查的冲突结果
+    各列表元素为 (新变量名, 冲突对象, 说明)
+    """
+    def __init__(self):
+        self.names = []
+        self.tag_ids = []
+        self.addresses = []
+
+    def __bool__(self):
+        return bool(self.names or self.tag_ids or self.addresses)
+
+    def __len__(self):
+        return len(self.names) + len(self.tag_ids) + len(self.addresses)
+
+    def summary(self, limit=REPORT_LIMIT):
+        """冲突报告文本，每类最多列出 limit 条"""
+        if not self:
+            return "未发现冲突"
+        lines = [f"发现 {len(self)} 处冲突：变量名重复 {len(self.names)}，"
+                 f"TagID 重复 {len(self.tag_ids)}，地址重叠 {len(self.addresses)}"]
+        for title, items in (("变量名重复", self.names), ("TagID 重复", self.tag_ids), ("地址重叠", self.addresses)):
+            for name, other, note in items[:limit]:
+                other = "" if other == name else f" 与 {other}"
+                lines.append(f"  {title}：{name}{other}（{note}）")
+            if len(items) > limit:
+                lines.append(f"  {title}：其余 {len(items) - limit} 处省略")
+        return "\n".join(lines)
+
+
+class ConflictIndex:
+    """
+    已有点表的冲突索引
+    用法：
+        index = ConflictIndex()
+        index.load_path("output_kingscada")      #目录下所有点表，或单个 CSV 文件
+        report = index.check(KINGSCADA_HEADERS, rows)
+    """
+    def __init__(self, use_cache=True):
+        """
+        Args:
+            use_cache：载入点表时是否读取和保存索引缓存
+        """
+        self.use_cache = use_cache
+        self.names = set()
+        self.tag_ids = set()
+        self.tables = 0
+        #(通道, 设备, DB 块号) -> [每个点表的有序区间]
+        #有序区间：(起始位列表, 前缀最大结束位列表, 前缀最大结束位对应的变量名列表)
+        self._intervals = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    # ---------------- 载入 ----------------
+    def add_rows(self, headers, rows):
+        """
+        将一个点表的数据行加入索引
+        Returns:
+            加入的行数，不是支持的点表时返回 0
+        """
+        columns = table_columns(headers)
+        if columns is None:
+            return 0
+        table = _new_table()
+        _collect_rows(table, columns, rows if isinstance(rows, list) else list(rows))
+        self._add_table(_finish_table(table))
+        return table["rows"]
+
+    def _add_table(self, table):
+        """合并一个点表的索引，各点表的区间分别保存，不需要重新排序"""
+        self.names.update(table["names"])
+        self.tag_ids.update(table["tag_ids"])
+        for key, intervals in table["intervals"].items():
+            self._intervals.setdefault(key, []).append(intervals)
+
+    def load_table(self, path):
+        """
+        载入一个点表 CSV（编码自动识别），点表未修改时读取索引缓存
+        Returns:
+            载入的行数
+        """
+        stat = os.stat(path)
+        signature = [INDEX_CACHE_VERSION, stat.st_size, stat.st_mtime_ns]
+        cache_path = index_cache_path(path)
+        table = _load_cache(cache_path, signature) if self.use_cache else None
+        if table is None:
+            encoding = detect_encoding(path)
+            try:
+                table = _read_table(path, encoding)
+            except UnicodeDecodeError:
+                if encoding == 'gbk':
+                    raise
+                #文件头是纯 ASCII 而后面出现 GBK 字符时才会走到这里
+                logger.info(f"按 UTF-8 解码失败，改用 GBK 读取：{path}")
+                table = _read_table(path, 'gbk')
+            if table is None:
+                logger.warning(f"不是支持的点表，已跳过：{path}")
+                return 0
+            if self.use_cache:
+                _save_cache(cache_path, signature, table)
+        self._add_table(table)
+        self.tables += 1
+        logger.info(f"冲突索引已载入点表：{path}（{table['rows']} 行）")
+        return table["rows"]
+
+    def load_path(self, path):
+        """
+        载入单个点表文件，或目录下的所有 .csv 点表（不含子目录和未完成的临时文件）
+        Returns:
+            载入的总行数
+        """
+        if not os.path.isdir(path):
+            return self.load_table(path)
+        count = 0
+        for name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, name)
+            if name.endswith(".csv") and os.path.isfile(file_path):
+                count += self.load_table(file_path)
+        return count
+
+    # ---------------- 检查 ----------------
+    def check(self, headers, rows):
+        """
+        检查新生成的数据行与索引及自身是否冲突，不修改索引
+        Args:
+            headers：点表表头
+            rows：数据行列表
+        Returns:
+            ConflictReport
+        """
+        report = ConflictReport()
+        columns = table_columns(headers)
+        if columns is None:
+            return report
+        col_name, col_id, col_type, col_channel, col_device, col_item = columns
+        rows = rows if isinstance(rows, list) else list(rows)
+
+        #变量名：与已有点表比对用集合交集，自身重复用计数
+        names = [row[col_name] for row in rows]
+        for name in sorted(self.names.intersection(names)):
+            report.names.append((name, name, "已有点表中存在"))
+        if len(set(names)) != len(names):
+            for name, count in Counter(names).items():
+                if count > 1:
+                    report.names.append((name, name, f"本次生成中出现 {count} 次"))
+
+        if col_id is not None:
+            tag_ids = _tag_ids(rows, col_id)
+            existing = self.tag_ids.intersection(tag_ids)
+            if existing:
+                report.tag_ids.extend((name, tag_id, "已有点表中已使用")
+                                      for name, tag_id in zip(names, tag_ids) if tag_id in existing)
+            if len(set(tag_ids)) != len(tag_ids):
+                for tag_id, count in Counter(tag_ids).items():
+                    if count > 1:
+                        report.tag_ids.append((tag_id, tag_id, f"本次生成中出现 {count} 次"))
+
+        if col_item is not None:
+            new_intervals = {}
+            for row, name in zip(rows, names):
+                interval = item_interval(row[col_item], row[col_type])
+                if interval is not None:
+                    key = (row[col_channel], row[col_device], interval[0])
+                    new_intervals.setdefault(key, []).append((interval[1], interval[2], name))
+            for key, intervals in new_intervals.items():
+                self._check_intervals(key, intervals, report)
+        return report
+
+    def _check_intervals(self, key, intervals, report):
+        """一个（通道, 设备, DB 块）内的区间检查"""
+        channel, device, db = key
+        where = f"{channel}/{device}/DB{db}"
+        #与已有点表比对：起始位小于新区间结束位的已有区间中，最大结束位大于新区间起始位即重叠
+        for starts, max_ends, owners in self._intervals.get(key, ()):
+            for start, end, name in intervals:
+                i = bisect_left(starts, end) - 1
+                if i >= 0 and max_ends[i] > start and owners[i] != name:
+                    report.addresses.append((name, owners[i], f"{where} 与已有点表重叠"))
+        #自身比对：按起始位排序后与前面结束位最大的区间比较
+        intervals.sort()
+        max_end, owner = -1, None
+        for start, end, name in intervals:
+            if start < max_end:
+                report.addresses.append((name, owner, f"{where} 本次生成中重叠"))
+            if end > max_end:
+                max_end, owner = end, name
+
+
+def index_cache_path(path):
+    """点表索引缓存的路径：点表目录/.state/conflicts/点表文件名.idx"""
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, STATE_DIR, INDEX_CACHE_DIR, f"{name}.idx")
+
+
+def _new_table():
+    """一个点表的索引：行数、变量名、TagID 和各（通道, 设备, DB 块）的区间"""
+    return {"rows": 0, "names": [], "tag_ids": [], "intervals": {}}
+
+
+def _collect_rows(table, columns, rows):
+    """将数据行加入点表索引，区间在 _finish_table 中排序"""
+    col_name, col_id, col_type, col_channel, col_device, col_item = columns
+    table["rows"] += len(rows)
+    table["names"].extend(row[col_name] for row in rows)
+    if col_id is not None:
+        table["tag_ids"].extend(_tag_ids(rows, col_id))
+    if col_item is not None:
+        intervals = table["intervals"]
+        for row in rows:
+            interval = item_interval(row[col_item], row[col_type])
+            if interval is not None:
+                key = (row[col_channel], row[col_device], interval[0])
+                intervals.setdefault(key, []).append((interval[1], interval[2], row[col_name]))
+
+
+def _finish_table(table):
+    """区间按起始位排序并计算前缀最大结束位，检查时不再排序"""
+    for key, intervals in table["intervals"].items():
+        intervals.sort()
+        starts, max_ends, owners = [], [], []
+        max_end, owner = -1, None
+        for start, end, name in intervals:
+            if end > max_end:
+                max_end, owner = end, name
+            starts.append(start)
+            max_ends.append(max_end)
+            owners.append(owner)
+        table["intervals"][key] = (starts, max_ends, owners)
+    return table
+
+
+def _read_table(path, encoding):
+    """
+    解析点表 CSV 并建立索引
+    Returns:
+        点表索引，不是支持的点表时返回 None
+    """
+    table = _new_table()
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        reader = csv.reader(f)
+        headers = next(reader, None)
+        columns = table_columns(headers) if headers else None
+        if columns is None:
+            return None
+        #只需要几列，直接使用 csv.reader 的列表，列数不足的行跳过
+        width = max(col for col in columns if col is not None) + 1
+        while True:
+            chunk = list(islice(reader, LOAD_CHUNK_SIZE))
+            if not chunk:
+                break
+            _collect_rows(table, columns, [row for row in chunk if len(row) >= width])
+    return _finish_table(table)
+
+
+def _load_cache(cache_path, signature):
+    """读取索引缓存，缓存不存在、损坏或与点表不一致时返回 None"""
+    try:
+        #整个文件读入后一次解析，marshal.load 直接读文件对象慢得多
+        with open(cache_path, 'rb') as f:
+            cached_signature, table = marshal.loads(f.read())
+        return table if cached_signature == signature else None
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        logger.warning(f"索引缓存无效，重新解析点表：{cache_path}：{e}")
+        return None
+
+
+def _save_cache(cache_path, signature, table):
+    """写入临时文件后替换，点表目录不可写时只记录日志"""
+    temp_path = cache_path + ".part"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            f.write(marshal.dumps((signature, table)))
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        logger.info(f"无法保存索引缓存：{cache_path}：{e}")
+
+
+def _tag_ids(rows, col_id):
+    """TagID 列转换为整数，已有点表中读出的是字符串，无法转换的保留原值"""
+    tag_ids = []
+    for row in rows:
+        tag_id = row[col_id]
+        if tag_id.__class__ is not int:
+            try:
+                tag_id = int(tag_id)
+            except (TypeError, ValueError):
+                pass
+        tag_ids.append(tag_id)
+    return tag_ids
@@ -0,0 +1,184 @@
+import codecs
+import csv
+import logging
+
+logger = logging.getLogger(__name__)
+
+#编码识别时读取的文件头字节数
+SNIFF_SIZE = 64 * 1024
+#每次读取的行数，每读完一块回调一次进度
+LOAD_CHUNK_SIZE = 10000
+#单个 CSV 文件允许加载的最大行数
+MAX_CSV_ROWS = 2000000
+
+
+class CSVRow(tuple):
+    """
+    紧凑的 CSV 数据行
+    数据按列保存在元组中，通过表头索引支持 row['列名'] 和 row.get('列名') 访问，
+    不需要为每一行创建字典
+    """
+    __slots__ = ()
+    _header = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        if i is None:
+            return default
+        return tuple.__getitem__(self, i)
+
+    def keys(self):
+        return self._header
+
+    def __reduce__(self):
+        return (_rebuild_row, (self._header, tuple(self)))
+
+
+_row_types = {}
+
+def row_type(header):
+    """获取某个表头对应的数据行类型，相同表头共用一个类型"""
+    header = tuple(header)
+    cls = _row_types.get(header)
+    if cls is None:
+        index = {name: i for i, name in enumerate(header)}
+        cls = type("CSVRow", (CSVRow,), {"__slots__": (), "_header": header, "_index": index})
+        _row_types[header] = cls
+    return cls
+
+def _rebuild_row(header, values):
+    """CSVRow 反序列化（多进程传递数据时使用）"""
+    return row_type(header)(values)
+
+
+def detect_encoding(filepath, sniff_size=SNIFF_SIZE):
+    """
+    只读取文件头的一段字节判断编码
+    带 BOM 或能按 UTF-8 解码时返回 utf-8-sig，否则按 gbk 处理
+    """
+    with open(filepath, 'rb') as f:
+        head = f.read(sniff_size)
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        #final=False 允许末尾被截断的多字节字符
+        decoder.decode(head, final=False)
+    except UnicodeDecodeError:
+        return 'gbk'
+    return 'utf-8-sig'
+
+
+def iter_csv_chunks(filepath, encoding, chunk_size=LOAD_CHUNK_SIZE, max_rows=MAX_CSV_ROWS):
+    """
+    分块读取 CSV 文件，第一行为表头
+    Args:
+        filepath：文件路径
+        encoding：文件编码
+        chunk_size：每块的行数
+        max_rows：最多读取的数据行数，超出部分不读取
+    Yields:
+        CSVRow 列表
+    """
+    with open(filepath, 'r', encoding=encoding, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        make_row = row_type(header)
+        width = len(header)
+        padding = (None,) * width
+        chunk = []
+        count = 0
+        for values in reader:
+            if not values:
+                continue    #跳过空行，与 DictReader 一致
+            if count == max_rows:
+                logger.warning(f"CSV 行数超过上限 {max_rows}，多余的行未加载：{filepath}")
+                break
+            if len(values) != width:
+                values = (values + list(padding))[:width]   #缺少的列补 None，多余的列丢弃
+            chunk.append(make_row(values))
+            count += 1
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def count_csv_rows(filepath, max_rows=MAX_CSV_ROWS):
+    """
+    统计 CSV 文件的数据行数（不含表头和空行），结果与 read_csv 读取的行数一致
+    按字节逐行计数，不解码也不创建数据行；出现引号（字段中可能含有换行）或单独的 \\r 换行
+    （按 \\n 分行时数不出来）时改用 csv.reader 计数
+    """
+    count = 0
+    with open(filepath, 'rb') as f:
+        header = f.readline()
+        if header == b"":
+            return 0
+        if _needs_reader(header):
+            return _count_rows_quoted(filepath, max_rows)
+        for line in f:
+            if _needs_reader(line):
+                return _count_rows_quoted(filepath, max_rows)
+            if line.strip(b"\r\n"):
+                count += 1
+    return min(count, max_rows)
+
+def _needs_reader(line):
+    """该行是否需要 csv.reader 才能正确分行：含引号，或含有不属于 \\r\\n 的 \\r"""
+    return b'"' in line or (b"\r" in line and line.count(b"\r") != line.count(b"\r\n"))
+
+def _count_rows_quoted(filepath, max_rows):
+    encoding = detect_encoding(filepath)
+    try:
+        return _count_reader_rows(filepath, encoding, max_rows)
+    except UnicodeDecodeError:
+        if encoding == 'gbk':
+            raise
+        return _count_reader_rows(filepath, 'gbk', max_rows)
+
+def _count_reader_rows(filepath, encoding, max_rows):
+    with open(filepath, 'r', encoding=encoding, newline='') as f:
+        reader = csv.reader(f)
+        if next(reader, None) is None:
+            return 0
+        return min(sum(1 for values in reader if values), max_rows)
+
+
+def read_csv(filepath, chunk_size=LOAD_CHUNK_SIZE, max_rows=MAX_CSV_ROWS, progress=None):
+    """
+    识别编码后分块读取整个 CSV 文件
+    Args:
+        filepath：文件路径
+        chunk_size：每块的行数
+        max_rows：最多读取的数据行数
+        progress：进度回调，参数为已读取的行数
+    Returns:
+        CSVRow 列表
+    """
+    encoding = detect_encoding(filepath)
+    try:
+        return _read_all(filepath, encoding, chunk_size, max_rows, progress)
+    except UnicodeDecodeError:
+        if encoding == 'gbk':
+            raise
+        #文件头是纯 ASCII 而后面出现 GBK 字符时才会走到这里
+        logger.info(f"按 UTF-8 解码失败，改用 GBK 读取：{filepath}")
+        return _read_all(filepath, 'gbk', chunk_size, max_rows, progress)
+
+def _read_all(filepath, encoding, chunk_size, max_rows, progress):
+    rows = []
+    for chunk in iter_csv_chunks(filepath, encoding, chunk_size, max_rows):
+        rows.extend(chunk)
+        if progress:
+            progress(len(rows))
+    return rows
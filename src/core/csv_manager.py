@@ -1,11 +1,93 @@
-import csv
 import os
+import shutil
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
-from tkinter import messagebox
+from itertools import islice
+
+from src.core import instrument
+from src.core.conflict_index import ConflictIndex
+from src.core.csv_loader import MAX_CSV_ROWS, read_csv
+from src.core.logger_config import worker_logging
+from src.core.output_writers import CSVOutput, EncodedCSVOutput, byte_safe, get_output, resolve_encoding
+from src.core.row_plan import (
+    AddressError, BEWGSED_HEADERS, BEWGSEDPlan, KINGSCADA_HEADERS, KingSCADAPlan, PlanEncoder, PlanRows,
+    iter_plan_rows
+)
+from src.core.tag_state import IncrementalRun, TagState, state_path
 
 logger = logging.getLogger(__name__)
 
+#流式写入时每次写入的行数
+WRITE_CHUNK_SIZE = 5000
+#合并分段文件时的复制缓冲区大小
+COPY_BUFFER_SIZE = 1024 * 1024
+#分片生成时每个进程分到的分片数，分片多一些各进程的负载更均衡
+SHARDS_PER_WORKER = 4
+#每个分片的最少设备数，设备太少时不分片
+SHARD_MIN_DEVICES = 1000
+
+class GenerationCancelled(Exception):
+    """点表生成被用户取消"""
+
+
+def shard_ranges(count, shards):
+    """
+    将 count 个设备按顺序分成 shards 个连续区间，各区间长度最多相差 1
+    Returns:
+        [(起始序号, 结束序号)]
+    """
+    size, extra = divmod(count, shards)
+    ranges = []
+    start = 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def row_chunks(rows, chunk_size):
+    """将数据行迭代器按块切分，Yields (数据行列表, 行数)"""
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk, len(chunk)
+
+
+def plan_encoder(rows, output_class, encoding):
+    """
+    能否使用预编码写入：行计划生成的数据行、CSV 格式、编码可以按字节拼接
+    Returns:
+        PlanEncoder，不能使用时返回 None
+    """
+    if not isinstance(rows, PlanRows):
+        return None
+    return encoder_for_plan(rows.plan, output_class, encoding)
+
+
+def encoder_for_plan(plan, output_class, encoding):
+    """行计划按 output_class 和 encoding 输出时使用的 PlanEncoder，不能预编码时返回 None"""
+    if output_class is not CSVOutput:
+        return None
+    try:
+        encoding = resolve_encoding(encoding)
+    except LookupError:
+        return None
+    if not byte_safe(encoding):
+        return None
+    return PlanEncoder(plan, encoding)
+
+
+def _write_shard(plan, csv_data, start_id, part_path, encoding):
+    """在工作进程中生成一个分片并写入分段文件，返回行数"""
+    return CSVManager(os.path.dirname(part_path)).write_part(
+        part_path, iter_plan_rows(plan, csv_data, start_id), encoding=encoding
+    )
+
+
 class CSVManager:
     """
     负责 CSV 文件的读取、数据存储、拼接和输出
@@ -13,17 +95,25 @@ class CSVManager:
     def __init__(self, base_dir):
         self.base_dir = base_dir
         self.csv_data = []
+        self.headers = []
+        self.rows = []
+        self.last_error = None
+        #设置后 rows_kingscdada / rows_bewgsed 生成的数据行与已有点表做冲突检查，结果保存在 conflict_report
+        self.conflict_index = None
+        self.conflict_report = None
 
-    def load_csv(self, filepath):
-        """自动识别编码读取 CSV 文件"""
-        try:
-            with open(filepath, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                self.csv_data = list(reader)
-        except UnicodeDecodeError:
-            with open(filepath, 'r', encoding='gbk') as f:
-                reader = csv.DictReader(f)
-                self.csv_data = list(reader)
+    def load_csv(self, filepath, max_rows=MAX_CSV_ROWS, progress=None):
+        """
+        自动识别编码读取 CSV 文件
+        编码只根据文件头判断一次，数据分块读取并以紧凑的 CSVRow 保存
+        Args:
+            filepath：文件路径
+            max_rows：最多读取的数据行数
+            progress：进度回调，参数为已读取的行数
+        """
+        with instrument.timer("csv.load"):
+            self.csv_data = read_csv(filepath, max_rows=max_rows, progress=progress)
+        instrument.count("csv.rows", len(self.csv_data))
 
         if not self.csv_data:
             logger.warning(f"CSV 文件为空或格式错误：{filepath}")
@@ -31,239 +121,471 @@ class CSVManager:
             logger.info(f"成功加载 CSV：{filepath}，共 {len(self.csv_data)} 行")
         return self.csv_data
 
-    def generate_output(self, folder, file_name):
+    def generate_output(self, folder, file_name, rows=None, chunk_size=WRITE_CHUNK_SIZE,
+                        progress=None, cancel_event=None, output_format="csv", encoding=None):
         """
-        根据headers和rows生成新的 CSV 文件
+        根据headers和rows生成新的点表文件，数据分块写入，内存占用不随行数增长
+        可在后台线程中调用：失败原因保存在 last_error 中，不弹出对话框
         Args:
             folder:文件夹名称
             file_name:文件名称
+            rows:任意可迭代的数据行（可以是生成器），不填时使用 self.rows
+            chunk_size:每次写入的行数
+            progress:进度回调，参数为已写入的行数
+            cancel_event:threading.Event，置位后停止写入并删除未完成的文件
+            output_format:输出格式，见 output_writers.OUTPUT_FORMATS
+            encoding:文本编码，默认 OUTPUT_ENCODING
+        Returns:
+            成功信息，失败或取消时返回 None
         """
-        if  not self.headers or not self.rows:
+        with instrument.timer("output.generate"):
+            return self._generate_output(folder, file_name, rows, chunk_size, progress, cancel_event,
+                                         output_format, encoding)
+
+    def _generate_output(self, folder, file_name, rows, chunk_size, progress, cancel_event, output_format, encoding):
+        self.last_error = None
+        try:
+            output_class = get_output(output_format)
+        except ValueError as e:
+            logger.warning(str(e))
+            self.last_error = str(e)
+            return
+        if rows is None:
+            rows = self.rows
+        encoder = plan_encoder(rows, output_class, encoding)
+        if encoder is not None:
+            #行计划生成的 CSV：固定列已预先编码，直接写入字节
+            output_class = EncodedCSVOutput
+            first_rows = [self.headers] if self.headers and len(rows) else None
+            chunks = encoder.iter_chunks(rows, chunk_size)
+            count = 0
+        else:
+            rows = iter(rows)
+            try:
+                with instrument.timer("rows.build"):
+                    first_row = next(rows, None) if self.headers else None
+            except AddressError as e:
+                logger.warning(f"加载的文件中拼接地址和设备类型不匹配：{e}")
+                self.last_error = "加载的文件中拼接地址和设备类型不匹配"
+                return
+            first_rows = [self.headers, first_row] if first_row is not None else None
+            chunks = row_chunks(rows, chunk_size)
+            count = 1
+        if first_rows is None:
             logger.warning(f"数据为空，不生成文件")
+            self.last_error = "数据为空，不生成文件"
+            return
+        output_path = self.output_path(folder, file_name, output_class.extension)
+        #先写入临时文件，全部写完后再改名，避免中途出错或取消时留下不完整的点表
+        temp_path = output_path + ".part"
+        try:
+            with output_class(temp_path, encoding, os.path.basename(output_path)) as writer:
+                writer.write_rows(first_rows)
+                write = writer.write_rows if encoder is None else writer.write_bytes
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise GenerationCancelled()
+                    #流式生成时数据行在取出时才生成，分别统计生成和写入的耗时
+                    with instrument.timer("rows.build"):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    data, size = chunk
+                    with instrument.timer("output.write"):
+                        write(data)
+                    count += size
+                    if progress:
+                        progress(count)
+            os.replace(temp_path, output_path)
+        except GenerationCancelled:
+            os.remove(temp_path)
+            logger.info(f"已取消生成点表文件：{output_path}（已写入 {count} 行）")
+            return
+        except AddressError as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            logger.warning(f"加载的文件中拼接地址和设备类型不匹配：{e}")
+            self.last_error = "加载的文件中拼接地址和设备类型不匹配"
             return
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            logger.warning(f"写入文件失败：{e}")
+            self.last_error = f"写入文件失败：{e}"
+            return
+        instrument.count("output.rows", count)
+        logger.info(f"成功生成点表文件：{output_path}（共 {count} 行）")
+        output = f"成功生成点表文件：{output_path}（共 {count} 行）"
+        
+        return output
+
+    def output_path(self, folder, file_name, extension=".csv"):
+        """
+        带时间戳的输出文件路径，并确保输出目录存在
+        """
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S") #获取当前时间
-        output_filename = f"{file_name}_{timestamp}.csv"    #输出文件名
+        output_filename = f"{file_name}_{timestamp}{extension}"    #输出文件名
         output_path = os.path.join(self.base_dir, folder, output_filename)    #输出文件路径
         os.makedirs(os.path.dirname(output_path), exist_ok=True)    #确保输出目录存在
-        #写入输出文件
+        return output_path
+
+    def write_part(self, part_path, rows, chunk_size=WRITE_CHUNK_SIZE, encoding=None):
+        """
+        将数据行（不含表头）写入分段文件，供 merge_parts 合并
+        Returns:
+            写入的行数
+        """
+        count = 0
+        encoder = plan_encoder(rows, CSVOutput, encoding)
+        if encoder is not None:
+            output = EncodedCSVOutput(part_path, encoding)
+            chunks = encoder.iter_chunks(rows, chunk_size)
+        else:
+            output = CSVOutput(part_path, encoding)
+            chunks = row_chunks(iter(rows), chunk_size)
+        with output:
+            write = output.write_rows if encoder is None else output.write_bytes
+            while True:
+                with instrument.timer("rows.build"):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                with instrument.timer("output.write"):
+                    write(chunk[0])
+                count += chunk[1]
+        instrument.count("output.rows", count)
+        return count
+
+    def merge_parts(self, folder, file_name, headers, part_paths, count, encoding=None):
+        """
+        按顺序拼接分段文件，生成带表头的点表文件，拼接完成后删除分段文件
+        Args:
+            count：各分段文件的总行数，用于输出信息
+            encoding：表头的文本编码，须与分段文件一致
+        Returns:
+            成功信息，失败时返回 None，原因保存在 last_error 中
+        """
+        self.last_error = None
+        output_path = self.output_path(folder, file_name)
+        temp_path = output_path + ".part"
         try:
-            with open(output_path, 'w', newline='', encoding='ANSI') as f:
-                writer = csv.writer(f)
-                writer.writerow(self.headers)
-                writer.writerows(self.rows)
+            with CSVOutput(temp_path, encoding) as output:
+                output.write_rows([headers])
+            with open(temp_path, 'ab') as out:
+                for part_path in part_paths:
+                    with open(part_path, 'rb') as part:
+                        shutil.copyfileobj(part, out, COPY_BUFFER_SIZE)
+            os.replace(temp_path, output_path)
         except Exception as e:
-                logger.warning(f"写入文件失败：{e}")
-                messagebox.showwarning("警告", "写入文件失败")
-                return
-        logger.info(f"成功生成点表文件：{output_path}（共 {len(self.rows)} 行）")
-        output = f"成功生成点表文件：{output_path}（共 {len(self.rows)} 行）"
-        
-        return output
-    
-    def rows_kingscdada(self, template_data, user_inputs, csv_data):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            logger.warning(f"合并文件失败：{e}")
+            self.last_error = f"合并文件失败：{e}"
+            return
+        for part_path in part_paths:
+            os.remove(part_path)
+        logger.info(f"成功生成点表文件：{output_path}（共 {count} 行）")
+        return f"成功生成点表文件：{output_path}（共 {count} 行）"
+
+    def generate_sharded(self, folder, file_name, plan, csv_data, workers=None, progress=None, encoding=None):
         """
-        根据传入数据进行处理，并将数据写入headers和rows存储
+        多进程分片生成 CSV 点表，输出文件与单进程生成逐字节相同
+        设备数据按顺序切分为连续的分片，每个分片的起始 TagID 预先算出（起始ID + 模板行数 × 分片第一个设备的序号），
+        各进程把分片写入分段文件，全部完成后按顺序拼接
         Args:
-            template_data：读取的模板数据
-            user_inputs：用户设定的数据
+            plan：KingSCADAPlan 或 BEWGSEDPlan
+            csv_data：设备数据
+            workers：进程数，默认为 CPU 核数
+            progress：进度回调，参数为已完成分片的总行数
+            encoding：文本编码，默认 OUTPUT_ENCODING
+        Returns:
+            成功信息，失败时返回 None，原因保存在 last_error 中
         """
-        #表头
-        self.headers = ["TagID", "TagName", "Description", "TagType", "TagDataType",
-                   "MaxRawValue", "MinRawValue", "MaxValue", "MinValue", "NonLinearTableName",
-                   "ConvertType", "IsFilter", "DeadBand", "Unit", "ChannelName",
-                   "DeviceName", "ChannelDriver", "DeviceSeries", "DeviceSeriesType", "CollectControl",
-                   "CollectInterval", "CollectOffset", "TimeZoneBias", "TimeAdjustment", "Enable",
-                   "ForceWrite", "ItemName", "RegName", "RegType", "ItemDataType",	
-                   "ItemAccessMode", "HisRecordMode", "HisDeadBand", "HisInterval", "TagGroup",
-                   "NamespaceIndex", "IdentifierType", "Identifier", "ValueRank", "QueueSize",
-                   "DiscardOldest", "MonitoringMode", "TriggerMode", "DeadType", "DeadValue",	
-                   "UANodePath"
-        ]
-        #固定数据
-        fixeddata1 = ["0","否","1000","0","0","0","是","否"]
-        fixeddata2 = ["不记录","0","60"]
-        fixeddata3 = ["0","0","","-1","1","0","0","0","0","0",""]
-        #依据数据类型变化数据
-        DataType_IODisc = ["","","","","","","",""]
-        DataType_IOShort = ["32767","-32767","32767","-32767","","无","否","0"]
-        DataType_IOFloat = ["1000000000","-1000000000","1000000000","-1000000000","","无","否","0"]
+        self.last_error = None
+        self.headers = plan.headers
+        workers = workers or os.cpu_count() or 1
+        shards = min(workers * SHARDS_PER_WORKER, len(csv_data) // SHARD_MIN_DEVICES)
+        if workers < 2 or shards < 2:
+            return self.generate_output(folder, file_name, iter_plan_rows(plan, csv_data),
+                                        progress=progress, encoding=encoding)
 
-        self.rows = []
+        part_dir = os.path.join(self.base_dir, folder)
+        os.makedirs(part_dir, exist_ok=True)
+        part_paths = [os.path.join(part_dir, f".{file_name}.{os.getpid()}.{i}.part") for i in range(shards)]
         count = 0
-        for device_row in csv_data:
-            code = device_row['设备代号']
-            desc = device_row['设备描述']
-            #拼接地址处理
-            try:
-                if user_inputs['device'] == "SIEMENS":
-                    base_offset = float(device_row['拼接地址'])
-                    
-                else:
-                    base_offset = device_row['拼接地址']
-            except Exception as e:
-                logger.warning(f"加载的文件中拼接地址和设备类型不匹配：{e}")
-                messagebox.showwarning("警告", "加载的文件中拼接地址和设备类型不匹配")
-                return
-            #每个设备遍历模板数据
-            for tpl in template_data:
-                TagName = f"{code}{tpl['name']}"    #点名拼接
-                Description = f"{desc}{tpl['desc']}"    #描述拼接   
-                #数据类型相关数据处理      
-                if tpl['type'] =="IOFloat":
-                    DataType = DataType_IOFloat
-                    ItemDataType = "FLOAT"
-                elif tpl['type'] =="IOShort":
-                    DataType = DataType_IOShort
-                    ItemDataType = "SHORT"
-                else:
-                    DataType = DataType_IODisc
-                    ItemDataType = "BIT"
-                #链路相关数据处理
-                if user_inputs['link'] == "COM":
-                    ChannelName = f"{user_inputs['link']}{user_inputs['link_com']}"
-                elif user_inputs['link'] == "以太网":
-                    ChannelName = f"{user_inputs['link']}<{user_inputs['link_ip']}>"
-                else:
-                    ChannelName = ""
-                #设备类型相关数据处理，主要是采集地址拼接
-                if user_inputs['device'] == "SIEMENS":
-                    if tpl['type'] == "IODisc":
-                        ItemName = f"DB{user_inputs['db_num']}.{base_offset + float(tpl['address']):.1f}"
+        with worker_logging() as (initializer, initargs):
+            with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+                try:
+                    futures = [
+                        pool.submit(_write_shard, plan, csv_data[start:end], plan.start_id + start * len(plan),
+                                    part_path, encoding)
+                        for (start, end), part_path in zip(shard_ranges(len(csv_data), shards), part_paths)
+                    ]
+                    for future in futures:
+                        count += future.result()
+                        if progress:
+                            progress(count)
+                except Exception as e:
+                    pool.shutdown(cancel_futures=True)
+                    for part_path in part_paths:
+                        if os.path.exists(part_path):
+                            os.remove(part_path)
+                    if isinstance(e, AddressError):
+                        logger.warning(f"加载的文件中拼接地址和设备类型不匹配：{e}")
+                        self.last_error = "加载的文件中拼接地址和设备类型不匹配"
                     else:
-                        ItemName = f"DB{user_inputs['db_num']}.{int(base_offset) + int(tpl['address'])}"
-                    RegName = "DB"
-                    RegType = "3"
-                elif user_inputs['device'] == "AB":
-                    if tpl['address'] != "":
-                        ItemName = f"TAG{base_offset}.{tpl['address']}"
-                    else:
-                        ItemName = ""
-                    RegName = "TAG"
-                    RegType = "0"
-                else:
-                    ItemName = ""
-                    RegName = ""
-                    RegType = ""
-                #是否启用设备分组处理
-                if user_inputs['group_name_en'] == "启用":
-                    group_name = f"{user_inputs['group_name']}.{code}"
-                else:
-                    group_name = user_inputs['group_name']
-                #每行数据的变量部分
-                row = [
-                    int(user_inputs['start_id']) + count,
-                    TagName,
-                    Description,
-                    "用户变量",
-                    tpl['type'],
-                    "",
-                    ChannelName,
-                    user_inputs['device_name'],
-                    user_inputs['channeldriver'],
-                    user_inputs['deviceseries'],
-                    ItemName, 
-                    RegName,
-                    RegType,
-                    ItemDataType,
-                    tpl['access'],
-                    group_name
-                ]     
-                #每行数据的固定数据插入
-                row[5:5]=DataType
-                row[18:18]=fixeddata1
-                row[31:31]=fixeddata2
-                row[35:35]=fixeddata3
-                self.rows.append(row)
-                count += 1
+                        logger.warning(f"分片生成失败：{e}")
+                        self.last_error = f"分片生成失败：{e}"
+                    return
+        instrument.count("output.rows", count)
+        logger.info(f"分片生成完成：{shards} 个分片，{workers} 个进程")
+        return self.merge_parts(folder, file_name, plan.headers, part_paths, count, encoding)
 
-    def rows_bewgsed(self, template_data, user_inputs):
+    def generate_fused(self, targets, csv_data, chunk_size=WRITE_CHUNK_SIZE, progress=None, cancel_event=None,
+                       encoding=None):
+        """
+        用同一份设备数据同时生成多个点表（如同一份设备清单的 KingSCADA 采集点表和北控SED 上传点表）
+        设备数据按块取出，每块依次交给各目标生成并写入，每个目标对整块连续生成和编码，
+        与单独生成时的写入方式相同；每个目标使用各自的模板和参数，各自的输出格式，csv 目标使用预编码写入。
+        所有目标都写完后才一起改名为正式文件，任一目标出错或取消时都不留下输出
+        Args:
+            targets：[(文件夹名称, 文件名称, 行计划, 输出格式)]
+            csv_data：设备数据
+            chunk_size：每块设备在行数最多的目标中生成的行数
+            progress：进度回调，参数为所有目标已生成的总行数
+            cancel_event：threading.Event，置位后停止生成并删除未完成的文件
+            encoding：文本编码，默认 OUTPUT_ENCODING
+        Returns:
+            各目标的成功信息列表，失败或取消时返回 None，原因保存在 last_error 中
+        """
+        with instrument.timer("output.generate"):
+            return self._generate_fused(targets, csv_data, chunk_size, progress, cancel_event, encoding)
+
+    def _generate_fused(self, targets, csv_data, chunk_size, progress, cancel_event, encoding):
+        self.last_error = None
+        if not csv_data or not targets:
+            logger.warning(f"数据为空，不生成文件")
+            self.last_error = "数据为空，不生成文件"
+            return
+        try:
+            output_classes = [get_output(output_format) for _, _, _, output_format in targets]
+        except ValueError as e:
+            logger.warning(str(e))
+            self.last_error = str(e)
+            return
+        paths = []
+        count = 0
+        try:
+            with ExitStack() as stack:
+                #各目标：(行计划, 预编码器, 写入器, 下一个设备的 TagID)
+                sinks = []
+                for (folder, file_name, plan, _), output_class in zip(targets, output_classes):
+                    encoder = encoder_for_plan(plan, output_class, encoding)
+                    if encoder is not None:
+                        output_class = EncodedCSVOutput
+                    output_path = self.output_path(folder, file_name, output_class.extension)
+                    temp_path = output_path + ".part"
+                    paths.append((temp_path, output_path))
+                    writer = stack.enter_context(output_class(temp_path, encoding, os.path.basename(output_path)))
+                    writer.write_rows([plan.headers])
+                    sinks.append([plan, encoder, writer, plan.start_id])
+                #每块的设备数：行数最多的目标每块约 chunk_size 行
+                devices_per_chunk = max(1, chunk_size // max(len(plan) for plan, *_ in sinks))
+                devices = iter(csv_data)
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise GenerationCancelled()
+                    part = list(islice(devices, devices_per_chunk))
+                    if not part:
+                        break
+                    for sink in sinks:
+                        plan, encoder, writer, tag_id = sink
+                        rows = iter_plan_rows(plan, part, tag_id)
+                        with instrument.timer("rows.build"):
+                            if encoder is None:
+                                data = list(rows)
+                            else:
+                                data = encoder.encode_devices(list(rows.iter_values()))
+                        with instrument.timer("output.write"):
+                            if encoder is None:
+                                writer.write_rows(data)
+                            else:
+                                writer.write_bytes(data)
+                        sink[3] = tag_id + len(rows)
+                        count += len(rows)
+                    if progress:
+                        progress(count)
+            for temp_path, output_path in paths:
+                os.replace(temp_path, output_path)
+        except GenerationCancelled:
+            self._remove_temp(paths)
+            logger.info(f"已取消生成点表文件（已生成 {count} 行）")
+            return
+        except AddressError as e:
+            self._remove_temp(paths)
+            logger.warning(f"加载的文件中拼接地址和设备类型不匹配：{e}")
+            self.last_error = "加载的文件中拼接地址和设备类型不匹配"
+            return
+        except Exception as e:
+            self._remove_temp(paths)
+            logger.warning(f"写入文件失败：{e}")
+            self.last_error = f"写入文件失败：{e}"
+            return
+        if progress:
+            progress(count)
+        instrument.count("output.rows", count)
+        results = []
+        for (_, _, plan, _), (_, output_path) in zip(targets, paths):
+            rows = len(plan) * len(csv_data)
+            logger.info(f"成功生成点表文件：{output_path}（共 {rows} 行）")
+            results.append(f"成功生成点表文件：{output_path}（共 {rows} 行）")
+        return results
+
+    @staticmethod
+    def _remove_temp(paths):
+        """删除未完成的临时文件"""
+        for temp_path, _ in paths:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def iter_rows_kingscdada(self, template_data, user_inputs, csv_data):
         """
-        根据传入数据进行处理，并将数据写入headers和rows存储
+        流式生成 KingSCADA 点表，设置headers并返回数据行生成器
         Args:
             template_data：读取的模板数据
             user_inputs：用户设定的数据
+            csv_data：设备数据
         """
-        #表头
-        self.headers = [";IO#FS0序号", "所属通道", "驱动", "所属设备", "点类型",
-                   "点名", "描述", "初始值", "单位编码", "引用(云)标签",
-                   "提交", "标记", "值域", "权限", "采集周期",
-                   "n[0]", "n[1]", "n[2]", "n[3]", "n[4]", "n[5]", "n[6]", "n[7]", "n[8]", "n[9]", "n[10]", "n[11]", 
-                   "s[0]", "s[1]", "s[2]", "s[3]", "s[4]", "s[5]", "s[6]", "s[7]", "s[8]", "s[9]", "s[10]", "s[11]", 
-                   "opc.vt", "opc.item", "opc.acc", "io.kind", "io.mode", "io.obj",
-                   "io.path", "模拟量>>>取绝对值", "CTPT", "系数标记", "系数倍率",
-                   "基数", "基础倍率", "阈值开关", "阈值", "量程变换", 
-                   "裸数据上限","裸数据下限", "量程上限", "量程下限", "数字量>>>采集取反", 
-                   "真值描述", "假值描述", "防抖周期"
-        ]
-        #固定数据
-        fixeddata2 = ["","","","0","0","0","0","1000","3"]
-        fixeddata3 = ["0","0","0","0","0","0","0","","","","","","","","","","","","","0","","","0","0","","","0","0","0","0","0","1","0"]
-        #依据数据类型变化数据
-        DataType_1 = ["0","1","1000000000","0","1000000000","0","0","合","分","0"]
-        DataType_2 = ["0.001","0","100","0","1000","0","0","","","0"]
+        self.headers = KINGSCADA_HEADERS
+        #模板只编译一次，每个设备只填入变化的列
+        plan = KingSCADAPlan(template_data, user_inputs)
+        return iter_plan_rows(plan, csv_data)
 
-        self.rows = []
-        count = 0
-        for device_row in self.csv_data:
-            code = device_row['设备代号']
-            desc = device_row['设备描述']
-            #拼接地址处理
-            if user_inputs['device'] == "SIEMENS":
-                base_offset = int(device_row['拼接地址'])
+    def generate_incremental(self, folder, file_name, template_data, user_inputs, csv_data, source=None,
+                             delta=False, progress=None, cancel_event=None, output_format="csv", encoding=None):
+        """
+        增量生成 KingSCADA 点表
+        已有变量沿用上一次生成时分配的 TagID，新变量从未使用过的 TagID 开始分配，
+        输出成功后更新状态文件；第一次生成时与普通生成的结果相同
+        Args:
+            source：设备数据文件路径，状态文件按点表名称和设备数据文件区分，
+                同一模板生成的不同设备清单互不覆盖
+            delta：是否另外输出只包含新增和变化行的增量点表（文件名加 _delta）
+            progress、cancel_event、output_format、encoding：同 generate_output
+        Returns:
+            成功信息，失败或取消时返回 None，原因保存在 last_error 中
+        """
+        self.headers = KINGSCADA_HEADERS
+        plan = KingSCADAPlan(template_data, user_inputs)
+        run = IncrementalRun(plan, csv_data, TagState.load(state_path(self.base_dir, folder, file_name, source)))
+        output = self.generate_output(folder, file_name, run, progress=progress, cancel_event=cancel_event,
+                                      output_format=output_format, encoding=encoding)
+        if not output:
+            return
+        messages = [output, run.summary()]
+        if delta:
+            if run.delta_rows:
+                delta_output = self.generate_output(folder, f"{file_name}_delta", run.delta_rows,
+                                                    output_format=output_format, encoding=encoding)
+                if not delta_output:
+                    return
+                messages.append(delta_output)
             else:
-                base_offset = device_row['拼接地址']
-            #每个设备遍历模板数据
-            for tpl in template_data:
-                TagName = f"{code}{tpl['name']}"    #点名拼接
-                Description = f"{desc}{tpl['desc']}"    #描述拼接   
-                #数据类型相关数据处理      
-                if tpl['type'] =="1":
-                    DataType = DataType_1
-                elif tpl['type'] =="2":
-                    DataType = DataType_2      
-                else:
-                    DataType = ["","","","","","","","","",""]
-                #设备类型相关数据处理，主要是采集地址拼接
-                if user_inputs['device'] == "SIEMENS":
-                    n1 = int(base_offset) + int(tpl['addbyte'])
-                    n2 = user_inputs['db_num']
-                    if tpl['type'] == "2":
-                        n3 ="0"
-                        n4 = tpl['addbit']
-                    else:
-                        n3 = "7"
-                        n4 = "0"
-                elif user_inputs['device'] == "AB":
-                    n1 = int(base_offset) + int(tpl['addbyte'])
-                    n2 = user_inputs['db_num']
-                    if tpl['type'] == "2":
-                        n3 ="0"
-                        n4 = tpl['addbit']
-                    else:
-                        n3 = "7"
-                        n4 = tpl['addbit']
-                else:
-                    n3 = ""
-                    n4 = ""
-
-                #每行数据的变量部分
-                row = [
-                    "",
-                    user_inputs['channel'],
-                    user_inputs['drive'],
-                    user_inputs['dev_name'],
-                    tpl['type'],
-                    TagName,
-                    Description,
-                    n1, 
-                    n2,
-                    n3,
-                    n4,
-                    
-                ]     
-                #每行数据的固定数据插入
-                row[7:7]=fixeddata2
-                row[21:21]=fixeddata3    
-                row[55:55]=DataType             
-                self.rows.append(row)
-                count += 1
\ No newline at end of file
+                messages.append("没有新增或变化的行，不生成增量点表")
+        try:
+            run.commit()
+        except OSError as e:
+            logger.warning(f"保存状态文件失败：{e}")
+            self.last_error = f"保存状态文件失败：{e}"
+            return
+        logger.info(f"增量生成完成：{run.summary()}")
+        return "\n".join(messages)
+
+    def iter_rows_bewgsed(self, template_data, user_inputs, csv_data=None):
+        """
+        流式生成北控SED 上传点表，设置headers并返回数据行生成器
+        Args:
+            template_data：读取的模板数据
+            user_inputs：用户设定的数据
+            csv_data：设备数据，不填时使用已加载的 CSV
+        """
+        self.headers = BEWGSED_HEADERS
+        plan = BEWGSEDPlan(template_data, user_inputs)
+        return iter_plan_rows(plan, self.csv_data if csv_data is None else csv_data)
+
+    def check_conflicts(self, rows=None):
+        """
+        用 conflict_index 检查数据行（默认 self.rows），冲突时记录警告
+        Returns:
+            ConflictReport，未设置 conflict_index 时返回 None
+        """
+        if self.conflict_index is None:
+            return None
+        with instrument.timer("conflict.check"):
+            report = self.conflict_index.check(self.headers, self.rows if rows is None else rows)
+        if report:
+            logger.warning(f"点表冲突检查：{report.summary()}")
+        return report
+
+    def check_conflicts_against(self, paths, rows):
+        """
+        载入已有点表作为 conflict_index 并检查将生成的数据行，供界面生成前调用
+        Args:
+            paths：已有点表文件或目录列表
+            rows：将生成的数据行（可以是生成器），headers 需已设置
+        Returns:
+            无冲突时返回 True；读取失败或存在冲突时返回 False，原因和冲突报告保存在 last_error 中
+        """
+        self.last_error = None
+        index = ConflictIndex()
+        try:
+            for path in paths:
+                if not os.path.exists(path):
+                    self.last_error = f"冲突检查的点表不存在：{path}"
+                    return False
+                with instrument.timer("conflict.load"):
+                    index.load_path(path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"已有点表读取失败：{e}")
+            self.last_error = f"已有点表读取失败：{e}"
+            return False
+        self.conflict_index = index
+        self.conflict_report = self.check_conflicts(rows)
+        if self.conflict_report:
+            #对话框中每类只列出前几条，完整的冲突报告已记录在日志中
+            self.last_error = f"与已有点表冲突，未生成文件\n{self.conflict_report.summary(limit=5)}"
+            return False
+        logger.info(f"冲突检查通过：已有点表 {index.tables} 个、变量 {len(index)} 个")
+        return True
+
+    def rows_kingscdada(self, template_data, user_inputs, csv_data):
+        """
+        根据传入数据进行处理，并将数据写入headers和rows存储，出错时原因保存在 last_error 中
+        Args:
+            template_data：读取的模板数据
+            user_inputs：用户设定的数据
+        """
+        try:
+            with instrument.timer("rows.build"):
+                self.rows = list(self.iter_rows_kingscdada(template_data, user_inputs, csv_data))
+            self.conflict_report = self.check_conflicts()
+        except AddressError as e:
+            self.rows = []
+            logger.warning(f"加载的文件中拼接地址和设备类型不匹配：{e}")
+            self.last_error = "加载的文件中拼接地址和设备类型不匹配"
+
+    def rows_bewgsed(self, template_data, user_inputs):
+        """
+        根据传入数据进行处理，并将数据写入headers和rows存储，出错时原因保存在 last_error 中
+        Args:
+            template_data：读取的模板数据
+            user_inputs：用户设定的数据
+        """
+        try:
+            with instrument.timer("rows.build"):
+                self.rows = list(self.iter_rows_bewgsed(template_data, user_inputs))
+            self.conflict_report = self.check_conflicts()
+        except AddressError as e:
+            self.rows = []
+            logger.warning(f"加载的文件中拼接地址和设备类型不匹配：{e}")
+            self.last_error = "加载的文件中拼接地址和设备类型不匹配"
@@ -1,32 +1,173 @@
 import asyncio
-import edge_tts
+import csv
+import hashlib
+import json
 import os
+import re
+import threading
+import time
 from pathlib import Path
 
+from src.core import instrument
+from src.core.tts_cache import SynthesisCache
+from src.core.tts_concurrency import AdaptiveLimiter, backoff_delay
+
 import logging
 logger = logging.getLogger(__name__)
 
+#默认语音
+DEFAULT_VOICE = "zh-CN-YunxiNeural"
+#语音列表缓存文件格式版本，格式变化时旧缓存自动失效
+VOICE_CACHE_VERSION = 1
+#语音列表缓存有效期（秒），过期后后台刷新
+VOICE_CACHE_TTL = 7 * 24 * 3600
+#文件名中不允许出现的字符（按 Windows 规则）
+ILLEGAL_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+#Windows 保留的设备文件名
+RESERVED_FILENAMES = {"CON", "PRN", "AUX", "NUL"} | {f"COM{i}" for i in range(1, 10)} | {f"LPT{i}" for i in range(1, 10)}
+#文件名（不含扩展名）最大长度
+MAX_FILENAME_LENGTH = 100
+#文本与文件名对照表
+MANIFEST_FILE = "manifest.csv"
+#批量生成时每条文本最多重试次数
+MAX_RETRIES = 5
+
+
+_edge_tts = None
+
+
+def load_edge_tts():
+    """
+    首次联网时才导入 edge_tts，启动界面和命令行生成点表时不需要加载
+    导入前指定 SSL 证书位置，解决打包后的程序连接语音服务时的 401 Invalid response
+    """
+    global _edge_tts
+    if _edge_tts is None:
+        try:
+            import certifi
+            os.environ["SSL_CERT_FILE"] = certifi.where()
+        except Exception:
+            pass
+        import edge_tts
+        _edge_tts = edge_tts
+    return _edge_tts
+
+
+def safe_filename(text, suffix=".wav"):
+    """
+    将语音文本转换为合法的文件名
+    文本本身合法时文件名就是文本；含非法字符、过长或是保留名时，
+    替换非法字符、截断，并追加原文本哈希，保证不同文本得到不同文件名
+    """
+    name = str(text)
+    if name.endswith(suffix):
+        name = name[:-len(suffix)]
+    clean = ILLEGAL_FILENAME_CHARS.sub("_", name).strip().rstrip(". ")
+    if (clean != name or not clean or len(clean) > MAX_FILENAME_LENGTH
+            or clean.split(".")[0].upper() in RESERVED_FILENAMES):
+        clean = f"{clean[:MAX_FILENAME_LENGTH]}_{text_digest(name)}"
+    return clean + suffix
+
+def text_digest(text):
+    """文本的短哈希，用于生成不冲突的文件名"""
+    return hashlib.sha1(str(text).encode('utf-8')).hexdigest()[:8]
+
 class EdgeTTSManager:
-    def __init__(self, output_dir="output"):
+    def __init__(self, output_dir="output", communicate=None):
         """
         初始化 EdgeTTSManager
         :param output_dir: 语音文件保存目录
+        :param communicate: 语音合成类，默认 edge_tts.Communicate，测试时可替换为本地实现
         """
+        self.communicate = communicate
         self.output_dir = Path(output_dir)
+        self.cache_dir = self.output_dir / "cache"
         self.output_dir = self.output_dir / "output_edgetts"
+        self.voice_cache_file = self.cache_dir / "voices.json"
+        self.synth_cache = SynthesisCache(self.cache_dir / "tts")
+        self.cache_stats = {"hits": 0, "misses": 0}
+        self.batch_status = {}
         
         self.voices = []
         self.voice_map = {}
+        self.voices_fetched_at = 0
+
+    def _set_voices(self, voices, fetched_at):
+        self.voices = voices
+        # 建立 voice_name -> voice_dict 映射
+        self.voice_map = {v["ShortName"]: v for v in self.voices}
+        self.voices_fetched_at = fetched_at
 
     async def fetch_voices(self):
         """
-        获取所有可用语音参数
+        获取所有可用语音参数，并写入本地缓存
         """
-        self.voices = await edge_tts.list_voices()
-        # 建立 voice_name -> voice_dict 映射
-        self.voice_map = {v["ShortName"]: v for v in self.voices}
+        voices = await load_edge_tts().list_voices()
+        self._set_voices(voices, time.time())
+        self.save_voice_cache()
         return self.voices
 
+    def load_voice_cache(self):
+        """
+        读取本地缓存的语音列表，缓存不存在、版本不符或损坏时返回 False
+        """
+        try:
+            with open(self.voice_cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get("version") != VOICE_CACHE_VERSION:
+                logger.info(f"语音列表缓存版本不符，忽略：{self.voice_cache_file}")
+                return False
+            self._set_voices(cache["voices"], cache["fetched_at"])
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"读取语音列表缓存失败：{e}")
+            return False
+        logger.info(f"已从缓存加载语音列表，共 {len(self.voices)} 条")
+        return True
+
+    def save_voice_cache(self):
+        """
+        将当前语音列表写入本地缓存（先写临时文件再替换）
+        """
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_file = self.voice_cache_file.with_suffix(".tmp")
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": VOICE_CACHE_VERSION,
+                    "fetched_at": self.voices_fetched_at,
+                    "voices": self.voices
+                }, f, ensure_ascii=False)
+            os.replace(temp_file, self.voice_cache_file)
+        except Exception as e:
+            logger.warning(f"写入语音列表缓存失败：{e}")
+
+    def voices_expired(self, ttl=VOICE_CACHE_TTL):
+        """
+        语音列表为空或超过有效期时返回 True
+        """
+        return not self.voices or time.time() - self.voices_fetched_at > ttl
+
+    def refresh_voices_background(self, callback):
+        """
+        在后台线程获取最新语音列表
+        :param callback: 完成后在后台线程中调用 callback(voices, error)，成功时 error 为 None
+        """
+        def worker():
+            try:
+                voices = asyncio.run(self.fetch_voices())
+            except Exception as e:
+                logger.error(f"获取语音列表失败: {e}")
+                callback(None, e)
+                return
+            logger.info(f"语音列表已更新，共 {len(voices)} 条")
+            callback(voices, None)
+
+        thread = threading.Thread(target=worker, name="VoiceRefresher", daemon=True)
+        thread.start()
+        return thread
+
     def list_voices(self):
         """
         返回已获取语音列表（ShortName, Gender, Locale）
@@ -45,46 +186,189 @@ class EdgeTTSManager:
         """
         return self.voice_map.get(voice_name, {}).get("RolePlayList", [])
 
-    async def generate_speech(self, text, voice="zh-CN-YunxiNeural"):
+    async def generate_speech(self, text, voice=DEFAULT_VOICE, rate="+0%", pitch="+0Hz", file_name=None):
         """
-        生成单条语音
+        生成单条语音，相同参数的语音已合成过时直接从缓存复制
         :param text: 文本
-        :param file_name: 输出文件名，不填自动生成
         :param voice: 语音名称
+        :param rate: 语速，如 "+20%"
+        :param pitch: 音高，如 "+5Hz"
+        :param file_name: 输出文件名，不填根据文本自动生成
         :return: 输出文件路径
         """
         try:
             self.output_dir.mkdir(parents=True, exist_ok=True)
-            file_name = str(text)
-            if not file_name.endswith(".wav"):
-                file_name += ".wav"
-            tts = edge_tts.Communicate(text, voice)
+            if file_name is None:
+                file_name = safe_filename(text)
             output_path = self.output_dir / file_name
-            await tts.save(output_path)
+            key = SynthesisCache.make_key(text, voice, rate, pitch)
+            if self.synth_cache.fetch(key, output_path):
+                self.cache_stats["hits"] += 1
+                instrument.count("tts.cache_hits")
+                logger.info(f"语音缓存命中：{output_path}")
+                return output_path
+            self.cache_stats["misses"] += 1
+            instrument.count("tts.cache_misses")
+            await self._synthesize(text, voice, rate, pitch, output_path)
+            self.synth_cache.store(key, output_path)
             logger.info(f"语音生成成功：{output_path}")
         except Exception as e:
             logger.error(f"单条语音生成失败：{e}")
             return None
         return output_path
 
-    async def generate_batch(self, text_list, voice="zh-CN-YunxiNeural", max_concurrent=20):
+    async def _synthesize(self, text, voice, rate, pitch, output_path):
+        """
+        调用语音服务合成一条语音，失败时抛出异常
+        先写临时文件再替换，避免覆盖与缓存共用的硬链接文件
+        """
+        temp_path = output_path.with_name(output_path.name + ".part")
+        try:
+            communicate = self.communicate
+            if communicate is None:
+                communicate = load_edge_tts().Communicate
+            tts = communicate(text, voice, rate=rate, pitch=pitch)
+            with instrument.timer("tts.request"):
+                await tts.save(temp_path)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+
+    def plan_batch(self, text_list):
+        """
+        文本去重并分配文件名
+        :return: {文本: 文件名}，按文本首次出现的顺序排列
+        """
+        names = {}
+        used = {}
+        for text in text_list:
+            text = str(text)
+            if not text.strip() or text in names:
+                continue
+            file_name = safe_filename(text)
+            #Windows 文件名不区分大小写，冲突时追加文本哈希
+            folded = file_name.casefold()
+            if folded in used and used[folded] != text:
+                file_name = f"{file_name[:-4]}_{text_digest(text)}.wav"
+                folded = file_name.casefold()
+            used[folded] = text
+            names[text] = file_name
+        return names
+
+    def write_manifest(self, names):
+        """
+        将文本与文件名对照写入输出目录的 manifest.csv，保留以前批次的记录
+        """
+        if not names:
+            return
+        manifest_path = self.output_dir / MANIFEST_FILE
+        manifest = {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+                for row in csv.DictReader(f):
+                    manifest[row['文本']] = row['文件名']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"读取语音对照表失败，将重新生成：{e}")
+        manifest.update(names)
+        try:
+            temp_path = manifest_path.with_name(MANIFEST_FILE + ".tmp")
+            with open(temp_path, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(["文本", "文件名"])
+                writer.writerows(manifest.items())
+            os.replace(temp_path, manifest_path)
+        except Exception as e:
+            logger.warning(f"写入语音对照表失败：{e}")
+
+    async def generate_batch(self, text_list, voice=DEFAULT_VOICE, max_concurrent=20, max_retries=MAX_RETRIES,
+                             rate="+0%", pitch="+0Hz", progress=None, initial_concurrent=None):
         """
-        批量生成语音，异步并发，限制并发数量
+        批量生成语音，异步并发，并发数根据服务响应自适应调整，失败的条目带退避重试
+        重复的文本只合成一次，结果对应到每一行；文本与文件名的对照写入 manifest.csv，
+        缓存命中和未命中的条数记录在 cache_stats 中，每条文本的最终状态记录在 batch_status 中。
+        任务被取消时未完成的临时文件会被删除，已完成的文件仍记录到对照表
         :param text_list: 文本列表
         :param voice: 语音名称
         :param max_concurrent: 最大并发数
-        :return: 文件夹路径 + 成功生成条数
+        :param max_retries: 每条文本最多重试次数
+        :param progress: 进度回调 progress(已完成条数, 去重后总条数)
+        :param initial_concurrent: 初始并发数，默认为 max_concurrent（与原来的固定并发相同），出错后再自适应降低
+        :return: 文件夹路径 + 成功生成条数（按文本列表行数计）
         """
-        semaphore = asyncio.Semaphore(max_concurrent)
-        try:
-            async def sem_task(text):
-                async with semaphore:
-                    return await self.generate_speech(text, voice)
+        self.cache_stats = {"hits": 0, "misses": 0}
+        self.batch_status = {}
+        names = self.plan_batch(text_list)
+        limiter = AdaptiveLimiter(maximum=max_concurrent, initial=initial_concurrent)
+        finished = 0
 
-            tasks = [sem_task(text) for text in text_list]
-            results = await asyncio.gather(*tasks)
-            count = sum(1 for r in results if r is not None)
+        async def tracked(text, file_name):
+            nonlocal finished
+            result = await self._batch_item(limiter, text, file_name, voice, rate, pitch, max_retries)
+            finished += 1
+            if progress:
+                progress(finished, len(names))
+            return result
+
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            await asyncio.gather(*(tracked(text, file_name) for text, file_name in names.items()))
+        except asyncio.CancelledError:
+            logger.info(f"批量语音生成已取消：已完成 {finished}/{len(names)} 条")
+            raise
         except Exception as e:
             logger.error(f"多条语音生成失败：{e}")
-            count = 0
+        finally:
+            done = {text for text, status in self.batch_status.items() if status["status"] != "failed"}
+            self.write_manifest({text: file_name for text, file_name in names.items() if text in done})
+        count = sum(1 for text in text_list if str(text) in done)
+        failed = [text for text, status in self.batch_status.items() if status["status"] == "failed"]
+        logger.info(f"批量语音生成完成：{len(text_list)} 行，去重后 {len(names)} 条，成功 {count} 行，"
+                    f"失败 {len(failed)} 条，缓存命中 {self.cache_stats['hits']} 条，"
+                    f"未命中 {self.cache_stats['misses']} 条，最高并发 {limiter.peak}")
         return self.output_dir, count
+
+    async def _batch_item(self, limiter, text, file_name, voice, rate, pitch, max_retries):
+        """
+        批量生成中的单条文本：先查缓存，未命中时在并发控制下合成，失败后退避重试
+        """
+        output_path = self.output_dir / file_name
+        key = SynthesisCache.make_key(text, voice, rate, pitch)
+        if self.synth_cache.fetch(key, output_path):
+            self.cache_stats["hits"] += 1
+            instrument.count("tts.cache_hits")
+            self.batch_status[text] = {"status": "cached", "file": file_name, "attempts": 0, "error": ""}
+            return output_path
+        self.cache_stats["misses"] += 1
+        instrument.count("tts.cache_misses")
+        error = None
+        attempt = 0
+        while attempt <= max_retries:
+            attempt += 1
+            await limiter.acquire()
+            start = time.monotonic()
+            try:
+                await self._synthesize(text, voice, rate, pitch, output_path)
+            except (ValueError, TypeError) as e:
+                #参数错误，重试无意义，也不代表服务繁忙
+                error = e
+                await limiter.release(True, time.monotonic() - start)
+                break
+            except Exception as e:
+                error = e
+                await limiter.release(False, time.monotonic() - start)
+            else:
+                await limiter.release(True, time.monotonic() - start)
+                self.synth_cache.store(key, output_path)
+                self.batch_status[text] = {"status": "ok", "file": file_name, "attempts": attempt, "error": ""}
+                logger.info(f"语音生成成功：{output_path}")
+                return output_path
+            if attempt <= max_retries:
+                await asyncio.sleep(backoff_delay(attempt - 1))
+        logger.error(f"语音生成失败（已尝试 {attempt} 次）：{text}：{error}")
+        instrument.count("tts.failed")
+        self.batch_status[text] = {"status": "failed", "file": file_name, "attempts": attempt, "error": str(error)}
+        return None
@@ -0,0 +1,174 @@
+"""
+生成流程的耗时和计数统计
+默认关闭，关闭时 timer() 返回共享的空上下文，只有一次全局变量判断的开销；
+开启后记录各阶段的次数和耗时，结束时输出 JSON 汇总，可选同时输出 cProfile 数据
+
+阶段名称：
+    csv.load         读取设备数据 CSV
+    template.load    加载模板
+    rows.build       生成数据行（流式生成时为等待数据行的时间）
+    output.write     编码并写入文件
+    output.generate  生成点表文件的总耗时
+    tts.request      单条语音合成请求
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+#启用统计的环境变量：汇总文件路径、cProfile 输出路径
+ENV_STATS = "SCADA_STATS"
+ENV_PROFILE = "SCADA_PROFILE"
+
+_enabled = False
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_profiler = None
+
+
+class _NullTimer:
+    """关闭统计时使用的空上下文"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def timer(name):
+    """
+    统计一段代码的耗时
+    用法：with instrument.timer("csv.load"): ...
+    """
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+def record(name, elapsed):
+    """记录一次耗时（秒）"""
+    if not _enabled:
+        return
+    with _lock:
+        stat = _timers.get(name)
+        if stat is None:
+            _timers[name] = [1, elapsed, elapsed, elapsed]
+        else:
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = min(stat[2], elapsed)
+            stat[3] = max(stat[3], elapsed)
+
+
+def count(name, n=1):
+    """计数器累加"""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def reset():
+    """清空已记录的数据"""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def summary():
+    """
+    汇总已记录的数据
+    Returns:
+        {"timers": {阶段: {"count", "total", "mean", "min", "max"}}, "counters": {名称: 数值}}，耗时单位为秒
+    """
+    with _lock:
+        timers = {
+            name: {"count": n, "total": total, "mean": total / n, "min": low, "max": high}
+            for name, (n, total, low, high) in sorted(_timers.items())
+        }
+        return {"timers": timers, "counters": dict(sorted(_counters.items()))}
+
+
+def write_summary(path):
+    """将汇总写入 JSON 文件"""
+    data = summary()
+    data["time"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    logger.info(f"耗时统计已保存：{path}")
+
+
+def log_summary():
+    """将各阶段耗时写入日志"""
+    for name, stat in summary()["timers"].items():
+        logger.info(f"耗时统计 {name}：{stat['count']} 次，共 {stat['total']:.3f} s，平均 {stat['mean'] * 1000:.1f} ms")
+
+
+def enable(summary_path=None, profile_path=None):
+    """
+    开启统计
+    Args:
+        summary_path：程序退出时写入 JSON 汇总的路径
+        profile_path：不为空时同时开启 cProfile，程序退出时写入该路径（可用 pstats / snakeviz 查看）
+    """
+    global _enabled, _profiler
+    _enabled = True
+    if profile_path and _profiler is None:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    atexit.register(_finish, summary_path, profile_path)
+
+
+def disable():
+    """关闭统计，已记录的数据保留"""
+    global _enabled
+    _enabled = False
+
+
+def enable_from_env():
+    """根据环境变量 SCADA_STATS / SCADA_PROFILE 开启统计，用于界面程序"""
+    summary_path = os.environ.get(ENV_STATS)
+    profile_path = os.environ.get(ENV_PROFILE)
+    if summary_path or profile_path:
+        enable(summary_path, profile_path)
+
+
+def _finish(summary_path, profile_path):
+    global _profiler
+    if _profiler is not None and profile_path:
+        _profiler.disable()
+        _profiler.dump_stats(profile_path)
+        _profiler = None
+        logger.info(f"cProfile 数据已保存：{profile_path}")
+    log_summary()
+    if summary_path:
+        try:
+            write_summary(summary_path)
+        except OSError as e:
+            logger.warning(f"保存耗时统计失败：{e}")
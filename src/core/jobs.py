@@ -0,0 +1,310 @@
+import asyncio
+import os
+
+from src.core import instrument
+from src.core.conflict_index import ConflictIndex
+from src.core.csv_loader import count_csv_rows
+from src.core.csv_manager import CSVManager
+from src.core.row_plan import BEWGSEDPlan, KingSCADAPlan, iter_plan_rows
+from src.core.template_manager import TemplateManager
+
+import logging
+logger = logging.getLogger(__name__)
+
+#生成目标：模板目录、输出目录
+TARGETS = {
+    "kingscada": ("config_kingscada", "output_kingscada"),
+    "bewgsed": ("config_bewgsed", "output_bewgsde"),
+}
+#生成目标的行计划
+TARGET_PLANS = {
+    "kingscada": KingSCADAPlan,
+    "bewgsed": BEWGSEDPlan,
+}
+#KingSCADA 参数默认值，与界面默认值一致
+KINGSCADA_DEFAULTS = {
+    "start_id": "1001",
+    "device_name": "PLC1",
+    "group_name": "TEST.一期",
+    "group_name_en": "禁用",
+    "link": "以太网",
+    "link_ip": "192.168.10.11",
+    "link_com": "11",
+    "db_num": "3",
+}
+#KingSCADA 设备系列和通道驱动默认值
+KINGSCADA_DEVICE_DEFAULTS = {
+    "SIEMENS": {"deviceseries": "S7-1500", "channeldriver": "S71500Tcp"},
+    "AB": {"deviceseries": "AB-ControlLogixTCP", "channeldriver": "ControlLogix"},
+}
+#北控SED 参数默认值，与界面默认值一致
+BEWGSED_DEFAULTS = {
+    "channel": "S127",
+    "dev_name": "PLC1",
+    "drive": "PLC_SIEMENS_S7_1200_TCP",
+    "db_num": "3",
+}
+
+
+class JobError(Exception):
+    """生成任务执行失败"""
+
+
+def make_user_inputs(target, device, overrides=None):
+    """
+    按界面的默认值生成 user_inputs，overrides 中的值覆盖默认值
+    """
+    if target == "kingscada":
+        inputs = dict(KINGSCADA_DEFAULTS)
+        inputs.update(KINGSCADA_DEVICE_DEFAULTS.get(device, {"deviceseries": "", "channeldriver": ""}))
+    elif target == "bewgsed":
+        inputs = dict(BEWGSED_DEFAULTS)
+    else:
+        raise JobError(f"未知的生成目标：{target}")
+    inputs.update({key: str(value) for key, value in (overrides or {}).items()})
+    inputs["device"] = device
+    inputs.setdefault("ip", inputs.get("link_ip", ""))
+    return inputs
+
+
+def output_name(device, template):
+    """输出文件名（不含时间戳），与界面生成的文件名一致"""
+    return f"{device}_{template[:-5]}"
+
+
+def load_template(base_dir, target, device, template):
+    """
+    加载并编译一个生成目标的模板
+    Raises:
+        JobError：模板不存在、结构错误或为空
+    """
+    config, _ = TARGETS[target]
+    template_manager = TemplateManager(base_dir, refresh_interval=0)
+    try:
+        with instrument.timer("template.load"):
+            template_data = template_manager.store.load(config, device, template).entries
+    except (OSError, ValueError) as e:
+        #模板结构错误在生成开始前报告，信息中包含出错的条目和字段
+        raise JobError(f"模板加载失败：{config}/{device}/{template}：{e}") from e
+    if not template_data:
+        raise JobError(f"模板为空：{config}/{device}/{template}")
+    return template_data
+
+
+def load_device_data(base_dir, csv_path):
+    """
+    加载设备数据
+    Raises:
+        JobError：文件不存在或为空
+    """
+    if not os.path.exists(csv_path):
+        raise JobError(f"设备数据文件不存在：{csv_path}")
+    csv_data = CSVManager(base_dir).load_csv(csv_path)
+    if not csv_data:
+        raise JobError(f"设备数据为空：{csv_path}")
+    return csv_data
+
+
+def check_job(job):
+    """
+    检查任务的必填参数
+    Returns:
+        生成目标
+    """
+    target = job.get("target", "kingscada")
+    if target not in TARGETS:
+        raise JobError(f"未知的生成目标：{target}")
+    for key in ("device", "template", "csv"):
+        if not job.get(key):
+            raise JobError(f"任务缺少参数：{key}")
+    return target
+
+
+def count_job_rows(base_dir, job):
+    """
+    任务将生成的行数（模板条目数 × 设备数据行数），设备数据只计数不解析
+    Raises:
+        JobError：参数错误、模板无效或设备数据文件不存在、为空
+    """
+    target = check_job(job)
+    template_data = load_template(base_dir, target, job["device"], job["template"])
+    if not os.path.exists(job["csv"]):
+        raise JobError(f"设备数据文件不存在：{job['csv']}")
+    count = count_csv_rows(job["csv"])
+    if not count:
+        raise JobError(f"设备数据为空：{job['csv']}")
+    return len(template_data) * count
+
+
+def load_job_inputs(base_dir, job):
+    """
+    加载任务的模板和设备数据
+    Args:
+        job：{"target", "device", "template", "csv", "inputs"}
+    Returns:
+        (template_data, csv_data, user_inputs)
+    """
+    target = check_job(job)
+    template_data = load_template(base_dir, target, job["device"], job["template"])
+    csv_data = load_device_data(base_dir, job["csv"])
+    user_inputs = make_user_inputs(target, job["device"], job.get("inputs"))
+    return template_data, csv_data, user_inputs
+
+
+def run_generate_job(base_dir, job):
+    """
+    执行一个点表生成任务，输出与界面批量生成相同的文件
+    KingSCADA 任务设置 "incremental" 时增量生成，设置 "delta" 时另外输出增量点表；
+    "format"、"encoding" 指定输出格式和编码；"workers" 大于 1 时多进程分片生成（只支持 csv）；
+    "conflicts" 为已有点表文件或目录列表，生成前检查变量名、TagID 和 DB 地址冲突，有冲突时不输出；
+    设置 "targets" 时为多目标合并生成，见 run_fused_job
+    Returns:
+        成功信息
+    Raises:
+        JobError：任务执行失败
+    """
+    if job.get("targets"):
+        return run_fused_job(base_dir, job)
+    target = job.get("target", "kingscada")
+    template_data, csv_data, user_inputs = load_job_inputs(base_dir, job)
+    csv_manager = CSVManager(base_dir)
+    _, folder = TARGETS[target]
+    file_name = output_name(job["device"], job["template"])
+    output_options = {"output_format": job.get("format") or "csv", "encoding": job.get("encoding")}
+    if job.get("conflicts"):
+        check_job_conflicts(csv_manager, target, template_data, user_inputs, csv_data, job["conflicts"])
+    workers = int(job.get("workers") or 0)
+    if workers > 1 and not job.get("incremental"):
+        if output_options["output_format"] != "csv":
+            raise JobError("多进程分片生成只支持 csv 格式")
+        plan = TARGET_PLANS[target](template_data, user_inputs)
+        result = csv_manager.generate_sharded(folder, file_name, plan, csv_data, workers,
+                                              encoding=output_options["encoding"])
+    elif target == "kingscada" and job.get("incremental"):
+        result = csv_manager.generate_incremental(folder, file_name, template_data, user_inputs, csv_data, job["csv"],
+                                                  delta=bool(job.get("delta")), **output_options)
+    else:
+        if target == "kingscada":
+            rows = csv_manager.iter_rows_kingscdada(template_data, user_inputs, csv_data)
+        else:
+            rows = csv_manager.iter_rows_bewgsed(template_data, user_inputs, csv_data)
+        result = csv_manager.generate_output(folder, file_name, rows, **output_options)
+    if not result:
+        raise JobError(csv_manager.last_error or "生成失败")
+    return result
+
+
+def run_fused_job(base_dir, job):
+    """
+    执行多目标合并生成任务：设备数据只加载和遍历一次，同时输出各目标的点表
+    Args:
+        job：{"device", "csv", "targets": [{"target", "template", "inputs", "format"}], "encoding", "conflicts"}
+            各目标使用各自的模板和参数，未指定 format 时使用任务的 format
+    Returns:
+        各点表的成功信息，每行一个
+    Raises:
+        JobError：任务执行失败，任一目标失败时都不输出
+    """
+    for key in ("device", "csv", "targets"):
+        if not job.get(key):
+            raise JobError(f"任务缺少参数：{key}")
+    device = job["device"]
+    targets = []
+    names = {}
+    for i, item in enumerate(job["targets"]):
+        target = item.get("target")
+        if target not in TARGETS:
+            raise JobError(f"第 {i + 1} 个目标：未知的生成目标：{target}")
+        if not item.get("template"):
+            raise JobError(f"第 {i + 1} 个目标缺少参数：template")
+        template_data = load_template(base_dir, target, device, item["template"])
+        user_inputs = make_user_inputs(target, device, item.get("inputs"))
+        _, folder = TARGETS[target]
+        #同一输出目录中同名的点表追加序号
+        name = output_name(device, item["template"])
+        names[(folder, name)] = names.get((folder, name), 0) + 1
+        if names[(folder, name)] > 1:
+            name = f"{name}_{names[(folder, name)]}"
+        targets.append((folder, name, TARGET_PLANS[target](template_data, user_inputs),
+                        item.get("format") or job.get("format") or "csv"))
+    csv_data = load_device_data(base_dir, job["csv"])
+
+    csv_manager = CSVManager(base_dir)
+    if job.get("conflicts"):
+        index = load_conflict_index(job["conflicts"])
+        for _, _, plan, _ in targets:
+            check_plan_conflicts(csv_manager, index, plan, csv_data)
+    results = csv_manager.generate_fused(targets, csv_data, encoding=job.get("encoding"))
+    if not results:
+        raise JobError(csv_manager.last_error or "生成失败")
+    return "\n".join(results)
+
+
+def load_conflict_index(paths):
+    """
+    将已有点表载入冲突索引
+    Raises:
+        JobError：已有点表不存在
+    """
+    index = ConflictIndex()
+    for path in paths:
+        if not os.path.exists(path):
+            raise JobError(f"冲突检查的点表不存在：{path}")
+        with instrument.timer("conflict.load"):
+            index.load_path(path)
+    return index
+
+
+def check_plan_conflicts(csv_manager, index, plan, csv_data):
+    """
+    检查行计划将生成的数据行与冲突索引
+    Raises:
+        JobError：存在冲突
+    """
+    csv_manager.conflict_index = index
+    csv_manager.headers = plan.headers
+    report = csv_manager.check_conflicts(iter_plan_rows(plan, csv_data))
+    if report:
+        raise JobError(f"与已有点表冲突（{len(report)} 处，详见上方的冲突报告），未生成文件")
+    logger.info(f"冲突检查通过：已有点表 {index.tables} 个、变量 {len(index)} 个")
+
+
+def check_job_conflicts(csv_manager, target, template_data, user_inputs, csv_data, paths):
+    """
+    将已有点表载入冲突索引，并检查本任务将生成的数据行
+    Raises:
+        JobError：已有点表读取失败或存在冲突
+    """
+    index = load_conflict_index(paths)
+    check_plan_conflicts(csv_manager, index, TARGET_PLANS[target](template_data, user_inputs), csv_data)
+
+
+def run_tts_job(base_dir, job):
+    """
+    执行语音生成任务
+    Args:
+        job：{"csv"：文本 CSV（"文本"列）或 "text"：单条文本, "voice"：语音名称}
+    Returns:
+        成功信息
+    Raises:
+        JobError：任务执行失败
+    """
+    from src.core.edgetts_manager import EdgeTTSManager, DEFAULT_VOICE
+
+    manager = EdgeTTSManager(base_dir)
+    voice = job.get("voice") or DEFAULT_VOICE
+    if job.get("text"):
+        output_path = asyncio.run(manager.generate_speech(job["text"], voice))
+        if not output_path:
+            raise JobError("语音生成失败")
+        return f"生成成功：{output_path}"
+    if not job.get("csv"):
+        raise JobError("任务缺少参数：csv 或 text")
+    csv_data = CSVManager(base_dir).load_csv(job["csv"])
+    text_list = [item.get("文本", "") for item in csv_data]
+    output_dir, count = asyncio.run(manager.generate_batch(text_list, voice))
+    if count == 0:
+        raise JobError("语音生成失败")
+    failed = sum(1 for status in manager.batch_status.values() if status["status"] == "failed")
+    return (f"生成完成：{count}条语音（缓存命中{manager.cache_stats['hits']}条，失败{failed}条），"
+            f"文件夹路径：{output_dir}")
@@ -0,0 +1,339 @@
+"""
+从 Studio 5000 导出的 L5X 文件生成 AB 采集模板
+用 iterparse 增量解析：只保留 DataTypes 中的自定义数据类型（UDT）定义，其余元素解析完立即释放，
+读完 DataTypes 后不再读取后面的模块、标签和程序，内存占用与导出文件大小无关。
+UDT 的成员树展开为 name/desc/type/access/address 条目，每个 UDT 写入一个模板 JSON。
+每个 UDT 的定义（连同引用的 UDT）计算哈希，与上次导入相同且模板文件仍存在时跳过
+"""
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+
+from src.core.template_manager import TemplateStore
+from src.core.template_schema import KingSCADAEntry, TemplateError, compile_template
+
+import logging
+logger = logging.getLogger(__name__)
+
+#模板目录和设备类型
+L5X_CONFIG = "config_kingscada"
+L5X_DEVICE = "AB"
+#导入状态文件，保存在模板目录下的子目录中
+STATE_DIR = ".state"
+STATE_FILE = "l5x_import.json"
+#展开规则变化时修改版本号，所有 UDT 重新生成
+IMPORT_VERSION = 1
+#数组成员最多展开的元素个数，超过时跳过该成员
+MAX_ARRAY_ELEMENTS = 64
+#描述的首选语言（多语言工程）
+DESCRIPTION_LANG = "zh-CN"
+
+#基本数据类型对应的 KingSCADA 变量类型，只使用行计划有数据类型定义的类型（row_plan.KINGSCADA_DATATYPE 和 IODisc），
+#DINT、UDINT、LREAL、LINT 等没有对应定义的成员不生成变量，在导入报告中列为跳过
+ATOMIC_TYPES = {
+    "BIT": "IODisc",
+    "BOOL": "IODisc",
+    "SINT": "IOShort",
+    "USINT": "IOShort",
+    "INT": "IOShort",
+    "UINT": "IOShort",
+    "REAL": "IOFloat",
+}
+#常用的预定义结构：成员 (名称, 数据类型, 读写属性)
+BUILTIN_STRUCTS = {
+    "TIMER": (("PRE", "DINT", "读写"), ("ACC", "DINT", "只读"),
+              ("EN", "BOOL", "只读"), ("TT", "BOOL", "只读"), ("DN", "BOOL", "只读")),
+    "COUNTER": (("PRE", "DINT", "读写"), ("ACC", "DINT", "只读"), ("CU", "BOOL", "只读"), ("CD", "BOOL", "只读"),
+                ("DN", "BOOL", "只读"), ("OV", "BOOL", "只读"), ("UN", "BOOL", "只读")),
+}
+#ExternalAccess 对应的读写属性，None 表示外部不可访问，不生成变量
+EXTERNAL_ACCESS = {
+    "Read/Write": "读写",
+    "Read Only": "只读",
+    "None": None,
+}
+#旧版本导出文件没有 ExternalAccess 属性时的读写属性
+DEFAULT_ACCESS = "读写"
+
+
+class L5XError(ValueError):
+    """L5X 文件无法解析或 UDT 定义错误"""
+
+
+class UDTMember:
+    """UDT 成员定义"""
+    __slots__ = ("name", "data_type", "dimension", "access", "desc")
+
+    def __init__(self, name, data_type, dimension, access, desc):
+        self.name = name
+        self.data_type = data_type
+        self.dimension = dimension
+        self.access = access
+        self.desc = desc
+
+    def key(self):
+        return (self.name, self.data_type, self.dimension, self.access, self.desc)
+
+
+class UDTDefinition:
+    """UDT 定义：名称、描述和可见成员（隐藏的 BOOL 宿主成员已去掉）"""
+    __slots__ = ("name", "desc", "members")
+
+    def __init__(self, name, desc, members):
+        self.name = name
+        self.desc = desc
+        self.members = members
+
+
+class L5XImportReport:
+    """
+    一次导入的结果
+    written、unchanged 为 UDT 名称列表，skipped 为 (UDT, 成员, 原因)
+    """
+    def __init__(self):
+        self.written = []
+        self.unchanged = []
+        self.skipped = []
+
+    def summary(self):
+        lines = [f"导入完成：生成模板 {len(self.written)} 个，未变化跳过 {len(self.unchanged)} 个，"
+                 f"跳过成员 {len(self.skipped)} 个"]
+        for udt, member, reason in self.skipped:
+            lines.append(f"  跳过 {udt}.{member}：{reason}")
+        return "\n".join(lines)
+
+
+# ---------------- 解析 ----------------
+def _description(element):
+    """元素的 Description 子元素文本，多语言工程优先取 DESCRIPTION_LANG"""
+    desc = element.find("Description")
+    if desc is None:
+        return ""
+    localized = desc.findall("LocalizedDescription")
+    if localized:
+        chosen = next((item for item in localized if item.get("Lang") == DESCRIPTION_LANG), localized[0])
+        return (chosen.text or "").strip()
+    return (desc.text or "").strip()
+
+
+def _parse_datatype(element):
+    """DataType 元素转换为 UDTDefinition"""
+    name = element.get("Name")
+    if not name:
+        raise L5XError("DataType 缺少 Name 属性")
+    members = []
+    for member in element.iterfind("Members/Member"):
+        if member.get("Hidden") == "true":
+            continue
+        try:
+            dimension = int(member.get("Dimension") or 0)
+        except ValueError:
+            raise L5XError(f"{name}.{member.get('Name')} 的 Dimension 不是整数：{member.get('Dimension')}") from None
+        access = member.get("ExternalAccess")
+        members.append(UDTMember(
+            member.get("Name"), member.get("DataType"), dimension,
+            EXTERNAL_ACCESS.get(access, DEFAULT_ACCESS) if access is not None else DEFAULT_ACCESS,
+            _description(member),
+        ))
+    return UDTDefinition(name, _description(element), members)
+
+
+def read_udts(path):
+    """
+    增量解析 L5X 文件，读取所有 UDT 定义
+    DataTypes 以外的元素解析完立即从父元素中移除，读完 DataTypes 后停止解析
+    Returns:
+        {UDT 名称: UDTDefinition}，按文件中的顺序
+    Raises:
+        L5XError：XML 格式错误或不是 L5X 文件
+        OSError：文件读取失败
+    """
+    udts = {}
+    stack = []
+    in_datatypes = False
+    try:
+        for event, element in ET.iterparse(path, events=("start", "end")):
+            if event == "start":
+                if not stack and element.tag != "RSLogix5000Content":
+                    raise L5XError(f"不是 L5X 文件：根元素为 {element.tag}")
+                if element.tag == "DataTypes":
+                    in_datatypes = True
+                stack.append(element)
+                continue
+            stack.pop()
+            if element.tag == "DataType" and in_datatypes:
+                if element.get("Class", "User") == "User":
+                    udt = _parse_datatype(element)
+                    udts[udt.name] = udt
+            elif element.tag == "DataTypes":
+                break
+            elif in_datatypes and stack and stack[-1].tag != "DataTypes":
+                #DataType 内部的元素在 DataType 结束时一起处理
+                continue
+            if stack:
+                stack[-1].remove(element)
+    except ET.ParseError as e:
+        line, column = e.position
+        raise L5XError(f"第 {line} 行第 {column} 列：XML 格式错误") from None
+    return udts
+
+
+# ---------------- 展开 ----------------
+class _Flattener:
+    """UDT 成员树展开和定义哈希，嵌套的 UDT 只计算一次"""
+    def __init__(self, udts, max_array=MAX_ARRAY_ELEMENTS):
+        self.udts = udts
+        self.max_array = max_array
+        self._hashes = {}
+
+    def digest(self, name, path=()):
+        """UDT 定义的哈希，包含引用的 UDT 的哈希"""
+        digest = self._hashes.get(name)
+        if digest is None:
+            if name in path:
+                raise L5XError(f"UDT 循环引用：{' -> '.join(path + (name,))}")
+            udt = self.udts[name]
+            payload = [IMPORT_VERSION, self.max_array, udt.name, udt.desc]
+            for member in udt.members:
+                payload.append(member.key())
+                if member.data_type in self.udts:
+                    payload.append(self.digest(member.data_type, path + (name,)))
+            digest = hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+            self._hashes[name] = digest
+        return digest
+
+    def entries(self, name, skipped):
+        """
+        展开一个 UDT
+        Args:
+            skipped：无法生成变量的成员追加到该列表，元素为 (UDT, 成员, 原因)
+        Returns:
+            [KingSCADAEntry]
+        """
+        entries = []
+        self._expand(name, "", "", None, entries, skipped, (name,))
+        return entries
+
+    def _expand(self, data_type, address, desc, access, entries, skipped, path):
+        """展开一个结构类型的所有成员，address、desc 为上层成员的地址和描述"""
+        if data_type in self.udts:
+            members = [(m.name, m.data_type, m.dimension, m.access, m.desc) for m in self.udts[data_type].members]
+        else:
+            members = [(name, member_type, 0, member_access, name)
+                       for name, member_type, member_access in BUILTIN_STRUCTS[data_type]]
+        for name, member_type, dimension, member_access, member_desc in members:
+            if member_access is None:
+                continue
+            #外层成员只读时内部成员也只读
+            if access == "只读":
+                member_access = access
+            member_address = f"{address}.{name}" if address else name
+            if dimension > self.max_array:
+                skipped.append((path[0], member_address, f"数组长度 {dimension} 超过 {self.max_array}"))
+                continue
+            if dimension:
+                elements = [(f"{member_address}[{i}]", f"{desc}{member_desc}[{i}]") for i in range(dimension)]
+            else:
+                elements = [(member_address, f"{desc}{member_desc}")]
+            for element_address, element_desc in elements:
+                self._expand_member(member_type, element_address, element_desc, member_access,
+                                    entries, skipped, path)
+
+    def _expand_member(self, data_type, address, desc, access, entries, skipped, path):
+        kingscada_type = ATOMIC_TYPES.get(data_type)
+        if kingscada_type is not None:
+            name = "_" + address.replace(".", "_").replace("[", "_").replace("]", "")
+            entries.append(KingSCADAEntry(name, desc, kingscada_type, access, address))
+        elif data_type in self.udts or data_type in BUILTIN_STRUCTS:
+            if data_type in path:
+                raise L5XError(f"UDT 循环引用：{' -> '.join(path + (data_type,))}")
+            self._expand(data_type, address, desc, access, entries, skipped, path + (data_type,))
+        else:
+            skipped.append((path[0], address, f"不支持的数据类型 {data_type}"))
+
+
+# ---------------- 导入 ----------------
+def _load_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if state.get("version") != IMPORT_VERSION:
+        return {}
+    return state.get("udts", {})
+
+
+def _write_json(path, data):
+    """先写入临时文件再改名，避免中途出错留下不完整的文件"""
+    temp_path = path + ".part"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def template_json(entries):
+    """模板 JSON 文本，格式与手工编写的模板相同：每条数据一行"""
+    lines = [json.dumps(entry._asdict(), ensure_ascii=False) for entry in entries]
+    return "[\n  " + ",\n  ".join(lines) + "\n]\n"
+
+
+def import_l5x(base_dir, l5x_path, names=None, force=False, max_array=MAX_ARRAY_ELEMENTS):
+    """
+    从 L5X 文件生成 AB 采集模板，写入 config_kingscada/AB/<UDT 名称>.json
+    Args:
+        base_dir：程序目录
+        l5x_path：L5X 文件路径
+        names：只导入这些 UDT（及其引用的 UDT 的成员），默认导入全部
+        force：忽略导入状态，全部重新生成
+        max_array：数组成员最多展开的元素个数
+    Returns:
+        L5XImportReport
+    Raises:
+        L5XError：L5X 文件错误、指定的 UDT 不存在或生成的模板无效
+        OSError：文件读写失败
+    """
+    udts = read_udts(l5x_path)
+    if names:
+        missing = [name for name in names if name not in udts]
+        if missing:
+            raise L5XError(f"L5X 文件中没有 UDT：{'、'.join(missing)}")
+    selected = list(names) if names else list(udts)
+    logger.info(f"L5X 文件中共有 UDT {len(udts)} 个：{l5x_path}")
+
+    template_dir = os.path.join(base_dir, L5X_CONFIG, L5X_DEVICE)
+    state_path = os.path.join(template_dir, STATE_DIR, STATE_FILE)
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    state = {} if force else _load_state(state_path)
+    flattener = _Flattener(udts, max_array)
+    report = L5XImportReport()
+    for name in selected:
+        digest = flattener.digest(name)
+        filename = f"{name}.json"
+        file_path = os.path.join(template_dir, filename)
+        previous = state.get(name)
+        if previous and previous.get("hash") == digest and os.path.exists(file_path):
+            report.unchanged.append(name)
+            continue
+        if not previous and not force and os.path.exists(file_path):
+            #不是导入生成的同名模板，可能是手工编写的，不覆盖
+            report.skipped.append((name, "*", f"已有同名模板 {filename}，使用 --force 覆盖"))
+            continue
+        skipped = []
+        entries = flattener.entries(name, skipped)
+        report.skipped.extend(skipped)
+        if not entries:
+            report.skipped.append((name, "*", "没有可生成变量的成员"))
+            continue
+        try:
+            compile_template(entries, L5X_CONFIG, L5X_DEVICE)
+        except TemplateError as e:
+            raise L5XError(f"UDT {name} 生成的模板无效：{e}") from e
+        _write_json(file_path, template_json(entries))
+        state[name] = {"hash": digest, "file": filename}
+        report.written.append(name)
+        logger.info(f"已生成模板：{file_path}（{len(entries)} 条）")
+    _write_json(state_path, json.dumps({"version": IMPORT_VERSION, "udts": state}, ensure_ascii=False, indent=2))
+    TemplateStore.get(base_dir).refresh_index((L5X_CONFIG,))
+    return report
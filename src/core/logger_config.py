@@ -1,6 +1,26 @@
+import atexit
 import logging
+import multiprocessing
 import os
+import queue
 import sys
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+#日志格式
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+#单个日志文件最大字节数，超过后轮转为 app.log.1 ~ app.log.N
+LOG_MAX_BYTES = 5 * 1024 * 1024
+#保留的历史日志文件数
+LOG_BACKUP_COUNT = 5
+#各模块默认日志级别 {模块名: 级别}，如 {"src.core.edgetts_manager": logging.WARNING}
+LOG_LEVELS = {}
+#按模块设置日志级别的环境变量，格式：模块名=级别,模块名=级别
+ENV_LOG_LEVELS = "SCADA_LOG_LEVELS"
+
+_listener = None
+#setup_logger 生效的各模块日志级别，传给子进程
+_module_levels = {}
 
 def get_base_dir():
     """获取程序真实所在目录，兼容开发与打包"""
@@ -9,18 +29,96 @@ def get_base_dir():
     else:                               # 普通 Python 运行
         return os.path.dirname(os.path.abspath(sys.argv[0]))
 
-def setup_logger():
+def parse_levels(text):
+    """解析 模块名=级别,模块名=级别 格式的日志级别设置，无效的项忽略"""
+    levels = {}
+    for item in (text or "").split(","):
+        name, _, level = item.partition("=")
+        level = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+def setup_logger(level=logging.INFO, levels=None, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+    """
+    初始化日志系统
+    业务代码的日志只放入队列，由后台线程写入文件和控制台，界面线程和 asyncio 事件循环不会被文件写入阻塞；
+    app.log 按大小轮转。重复调用时直接返回
+    Args:
+        level：根日志级别
+        levels：各模块日志级别 {模块名: 级别}，在 LOG_LEVELS 和环境变量 SCADA_LOG_LEVELS 之后生效
+        max_bytes：单个日志文件最大字节数
+        backup_count：保留的历史日志文件数
+    """
+    global _listener, _module_levels
+    if _listener is not None:
+        return logging.getLogger(__name__)
     base_dir = get_base_dir()
     log_file = os.path.join(base_dir, 'app.log')  # 直接放在 main 同级目录
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s [%(levelname)s] %(message)s',
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')]
+    #打包成无控制台的 exe 时 sys.stderr 为 None
+    if sys.stderr is not None:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logger)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(log_queue))
+    module_levels = dict(LOG_LEVELS)
+    module_levels.update(parse_levels(os.environ.get(ENV_LOG_LEVELS)))
+    module_levels.update(levels or {})
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    _module_levels = module_levels
 
     logging.info("日志系统初始化完成，日志文件路径：%s", log_file)
     return logging.getLogger(__name__)
+
+@contextmanager
+def worker_logging():
+    """
+    为进程池转发子进程的日志
+    子进程中没有写日志的后台线程（fork 时继承的队列无人读取，spawn 时没有任何处理器），日志会被丢弃；
+    这里建立一个跨进程队列，由主进程的线程写入与 setup_logger 相同的文件和控制台
+    用法：
+        with worker_logging() as (initializer, initargs):
+            with ProcessPoolExecutor(..., initializer=initializer, initargs=initargs) as pool:
+    未调用 setup_logger 时 initializer 为 None，子进程保持默认的日志设置
+    """
+    if _listener is None:
+        yield None, ()
+        return
+    log_queue = multiprocessing.Queue()
+    listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        yield init_worker_logger, (log_queue, logging.getLogger().level, _module_levels)
+    finally:
+        listener.stop()
+        log_queue.close()
+        log_queue.join_thread()
+
+def init_worker_logger(log_queue, level, levels):
+    """子进程初始化：日志只放入主进程读取的跨进程队列"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+def stop_logger():
+    """写完队列中剩余的日志并停止后台线程，程序退出时自动调用"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
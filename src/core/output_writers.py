@@ -0,0 +1,292 @@
+"""
+点表输出格式
+所有格式都按块流式写入，内存占用不随行数增长：
+    csv      CSV 文本，编码可选；行计划生成的数据行使用预编码的字节写入（见 row_plan.PlanEncoder）
+    csv.gz   gzip 压缩的 CSV
+    zip      zip 压缩的 CSV（压缩包内一个文件）
+    xlsx     Excel 工作簿，单元格使用内联字符串，不依赖第三方库
+"""
+import codecs
+import csv
+import gzip
+import io
+import os
+import re
+import zipfile
+
+#默认输出编码
+OUTPUT_ENCODING = 'ANSI'
+#“ANSI”指 Windows 系统代码页，程序面向简体中文系统，按 cp936（GBK）处理，其他系统上同样可用
+ANSI_ENCODING = 'cp936'
+#字节写入时的缓冲区大小
+WRITE_BUFFER_SIZE = 1024 * 1024
+#CSV 换行符，与 csv 模块的 excel 方言一致
+LINE_TERMINATOR = "\r\n"
+#压缩级别：兼顾速度和压缩率
+COMPRESS_LEVEL = 6
+#Excel 单个工作表最大行数
+XLSX_MAX_ROWS = 1048576
+#xlsx 单元格 XML 缓存的最大条目数，点表中大部分列是重复的固定值
+XLSX_CELL_CACHE_SIZE = 4096
+
+
+def resolve_encoding(encoding=None):
+    """
+    将编码名称转换为 Python 的编解码器名称，ANSI 转换为 ANSI_ENCODING
+    Raises:
+        LookupError：未知的编码
+    """
+    encoding = encoding or OUTPUT_ENCODING
+    if encoding.upper() == "ANSI":
+        encoding = ANSI_ENCODING
+    return codecs.lookup(encoding).name
+
+
+def byte_safe(encoding):
+    """
+    编码结果能否按片段拼接：ASCII 字符编码为自身，且没有 BOM 或移位状态（utf-16、utf-8-sig、iso2022 等不可以）
+    """
+    try:
+        return ('a",\r\n'.encode(encoding) == b'a",\r\n'
+                and b"\x1b" not in "中文".encode(encoding, 'replace'))
+    except LookupError:
+        return False
+
+
+#需要加引号的字符
+_NEEDS_QUOTE = re.compile('[",\r\n]').search
+
+def csv_field(value):
+    """一个单元格的 CSV 文本，转义规则与 csv.writer 的默认设置（QUOTE_MINIMAL）相同"""
+    if value is None:
+        return ""
+    text = value if value.__class__ is str else str(value)
+    if _NEEDS_QUOTE(text):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def csv_line(row):
+    """一行的 CSV 文本（含换行符），与 csv.writer.writerow 的输出相同"""
+    if len(row) == 1 and csv_field(row[0]) == "":
+        return '""' + LINE_TERMINATOR    #只有一个空单元格时 csv 模块写为 ""
+    return ",".join(map(csv_field, row)) + LINE_TERMINATOR
+
+
+class CSVOutput:
+    """CSV 文本输出"""
+    extension = ".csv"
+
+    def __init__(self, path, encoding=None, name=None):
+        """
+        Args:
+            path：写入的文件路径（可以是临时文件）
+            encoding：文本编码，默认 OUTPUT_ENCODING
+            name：最终的文件名，压缩格式用作包内文件名
+        """
+        self.file = self._open(path, resolve_encoding(encoding), name)
+        self.writer = csv.writer(self.file)
+
+    def _open(self, path, encoding, name):
+        return open(path, 'w', newline='', encoding=encoding)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class EncodedCSVOutput:
+    """
+    字节 CSV 输出
+    数据行已按目标编码预先编码成字节（row_plan.PlanEncoder），直接写入大缓冲区的二进制文件；
+    表头等普通数据行用 csv_line 转义后编码，输出与 CSVOutput 逐字节相同
+    """
+    extension = ".csv"
+
+    def __init__(self, path, encoding=None, name=None):
+        self.encoding = resolve_encoding(encoding)
+        self.file = open(path, 'wb', buffering=WRITE_BUFFER_SIZE)
+
+    def write_rows(self, rows):
+        self.file.write("".join(map(csv_line, rows)).encode(self.encoding))
+
+    def write_bytes(self, data):
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class GzipCSVOutput(CSVOutput):
+    """gzip 压缩的 CSV"""
+    extension = ".csv.gz"
+
+    def _open(self, path, encoding, name):
+        return gzip.open(path, 'wt', compresslevel=COMPRESS_LEVEL, encoding=encoding, newline='')
+
+
+class ZipCSVOutput(CSVOutput):
+    """zip 压缩的 CSV，包内文件名与输出文件同名"""
+    extension = ".zip"
+
+    def _open(self, path, encoding, name):
+        arcname = os.path.splitext(name or os.path.basename(path))[0] + ".csv"
+        self.archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL)
+        #force_zip64：行数未知，允许写入超过 4 GB 的文件
+        self.member = self.archive.open(arcname, 'w', force_zip64=True)
+        return io.TextIOWrapper(self.member, encoding=encoding, newline='')
+
+    def close(self):
+        try:
+            self.file.close()
+        finally:
+            self.archive.close()
+
+
+#XML 1.0 不允许的控制字符
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_XML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def _xlsx_cell(value):
+    """一个单元格：整数和浮点数写为数值，其余写为内联字符串，空值写为空单元格"""
+    if value is None or value == "":
+        return "<c/>"
+    if type(value) in (int, float):
+        return f"<c><v>{value}</v></c>"
+    text = str(value).translate(_XML_ESCAPE)
+    if _XML_ILLEGAL.search(text):
+        text = _XML_ILLEGAL.sub("", text)
+    if text != text.strip():
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+    return f'<c t="inlineStr"><is><t>{text}</t></is></c>'
+
+
+class _CellCache(dict):
+    """单元格 XML 缓存，未命中时生成，条目数达到上限后不再缓存新值"""
+    def __missing__(self, value):
+        cell = _xlsx_cell(value)
+        if len(self) < XLSX_CELL_CACHE_SIZE:
+            self[value] = cell
+        return cell
+
+
+class XLSXOutput:
+    """
+    流式 Excel 输出
+    工作表 XML 边生成边压缩写入，单元格不带坐标、使用内联字符串，不需要共享字符串表，
+    内存占用与行数无关。编码参数对 xlsx 无效（固定 UTF-8）
+    """
+    extension = ".xlsx"
+
+    def __init__(self, path, encoding=None, name=None):
+        self.archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL)
+        self.archive.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        self.archive.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+        self.archive.writestr("xl/workbook.xml", _XLSX_WORKBOOK)
+        self.archive.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        self.member = self.archive.open("xl/worksheets/sheet1.xml", 'w', force_zip64=True)
+        self.file = io.TextIOWrapper(self.member, encoding='utf-8', newline='')
+        self.file.write(_XLSX_SHEET_HEAD)
+        self.count = 0
+        self.cells = _CellCache()
+
+    def write_rows(self, rows):
+        rows = list(rows)
+        self.count += len(rows)
+        if self.count > XLSX_MAX_ROWS:
+            raise ValueError(f"超出 Excel 工作表行数上限 {XLSX_MAX_ROWS}")
+        cell = self.cells.__getitem__
+        self.file.write("".join(["<row>" + "".join(map(cell, row)) + "</row>" for row in rows]))
+
+    def close(self):
+        try:
+            if not self.file.closed:
+                self.file.write(_XLSX_SHEET_TAIL)
+                self.file.close()
+        finally:
+            self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+#格式名称与输出类
+OUTPUT_FORMATS = {
+    "csv": CSVOutput,
+    "csv.gz": GzipCSVOutput,
+    "zip": ZipCSVOutput,
+    "xlsx": XLSXOutput,
+}
+
+
+def get_output(output_format):
+    """
+    根据格式名称获取输出类
+    Raises:
+        ValueError：不支持的格式
+    """
+    try:
+        return OUTPUT_FORMATS[output_format]
+    except KeyError:
+        raise ValueError(f"不支持的输出格式：{output_format}，可选：{'、'.join(OUTPUT_FORMATS)}") from None
@@ -0,0 +1,202 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.csv_manager import CSVManager
+from src.core.jobs import JobError, TARGETS, count_job_rows, load_job_inputs, output_name
+from src.core.logger_config import worker_logging
+from src.core.output_writers import resolve_encoding
+from src.core.row_plan import BEWGSED_HEADERS, KINGSCADA_HEADERS
+
+import logging
+logger = logging.getLogger(__name__)
+
+#合并输出时各目标的表头
+TARGET_HEADERS = {
+    "kingscada": KINGSCADA_HEADERS,
+    "bewgsed": BEWGSED_HEADERS,
+}
+
+
+class ProjectError(Exception):
+    """工程批量生成失败"""
+
+
+def load_manifest(manifest_path):
+    """
+    读取工程清单，相对路径按清单所在目录处理
+    清单格式：
+        {
+            "name": "工程名称（合并输出时的文件名）",
+            "start_id": 1001,
+            "merge": false,
+            "format": "csv（各任务默认的输出格式）",
+            "jobs": [{"target": "kingscada", "device": "SIEMENS", "template": "...", "csv": "...", "inputs": {...}}]
+        }
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    for job in manifest.get("jobs", []):
+        if job.get("csv"):
+            job["csv"] = os.path.join(manifest_dir, job["csv"])
+    return manifest
+
+
+def plan_project(base_dir, manifest):
+    """
+    校验所有任务并分配 TagID 范围
+    父进程只统计各任务的行数（模板条目数 × 设备数据行数），模板和设备数据在工作进程中解析。
+    先保留指定了 start_id 的 KingSCADA 任务的范围，未指定的任务再从清单的 start_id 开始
+    按顺序分配到不与已有范围重叠的位置，所有任务的 TagID 范围不能重叠
+    Returns:
+        已分配 start_id、行数和输出文件名的任务列表
+    Raises:
+        ProjectError：任务参数错误或 TagID 范围重叠
+    """
+    jobs = [dict(job, inputs=dict(job.get("inputs") or {})) for job in manifest.get("jobs", [])]
+    if not jobs:
+        raise ProjectError("工程清单中没有任务")
+    names = {}
+    for i, job in enumerate(jobs):
+        job.setdefault("target", "kingscada")
+        job.setdefault("format", manifest.get("format"))
+        job.setdefault("encoding", manifest.get("encoding"))
+        try:
+            job["rows"] = count_job_rows(base_dir, job)
+        except JobError as e:
+            raise ProjectError(f"第 {i + 1} 个任务：{e}") from e
+        #同名输出文件追加序号
+        name = job.get("name") or output_name(job["device"], job["template"])
+        names[name] = names.get(name, 0) + 1
+        job["name"] = name if names[name] == 1 else f"{name}_{names[name]}"
+
+    kingscada_jobs = [(i, job) for i, job in enumerate(jobs) if job["target"] == "kingscada"]
+    ranges = []
+    for i, job in kingscada_jobs:
+        if "start_id" in job["inputs"]:
+            start_id = int(job["inputs"]["start_id"])
+            ranges.append((start_id, start_id + job["rows"], i))
+    reserved = sorted(ranges)
+    next_id = int(manifest.get("start_id", 1001))
+    for i, job in kingscada_jobs:
+        if "start_id" in job["inputs"]:
+            continue
+        #跳过与已保留范围重叠的位置
+        start_id = next_id
+        for start, end, _ in reserved:
+            if start < start_id + job["rows"] and start_id < end:
+                start_id = end
+        job["inputs"]["start_id"] = str(start_id)
+        ranges.append((start_id, start_id + job["rows"], i))
+        next_id = start_id + job["rows"]
+
+    ranges.sort()
+    for (start_a, end_a, job_a), (start_b, end_b, job_b) in zip(ranges, ranges[1:]):
+        if start_b < end_a:
+            raise ProjectError(f"第 {job_a + 1} 个任务（TagID {start_a}~{end_a - 1}）与"
+                               f"第 {job_b + 1} 个任务（TagID {start_b}~{end_b - 1}）的 TagID 重叠")
+    return jobs
+
+
+def _encoding_name(encoding):
+    """编码的规范名称，用于比较（ANSI 与 cp936、未指定与默认编码视为相同）"""
+    try:
+        return resolve_encoding(encoding)
+    except LookupError:
+        return encoding
+
+
+def _build_job(base_dir, job, part_path=None):
+    """
+    在工作进程中执行一个任务
+    part_path 不为空时只写入不含表头的分段文件并返回行数，否则生成完整点表并返回成功信息
+    """
+    template_data, csv_data, user_inputs = load_job_inputs(base_dir, job)
+    if len(template_data) * len(csv_data) != job["rows"]:
+        #规划后文件被修改，按规划的行数分配的 TagID 范围不再可靠
+        raise JobError(f"模板或设备数据在规划后发生变化（规划 {job['rows']} 行，"
+                       f"实际 {len(template_data) * len(csv_data)} 行），请重新执行")
+    csv_manager = CSVManager(base_dir)
+    if job["target"] == "kingscada":
+        rows = csv_manager.iter_rows_kingscdada(template_data, user_inputs, csv_data)
+    else:
+        rows = csv_manager.iter_rows_bewgsed(template_data, user_inputs, csv_data)
+    if part_path:
+        return csv_manager.write_part(part_path, rows, encoding=job.get("encoding"))
+    _, folder = TARGETS[job["target"]]
+    result = csv_manager.generate_output(folder, job["name"], rows,
+                                         output_format=job.get("format") or "csv", encoding=job.get("encoding"))
+    if not result:
+        raise JobError(csv_manager.last_error or "生成失败")
+    return result
+
+
+def build_project(base_dir, manifest, workers=None, merge=None):
+    """
+    多进程执行工程清单中的所有任务
+    Args:
+        manifest：load_manifest 读取的清单
+        workers：进程数，默认为 CPU 核数
+        merge：是否将同一目标的所有任务合并为一个点表，默认取清单中的 merge
+    Returns:
+        各输出文件的成功信息
+    Raises:
+        ProjectError：任意任务失败
+    """
+    jobs = plan_project(base_dir, manifest)
+    if merge is None:
+        merge = bool(manifest.get("merge", False))
+    #合并输出通过拼接分段文件实现，只支持 CSV
+    if merge and any((job.get("format") or "csv") != "csv" for job in jobs):
+        raise ProjectError("合并输出只支持 csv 格式")
+    part_paths = []
+    merge_encodings = {}
+    if merge:
+        #分段文件按各任务的编码写入，同一目标的任务编码必须相同才能拼接
+        for target in TARGETS:
+            encodings = {_encoding_name(job.get("encoding")) for job in jobs if job["target"] == target}
+            if len(encodings) > 1:
+                raise ProjectError(f"合并输出时 {target} 各任务的编码必须相同：{'、'.join(sorted(encodings))}")
+            merge_encodings[target] = next((job.get("encoding") for job in jobs if job["target"] == target), None)
+        for i, job in enumerate(jobs):
+            _, folder = TARGETS[job["target"]]
+            os.makedirs(os.path.join(base_dir, folder), exist_ok=True)
+            part_paths.append(os.path.join(base_dir, folder, f".{job['name']}.{i}.part"))
+    else:
+        part_paths = [None] * len(jobs)
+
+    results = []
+    errors = []
+    with worker_logging() as (initializer, initargs):
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+            futures = [pool.submit(_build_job, base_dir, job, part_path) for job, part_path in zip(jobs, part_paths)]
+            for i, future in enumerate(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append(f"第 {i + 1} 个任务（{jobs[i]['name']}）：{e}")
+    if errors:
+        for part_path in part_paths:
+            if part_path and os.path.exists(part_path):
+                os.remove(part_path)
+        raise ProjectError("；".join(errors))
+    if not merge:
+        return results
+
+    #按清单顺序合并同一目标的分段文件
+    outputs = []
+    project_name = manifest.get("name", "project")
+    csv_manager = CSVManager(base_dir)
+    for target, (_, folder) in TARGETS.items():
+        indexes = [i for i, job in enumerate(jobs) if job["target"] == target]
+        if not indexes:
+            continue
+        result = csv_manager.merge_parts(
+            folder, f"{project_name}_{target}", TARGET_HEADERS[target],
+            [part_paths[i] for i in indexes], sum(results[i] for i in indexes), encoding=merge_encodings[target]
+        )
+        if not result:
+            raise ProjectError(csv_manager.last_error)
+        outputs.append(result)
+    return outputs
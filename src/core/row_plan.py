@@ -0,0 +1,422 @@
+import logging
+import re
+from itertools import chain, cycle, islice
+
+from src.core.address import AddressEngine, AddressError, parse_bit_address
+from src.core.output_writers import LINE_TERMINATOR, csv_field
+from src.core.template_schema import compile_template
+
+logger = logging.getLogger(__name__)
+
+#KingSCADA 点表表头
+KINGSCADA_HEADERS = ["TagID", "TagName", "Description", "TagType", "TagDataType",
+           "MaxRawValue", "MinRawValue", "MaxValue", "MinValue", "NonLinearTableName",
+           "ConvertType", "IsFilter", "DeadBand", "Unit", "ChannelName",
+           "DeviceName", "ChannelDriver", "DeviceSeries", "DeviceSeriesType", "CollectControl",
+           "CollectInterval", "CollectOffset", "TimeZoneBias", "TimeAdjustment", "Enable",
+           "ForceWrite", "ItemName", "RegName", "RegType", "ItemDataType",
+           "ItemAccessMode", "HisRecordMode", "HisDeadBand", "HisInterval", "TagGroup",
+           "NamespaceIndex", "IdentifierType", "Identifier", "ValueRank", "QueueSize",
+           "DiscardOldest", "MonitoringMode", "TriggerMode", "DeadType", "DeadValue",
+           "UANodePath"
+]
+#固定数据
+KINGSCADA_FIXEDDATA1 = ["0","否","1000","0","0","0","是","否"]
+KINGSCADA_FIXEDDATA2 = ["不记录","0","60"]
+KINGSCADA_FIXEDDATA3 = ["0","0","","-1","1","0","0","0","0","0",""]
+#依据数据类型变化数据
+KINGSCADA_DATATYPE = {
+    "IOFloat": (["1000000000","-1000000000","1000000000","-1000000000","","无","否","0"], "FLOAT"),
+    "IOShort": (["32767","-32767","32767","-32767","","无","否","0"], "SHORT"),
+}
+KINGSCADA_DATATYPE_IODISC = (["","","","","","","",""], "BIT")
+
+#行骨架中每个设备需要填入的列
+COL_TAGID = 0
+COL_TAGNAME = 1
+COL_DESCRIPTION = 2
+COL_ITEMNAME = 26
+COL_TAGGROUP = 34
+
+#采集地址拼接方式
+ADDR_NONE = 0       #无地址
+ADDR_SIEMENS_BIT = 1    #西门子位地址 DBx.y.z
+ADDR_SIEMENS_WORD = 2   #西门子字地址 DBx.y
+ADDR_AB_TAG = 3     #AB 标签地址 TAGx.y
+
+#北控SED 上传点表表头
+BEWGSED_HEADERS = [";IO#FS0序号", "所属通道", "驱动", "所属设备", "点类型",
+           "点名", "描述", "初始值", "单位编码", "引用(云)标签",
+           "提交", "标记", "值域", "权限", "采集周期",
+           "n[0]", "n[1]", "n[2]", "n[3]", "n[4]", "n[5]", "n[6]", "n[7]", "n[8]", "n[9]", "n[10]", "n[11]",
+           "s[0]", "s[1]", "s[2]", "s[3]", "s[4]", "s[5]", "s[6]", "s[7]", "s[8]", "s[9]", "s[10]", "s[11]",
+           "opc.vt", "opc.item", "opc.acc", "io.kind", "io.mode", "io.obj",
+           "io.path", "模拟量>>>取绝对值", "CTPT", "系数标记", "系数倍率",
+           "基数", "基础倍率", "阈值开关", "阈值", "量程变换",
+           "裸数据上限","裸数据下限", "量程上限", "量程下限", "数字量>>>采集取反",
+           "真值描述", "假值描述", "防抖周期"
+]
+#固定数据
+BEWGSED_FIXEDDATA2 = ["","","","0","0","0","0","1000","3"]
+BEWGSED_FIXEDDATA3 = ["0","0","0","0","0","0","0","","","","","","","","","","","","","0","","","0","0","","","0","0","0","0","0","1","0"]
+#依据数据类型变化数据
+BEWGSED_DATATYPE = {
+    "1": ["0","1","1000000000","0","1000000000","0","0","合","分","0"],
+    "2": ["0.001","0","100","0","1000","0","0","","","0"],
+}
+BEWGSED_DATATYPE_OTHER = ["","","","","","","","","",""]
+
+#行骨架中每个设备需要填入的列
+SED_COL_TAGNAME = 5
+SED_COL_DESCRIPTION = 6
+SED_COL_N1 = 16
+
+
+class KingSCADAPlan:
+    """
+    KingSCADA 点表的行计划
+    每条模板数据只编译一次，得到 46 列的行骨架，
+    生成时每个设备只需填入 TagID、TagName、Description、ItemName、TagGroup
+    """
+    headers = KINGSCADA_HEADERS
+    #每个设备需要填入的列，其余列为模板条目的固定值
+    variable_columns = (COL_TAGID, COL_TAGNAME, COL_DESCRIPTION, COL_ITEMNAME, COL_TAGGROUP)
+
+    def __init__(self, template_data, user_inputs):
+        """
+        Args:
+            template_data：编译后的模板（未编译的模板数据在这里编译一次）
+            user_inputs：用户设定的数据
+        Raises:
+            TemplateError：模板结构错误
+        """
+        self.start_id = int(user_inputs['start_id'])
+        self.device = user_inputs['device']
+        self.group_name = user_inputs['group_name']
+        self.group_by_device = user_inputs['group_name_en'] == "启用"
+        #链路相关数据处理
+        if user_inputs['link'] == "COM":
+            ChannelName = f"{user_inputs['link']}{user_inputs['link_com']}"
+        elif user_inputs['link'] == "以太网":
+            ChannelName = f"{user_inputs['link']}<{user_inputs['link_ip']}>"
+        else:
+            ChannelName = ""
+        #设备类型相关数据处理
+        if self.device == "SIEMENS":
+            RegName = "DB"
+            RegType = "3"
+            self.item_prefix = f"DB{user_inputs['db_num']}."
+        elif self.device == "AB":
+            RegName = "TAG"
+            RegType = "0"
+            self.item_prefix = "TAG"
+        else:
+            RegName = ""
+            RegType = ""
+            self.item_prefix = ""
+
+        self.entries = []
+        for tpl in compile_template(template_data, "config_kingscada", self.device):
+            DataType, ItemDataType = KINGSCADA_DATATYPE.get(tpl.type, KINGSCADA_DATATYPE_IODISC)
+            skeleton = (
+                [None, None, None, "用户变量", tpl.type]
+                + DataType
+                + ["", ChannelName, user_inputs['device_name'], user_inputs['channeldriver'], user_inputs['deviceseries']]
+                + KINGSCADA_FIXEDDATA1
+                + [None, RegName, RegType, ItemDataType, tpl.access]
+                + KINGSCADA_FIXEDDATA2
+                + [None]
+                + KINGSCADA_FIXEDDATA3
+            )
+            addr_kind, addr = self._compile_address(tpl)
+            self.entries.append((skeleton, tpl.name, tpl.desc, addr_kind, addr))
+        #西门子地址按整数位偏移批量计算
+        self.address = None
+        if self.device == "SIEMENS":
+            self.address = AddressEngine(
+                self.item_prefix, [(addr_kind == ADDR_SIEMENS_BIT, addr) for _, _, _, addr_kind, addr in self.entries]
+            )
+
+    def _compile_address(self, tpl):
+        """确定模板地址的拼接方式"""
+        if self.device == "SIEMENS":
+            if tpl.type == "IODisc":
+                return ADDR_SIEMENS_BIT, tpl.address
+            return ADDR_SIEMENS_WORD, tpl.address
+        if self.device == "AB" and tpl.address != "":
+            return ADDR_AB_TAG, tpl.address
+        return ADDR_NONE, ""
+
+    def __len__(self):
+        return len(self.entries)
+
+    def parse_base(self, raw):
+        """
+        拼接地址处理，西门子设备必须是 字节 或 字节.位 格式，转换为位偏移
+        Raises:
+            AddressError：拼接地址和设备类型不匹配
+        """
+        if self.device == "SIEMENS":
+            return parse_bit_address(raw)
+        return raw
+
+    def device_values(self, code, desc, base_offset, tag_id):
+        """
+        一个设备每一行需要填入的值，顺序与 variable_columns 一致
+        Args:
+            code：设备代号
+            desc：设备描述
+            base_offset：parse_base 处理后的拼接地址
+            tag_id：该设备第一行的 TagID
+        Returns:
+            [(TagID, TagName, Description, ItemName, TagGroup)]，每条模板数据一项
+        """
+        #是否启用设备分组处理
+        if self.group_by_device:
+            group_name = f"{self.group_name}.{code}"
+        else:
+            group_name = self.group_name
+        if self.address is not None:
+            item_names = self.address.item_names(base_offset)
+        else:
+            prefix = self.item_prefix
+            item_names = [f"{prefix}{base_offset}.{addr}" if addr_kind == ADDR_AB_TAG else ""
+                          for _, _, _, addr_kind, addr in self.entries]
+        return [(tag_id + i, f"{code}{name}", f"{desc}{tpl_desc}", ItemName, group_name)
+                for i, ((_, name, tpl_desc, _, _), ItemName) in enumerate(zip(self.entries, item_names))]
+
+    def device_rows(self, code, desc, base_offset, tag_id):
+        """
+        生成一个设备的所有行，参数同 device_values
+        """
+        rows = []
+        for (skeleton, *_), (TagID, TagName, Description, ItemName, TagGroup) in zip(
+                self.entries, self.device_values(code, desc, base_offset, tag_id)):
+            row = skeleton.copy()
+            row[COL_TAGID] = TagID
+            row[COL_TAGNAME] = TagName
+            row[COL_DESCRIPTION] = Description
+            row[COL_ITEMNAME] = ItemName
+            row[COL_TAGGROUP] = TagGroup
+            rows.append(row)
+        return rows
+
+
+class BEWGSEDPlan:
+    """
+    北控SED 上传点表的行计划
+    每条模板数据只编译一次，生成时每个设备只需填入点名、描述和偏移字节
+    """
+    headers = BEWGSED_HEADERS
+    #每个设备需要填入的列，其余列为模板条目的固定值
+    variable_columns = (SED_COL_TAGNAME, SED_COL_DESCRIPTION, SED_COL_N1)
+
+    def __init__(self, template_data, user_inputs):
+        """
+        Args:
+            template_data：编译后的模板（未编译的模板数据在这里编译一次）
+            user_inputs：用户设定的数据
+        Raises:
+            TemplateError：模板结构错误
+        """
+        self.start_id = 0
+        self.device = user_inputs['device']
+        self.entries = []
+        for tpl in compile_template(template_data, "config_bewgsed", self.device):
+            DataType = BEWGSED_DATATYPE.get(tpl.type, BEWGSED_DATATYPE_OTHER)
+            #设备类型相关数据处理，主要是采集地址拼接
+            if self.device in ("SIEMENS", "AB"):
+                addbyte = int(tpl.addbyte)
+                n2 = user_inputs['db_num']
+                if tpl.type == "2":
+                    n3 = "0"
+                    n4 = tpl.addbit
+                else:
+                    n3 = "7"
+                    n4 = "0" if self.device == "SIEMENS" else tpl.addbit
+            else:
+                addbyte = None
+                n2 = n3 = n4 = ""
+            skeleton = (
+                ["", user_inputs['channel'], user_inputs['drive'], user_inputs['dev_name'], tpl.type, None, None]
+                + BEWGSED_FIXEDDATA2
+                + [None, n2, n3, n4]
+                + BEWGSED_FIXEDDATA3
+                + DataType
+            )
+            self.entries.append((skeleton, tpl.name, tpl.desc, addbyte))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def parse_base(self, raw):
+        """
+        拼接地址处理，SED 的偏移字节必须是整数
+        Raises:
+            AddressError：拼接地址和设备类型不匹配
+        """
+        if self.device == "SIEMENS":
+            try:
+                return int(raw)
+            except (TypeError, ValueError) as e:
+                raise AddressError(e) from e
+        return raw
+
+    def device_values(self, code, desc, base_offset, tag_id=0):
+        """
+        一个设备每一行需要填入的值，顺序与 variable_columns 一致。SED 点表没有 TagID，tag_id 仅为保持接口一致
+        Args:
+            code：设备代号
+            desc：设备描述
+            base_offset：parse_base 处理后的拼接地址
+        Returns:
+            [(点名, 描述, n[1])]，每条模板数据一项
+        """
+        if self.device in ("SIEMENS", "AB"):
+            try:
+                base_int = int(base_offset)
+            except (TypeError, ValueError) as e:
+                raise AddressError(e) from e
+        return [(f"{code}{name}", f"{desc}{tpl_desc}", "" if addbyte is None else base_int + addbyte)
+                for _, name, tpl_desc, addbyte in self.entries]
+
+    def device_rows(self, code, desc, base_offset, tag_id=0):
+        """
+        生成一个设备的所有行，参数同 device_values
+        """
+        rows = []
+        for (skeleton, *_), (name, description, n1) in zip(self.entries, self.device_values(code, desc, base_offset)):
+            row = skeleton.copy()
+            row[SED_COL_TAGNAME] = name
+            row[SED_COL_DESCRIPTION] = description
+            row[SED_COL_N1] = n1
+            rows.append(row)
+        return rows
+
+
+class PlanRows:
+    """
+    按行计划逐个设备生成的数据行，供流式写入使用
+    迭代时得到完整的数据行；iter_values 只生成每个设备变化的列，供 PlanEncoder 预编码写入
+    迭代过程中拼接地址和设备类型不匹配时抛出 AddressError
+    """
+    def __init__(self, plan, csv_data, start_id=None):
+        """
+        Args:
+            plan：KingSCADAPlan 或 BEWGSEDPlan
+            csv_data：设备数据
+            start_id：第一个设备的 TagID，默认为 plan.start_id（分片生成时为分片的起始 TagID）
+        """
+        self.plan = plan
+        self.csv_data = csv_data
+        self.start_id = plan.start_id if start_id is None else start_id
+
+    def __len__(self):
+        return len(self.plan) * len(self.csv_data)
+
+    def _iter_devices(self, make):
+        plan = self.plan
+        tag_id = self.start_id
+        for device_row in self.csv_data:
+            try:
+                base_offset = plan.parse_base(device_row['拼接地址'])
+            except KeyError as e:
+                raise AddressError(f"缺少列 {e}") from e
+            rows = make(device_row['设备代号'], device_row['设备描述'], base_offset, tag_id)
+            tag_id += len(rows)
+            yield rows
+
+    def __iter__(self):
+        for rows in self._iter_devices(self.plan.device_rows):
+            yield from rows
+
+    def iter_values(self):
+        """逐个设备生成 plan.device_values 的结果"""
+        return self._iter_devices(self.plan.device_values)
+
+
+def iter_plan_rows(plan, csv_data, start_id=None):
+    """
+    按行计划逐个设备生成数据行，参数见 PlanRows
+    """
+    return PlanRows(plan, csv_data, start_id)
+
+
+#预编码写入时变化列中需要转义的字符，同 csv_field
+_NEEDS_ESCAPE = re.compile('[",\r\n]').search
+
+
+class PlanEncoder:
+    """
+    行计划的预编码写入
+    每条模板数据的固定列在这里转义并编码一次，得到以变化列分隔的字节片段，
+    生成时只需转义和编码每个设备变化的几列，再用字节格式化拼接成整行。
+    输出与 csv.writer 写入同样的数据行逐字节相同
+    """
+    def __init__(self, plan, encoding):
+        """
+        Args:
+            plan：KingSCADAPlan 或 BEWGSEDPlan
+            encoding：编解码器名称，必须满足 output_writers.byte_safe
+        """
+        self.encoding = encoding
+        self.width = len(plan.variable_columns)
+        columns = set(plan.variable_columns)
+        self.templates = []
+        for skeleton, *_ in plan.entries:
+            #相邻两个变化列之间的固定列连同分隔符作为一个片段，变化列处为 %s
+            fragments = []
+            text = ""
+            for col, value in enumerate(skeleton):
+                if col:
+                    text += ","
+                if col in columns:
+                    fragments.append(text)
+                    text = ""
+                else:
+                    text += csv_field(value)
+            fragments.append(text + LINE_TERMINATOR)
+            self.templates.append(b"%s".join(fragment.encode(encoding).replace(b"%", b"%%") for fragment in fragments))
+
+    def encode_values(self, values):
+        """
+        一个或多个设备所有变化列的转义和编码
+        各单元格用 \\x00 连接后只编码一次再按 \\x00 拆分（可按字节拼接的编码中 \\x00 只能由 \\x00 编码得到）；
+        没有需要加引号的字符时不逐个转义
+        Returns:
+            编码后的单元格列表，按行依次排列
+        """
+        cells = [value if value.__class__ is str else str(value) for value in chain.from_iterable(values)]
+        text = "\x00".join(cells)
+        if text.count("\x00") >= len(cells):
+            #单元格本身含有 \x00 时逐个编码
+            return [csv_field(cell).encode(self.encoding) for cell in cells]
+        if _NEEDS_ESCAPE(text):
+            text = "\x00".join(map(csv_field, cells))
+        return text.encode(self.encoding).split(b"\x00")
+
+    def encode_devices(self, devices):
+        """
+        一块设备的所有数据行编码为字节，整块的变化列只拼接、转义检查和编码一次
+        Args:
+            devices：plan.device_values 结果的列表，每个设备一项
+        Returns:
+            编码后的字节数据
+        """
+        cells = iter(self.encode_values(chain.from_iterable(devices)))
+        return b"".join([template % row for template, row in zip(cycle(self.templates), zip(*[cells] * self.width))])
+
+    def iter_chunks(self, plan_rows, chunk_size):
+        """
+        逐块生成编码后的数据
+        Yields:
+            (字节数据, 行数)，每块至少 chunk_size 行（最后一块除外）
+        """
+        rows_per_device = len(self.templates) or 1
+        devices_per_chunk = -(-chunk_size // rows_per_device)
+        values = plan_rows.iter_values()
+        while True:
+            devices = list(islice(values, devices_per_chunk))
+            if not devices:
+                break
+            yield self.encode_devices(devices), len(devices) * len(self.templates)
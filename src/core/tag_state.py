@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+
+from src.core.row_plan import COL_TAGID, AddressError
+
+import logging
+logger = logging.getLogger(__name__)
+
+#状态文件保存在输出目录下的子目录中
+STATE_DIR = ".state"
+STATE_VERSION = 1
+#数据行摘要长度（字节）
+DIGEST_SIZE = 8
+
+#行状态
+ROW_NEW = "new"
+ROW_CHANGED = "changed"
+ROW_UNCHANGED = "unchanged"
+
+
+def source_key(source):
+    """
+    设备数据文件的标识：文件名加完整路径的摘要
+    同一模板生成的不同设备清单各自保存状态，互不覆盖
+    """
+    path = os.path.normcase(os.path.abspath(source))
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.blake2b(path.encode('utf-8'), digest_size=DIGEST_SIZE).hexdigest()
+    return f"{stem}_{digest}"
+
+
+def state_path(base_dir, folder, file_name, source=None):
+    """
+    点表对应的状态文件路径
+    Args:
+        source：设备数据文件路径，不为空时按（点表名称, 设备数据文件）区分状态，为空时只按点表名称
+    """
+    name = f"{file_name}.{source_key(source)}" if source else file_name
+    return os.path.join(base_dir, folder, STATE_DIR, f"{name}.json")
+
+
+def row_digest(row):
+    """数据行除 TagID 以外所有列的摘要"""
+    data = "\x1f".join(str(value) for value in row[COL_TAGID + 1:]).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+
+class TagState:
+    """
+    上一次生成的变量状态
+    以（设备代号, 模板变量名）为键，记录分配的 TagID 和数据行摘要，
+    增量生成时已有变量沿用原 TagID，新变量从 next_id 开始分配
+    """
+    def __init__(self, path, tags=None, next_id=None):
+        self.path = path
+        self.tags = tags or {}
+        self.next_id = next_id
+
+    @classmethod
+    def load(cls, path):
+        """读取状态文件，文件不存在或损坏时返回空状态"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != STATE_VERSION:
+                raise ValueError(f"版本不匹配：{data.get('version')}")
+            tags = {tuple(key.split("\x1f", 1)): tuple(value) for key, value in data["tags"].items()}
+            return cls(path, tags, data["next_id"])
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"状态文件无效，按首次生成处理：{path}：{e}")
+            return cls(path)
+
+    def save(self):
+        """写入临时文件后替换，避免中途出错留下不完整的状态"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            "version": STATE_VERSION,
+            "next_id": self.next_id,
+            "tags": {"\x1f".join(key): list(value) for key, value in self.tags.items()},
+        }
+        temp_path = self.path + ".part"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+
+class IncrementalRun:
+    """
+    一次增量生成
+    迭代时按设备生成完整点表的数据行，TagID 取自状态文件，
+    同时收集新增和变化的行（delta_rows）以及已删除的变量（removed），
+    输出成功后调用 commit() 保存新的状态
+    """
+    def __init__(self, plan, csv_data, state):
+        """
+        Args:
+            plan：KingSCADAPlan
+            csv_data：设备数据
+            state：上一次生成的 TagState
+        """
+        self.plan = plan
+        self.csv_data = csv_data
+        self.state = state
+        self.tags = {}
+        self.delta_rows = []
+        self.counts = {ROW_NEW: 0, ROW_CHANGED: 0, ROW_UNCHANGED: 0}
+        self.removed = []
+        #新变量的 TagID 不与上一次分配过的重复
+        self.next_id = max(plan.start_id, state.next_id or plan.start_id)
+
+    def __iter__(self):
+        old_tags = self.state.tags
+        for device_row in self.csv_data:
+            try:
+                base_offset = self.plan.parse_base(device_row['拼接地址'])
+            except KeyError as e:
+                raise AddressError(f"缺少列 {e}") from e
+            code = device_row['设备代号']
+            rows = self.plan.device_rows(code, device_row['设备描述'], base_offset, 0)
+            for row, entry in zip(rows, self.plan.entries):
+                key = (code, entry[1])
+                digest = row_digest(row)
+                old = old_tags.get(key)
+                if key in self.tags:
+                    #设备代号重复，只能分配新的 TagID，不记录到状态中
+                    logger.warning(f"设备代号重复：{code}{entry[1]}")
+                    row[COL_TAGID] = self._allocate()
+                    status = ROW_NEW
+                else:
+                    if old is None:
+                        row[COL_TAGID] = self._allocate()
+                        status = ROW_NEW
+                    else:
+                        row[COL_TAGID] = old[0]
+                        status = ROW_UNCHANGED if old[1] == digest else ROW_CHANGED
+                    self.tags[key] = (row[COL_TAGID], digest)
+                self.counts[status] += 1
+                if status != ROW_UNCHANGED:
+                    self.delta_rows.append(row)
+                yield row
+        self.removed = [key for key in old_tags if key not in self.tags]
+
+    def _allocate(self):
+        tag_id = self.next_id
+        self.next_id += 1
+        return tag_id
+
+    def summary(self):
+        """增量统计信息"""
+        return (f"新增 {self.counts[ROW_NEW]} 行，变化 {self.counts[ROW_CHANGED]} 行，"
+                f"未变 {self.counts[ROW_UNCHANGED]} 行，删除 {len(self.removed)} 个变量")
+
+    def commit(self):
+        """保存本次生成的状态"""
+        self.state.tags = self.tags
+        self.state.next_id = self.next_id
+        self.state.save()
@@ -1,43 +1,221 @@
 import os
 import json
 import logging
+import threading
+
+from src.core import instrument
+from src.core.template_schema import TemplateError, compile_template
 
 logger = logging.getLogger(__name__)
 
+#需要建立索引的模板目录
+CONFIG_DIRS = ("config_kingscada", "config_bewgsed")
+#后台刷新目录索引的间隔（秒）
+INDEX_REFRESH_INTERVAL = 30
+
+
+class Template:
+    """
+    已解析并编译过的模板
+    entries 为 CompiledTemplate（不可变的条目元组），mtime_ns 和 size 用于判断文件是否被修改
+    """
+    def __init__(self, config, device_type, filename, entries, mtime_ns, size):
+        self.config = config
+        self.device_type = device_type
+        self.filename = filename
+        self.entries = entries
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+    @property
+    def key(self):
+        return (self.config, self.device_type, self.filename)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class TemplateStore:
+    """
+    同一程序目录下所有 TemplateManager 共用的模板缓存和目录索引
+    模板缓存以 (config, device, filename) 为键，文件修改时间或大小变化后重新加载
+    """
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, base_dir):
+        """获取某个程序目录对应的共享实例"""
+        with cls._stores_lock:
+            store = cls._stores.get(base_dir)
+            if store is None:
+                store = cls(base_dir)
+                cls._stores[base_dir] = store
+            return store
+
+    @classmethod
+    def stop_all(cls, timeout=None):
+        """停止所有共享实例的后台刷新线程，程序退出时调用"""
+        with cls._stores_lock:
+            stores = list(cls._stores.values())
+        for store in stores:
+            store.stop_refresher(timeout)
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._index = {}
+        self._refresher = None
+        self._stop = threading.Event()
+        self.refresh_index()
+
+    # ---------------- 目录索引 ----------------
+    def _scan_config(self, config):
+        """扫描一个模板目录，返回 {设备类型: [模板文件]}"""
+        config_dir = os.path.join(self.base_dir, config)
+        if not os.path.exists(config_dir):
+            return None
+        index = {}
+        for device in os.listdir(config_dir):
+            device_path = os.path.join(config_dir, device)
+            if os.path.isdir(device_path):
+                index[device] = [f for f in os.listdir(device_path) if f.endswith('.json')]
+        return index
+
+    def refresh_index(self, configs=CONFIG_DIRS):
+        """重新扫描模板目录并替换索引"""
+        for config in configs:
+            try:
+                index = self._scan_config(config)
+            except OSError as e:
+                logger.warning(f"扫描模板目录失败：{config}：{e}")
+                continue
+            with self._lock:
+                if index is None:
+                    self._index.pop(config, None)
+                else:
+                    self._index[config] = index
+
+    def start_refresher(self, interval=INDEX_REFRESH_INTERVAL):
+        """启动后台线程定时刷新目录索引"""
+        with self._lock:
+            if self._refresher is not None or not interval:
+                return
+            self._stop.clear()
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, args=(interval,), name="TemplateIndexRefresher", daemon=True
+            )
+        self._refresher.start()
+
+    def stop_refresher(self, timeout=None):
+        """停止后台刷新线程，之后可再次调用 start_refresher 启动"""
+        with self._lock:
+            refresher, self._refresher = self._refresher, None
+            self._stop.set()
+        if refresher is not None:
+            refresher.join(timeout)
+
+    def _refresh_loop(self, interval):
+        while not self._stop.wait(interval):
+            with self._lock:
+                configs = tuple(self._index)
+            self.refresh_index(configs)
+
+    def device_types(self, config):
+        """获取索引中的设备类型列表，索引中没有时直接扫描目录"""
+        with self._lock:
+            index = self._index.get(config)
+        if index is None:
+            self.refresh_index((config,))
+            with self._lock:
+                index = self._index.get(config)
+        return sorted(index) if index is not None else None
+
+    def templates(self, config, device_type):
+        """获取索引中某个设备类型的模板文件列表"""
+        with self._lock:
+            files = self._index.get(config, {}).get(device_type)
+        if files is None:
+            self.refresh_index((config,))
+            with self._lock:
+                files = self._index.get(config, {}).get(device_type)
+        return list(files) if files is not None else None
+
+    # ---------------- 模板缓存 ----------------
+    def load(self, config, device_type, filename):
+        """
+        加载并编译模板，文件未修改时直接返回缓存
+        Raises:
+            OSError：文件读取失败
+            TemplateError：JSON 解析失败或模板结构错误，信息中包含出错位置
+        """
+        file_path = os.path.join(self.base_dir, config, device_type, filename)
+        st = os.stat(file_path)
+        key = (config, device_type, filename)
+        with self._lock:
+            template = self._cache.get(key)
+        if template is not None and template.mtime_ns == st.st_mtime_ns and template.size == st.st_size:
+            return template
+
+        with open(file_path, 'r', encoding='utf-8') as f:
+            try:
+                entries = json.load(f)
+            except json.JSONDecodeError as e:
+                raise TemplateError(f"JSON 格式错误：{e.msg}", line=e.lineno, column=e.colno) from None
+        entries = compile_template(entries, config, device_type)
+        template = Template(config, device_type, filename, entries, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            self._cache[key] = template
+        logger.info(f"已加载模板文件：{file_path}")
+        return template
+
+
 class TemplateManager:
     """
     负责管理设备类型、模板文件加载和数据存储
     """
-    def __init__(self, base_dir):
+    def __init__(self, base_dir, refresh_interval=INDEX_REFRESH_INTERVAL):
         self.base_dir = base_dir
         self.template_data = []
+        self.store = TemplateStore.get(base_dir)
+        self.store.start_refresher(refresh_interval)
 
     def get_device_types(self, config = "config_kingscada"):
         """获取 目录下的设备类型列表"""
-        tag_config_dir = os.path.join(self.base_dir, config)
-        if not os.path.exists(tag_config_dir):
-            os.makedirs(tag_config_dir)
+        device_types = self.store.device_types(config)
+        if device_types is None:
+            tag_config_dir = os.path.join(self.base_dir, config)
+            os.makedirs(tag_config_dir, exist_ok=True)
             logger.warning(f"tag_config 目录不存在，已自动创建：{tag_config_dir}")
-        return [d for d in os.listdir(tag_config_dir)
-                if os.path.isdir(os.path.join(tag_config_dir, d))]
+            self.store.refresh_index((config,))
+            device_types = []
+        return device_types
 
     def get_templates_by_device(self, device_type,config = "config_kingscada" ):
         """列出某个设备类型下的所有 json 模板"""
-        device_path = os.path.join(self.base_dir, config, device_type)
-        if not os.path.exists(device_path):
-            logger.error(f"设备目录不存在：{device_path}")
+        templates = self.store.templates(config, device_type)
+        if templates is None:
+            logger.error(f"设备目录不存在：{os.path.join(self.base_dir, config, device_type)}")
             return []
-        return [f for f in os.listdir(device_path) if f.endswith('.json')]
+        return templates
 
-    def load_template(self, device_type, filename, config = "config_kingscada"):
-        """加载选中的模板 JSON 文件"""
-        file_path = os.path.join(self.base_dir, config, device_type, filename, )
-        logger.info(f"打开模板目录：{file_path}")
+    def get_template(self, device_type, filename, config = "config_kingscada"):
+        """
+        获取已解析并编译过的模板对象，加载失败时返回 None
+        """
+        file_path = os.path.join(self.base_dir, config, device_type, filename)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                self.template_data = json.load(f)
-            logger.info(f"已加载模板文件：{file_path}")
-        except Exception as e:
+            return self.store.load(config, device_type, filename)
+        except TemplateError as e:
+            logger.error(f"模板文件格式错误：{file_path}：{e}")
+        except Exception:
             logger.exception(f"加载模板文件失败：{file_path}")
-            self.template_data = []
+        return None
+
+    def load_template(self, device_type, filename, config = "config_kingscada"):
+        """加载选中的模板 JSON 文件，返回编译后的条目元组，失败时返回空列表"""
+        with instrument.timer("template.load"):
+            template = self.get_template(device_type, filename, config)
+        self.template_data = template.entries if template is not None else []
         return self.template_data
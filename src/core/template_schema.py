@@ -0,0 +1,153 @@
+"""
+模板结构定义和编译
+模板文件在加载时校验一次并编译为不可变的条目元组：字段统一为字符串
+（JSON 中的地址可能写成数字 0.1、48，编译后为 "0.1"、"48"），
+地址按设备类型检查格式。生成点表时直接使用编译结果，不再逐行检查
+"""
+from collections import namedtuple
+
+from src.core.address import AddressError, parse_bit_address
+
+#KingSCADA 采集模板条目
+KingSCADAEntry = namedtuple("KingSCADAEntry", ("name", "desc", "type", "access", "address"))
+#北控SED 上传模板条目
+BEWGSEDEntry = namedtuple("BEWGSEDEntry", ("name", "desc", "type", "addbyte", "addbit"))
+
+#模板目录对应的条目类型
+ENTRY_TYPES = {
+    "config_kingscada": KingSCADAEntry,
+    "config_bewgsed": BEWGSEDEntry,
+}
+#KingSCADA 变量读写属性
+KINGSCADA_ACCESS = ("只读", "只写", "读写")
+#KingSCADA 变量类型：row_plan.KINGSCADA_DATATYPE 的键和 IODisc，以及已有模板使用的 IOLong（按 IODisc 的数据类型输出）
+KINGSCADA_TYPES = ("IODisc", "IOShort", "IOLong", "IOFloat")
+#北控SED 点类型，与 row_plan.BEWGSED_DATATYPE 的键一致：1 数字量，2 模拟量
+BEWGSED_TYPES = ("1", "2")
+#需要检查地址格式的设备类型
+ADDRESS_DEVICES = ("SIEMENS", "AB")
+
+
+class TemplateError(ValueError):
+    """
+    模板文件格式错误
+    index 为出错条目的序号（从 0 开始），field 为出错字段，line、column 为 JSON 语法错误的位置
+    """
+    def __init__(self, message, index=None, field=None, line=None, column=None):
+        self.index = index
+        self.field = field
+        self.line = line
+        self.column = column
+        location = ""
+        if line is not None:
+            location = f"第 {line} 行第 {column} 列："
+        elif index is not None:
+            location = f"第 {index + 1} 条" + (f" {field}" if field else "") + "："
+        super().__init__(f"{location}{message}")
+
+
+class CompiledTemplate(tuple):
+    """
+    编译后的模板：不可变的条目元组
+    config、device 记录编译时使用的模板目录和设备类型，相同时不再重复编译
+    """
+    def __new__(cls, entries, config, device):
+        self = super().__new__(cls, entries)
+        self.config = config
+        self.device = device
+        return self
+
+    def __reduce__(self):
+        return (CompiledTemplate, (tuple(self), self.config, self.device))
+
+
+def _text(item, index, field, required=False):
+    """读取字段并转换为字符串，数字按 JSON 中的写法转换"""
+    value = item[field]
+    if isinstance(value, str):
+        text = value
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        text = str(value)
+    else:
+        raise TemplateError(f"应为字符串或数字，实际为 {type(value).__name__}", index, field)
+    if required and not text.strip():
+        raise TemplateError("不能为空", index, field)
+    return text
+
+
+def _compile_kingscada(item, index, device):
+    entry = KingSCADAEntry(
+        _text(item, index, "name", required=True),
+        _text(item, index, "desc"),
+        _text(item, index, "type", required=True),
+        _text(item, index, "access", required=True),
+        _text(item, index, "address"),
+    )
+    if entry.type not in KINGSCADA_TYPES:
+        raise TemplateError(f"应为 {'、'.join(KINGSCADA_TYPES)} 之一，实际为 {entry.type}", index, "type")
+    if entry.access not in KINGSCADA_ACCESS:
+        raise TemplateError(f"应为 {'、'.join(KINGSCADA_ACCESS)} 之一，实际为 {entry.access}", index, "access")
+    if device == "SIEMENS":
+        try:
+            bits = parse_bit_address(entry.address)
+        except AddressError as e:
+            raise TemplateError(str(e), index, "address") from None
+        #字地址只取字节部分，带位号时生成的地址与模板不符
+        if entry.type != "IODisc" and bits & 7:
+            raise TemplateError(f"{entry.type} 变量的地址不能带位号：{entry.address}", index, "address")
+    return entry
+
+
+def _compile_bewgsed(item, index, device):
+    entry = BEWGSEDEntry(
+        _text(item, index, "name", required=True),
+        _text(item, index, "desc"),
+        _text(item, index, "type", required=True),
+        _text(item, index, "addbyte"),
+        _text(item, index, "addbit"),
+    )
+    if entry.type not in BEWGSED_TYPES:
+        raise TemplateError(f"应为 {'、'.join(BEWGSED_TYPES)} 之一，实际为 {entry.type}", index, "type")
+    if device in ADDRESS_DEVICES:
+        for field in ("addbyte", "addbit"):
+            if not getattr(entry, field).isdigit():
+                raise TemplateError(f"应为非负整数，实际为 {getattr(entry, field)!r}", index, field)
+    return entry
+
+_COMPILERS = {
+    "config_kingscada": _compile_kingscada,
+    "config_bewgsed": _compile_bewgsed,
+}
+
+
+def compile_template(entries, config, device):
+    """
+    校验模板数据并编译为不可变的条目元组
+    Args:
+        entries：模板 JSON 解析后的列表（或已编译的模板）
+        config：模板目录，config_kingscada 或 config_bewgsed
+        device：设备类型，决定地址格式检查
+    Returns:
+        CompiledTemplate，已是相同目录和设备类型的编译结果时直接返回
+    Raises:
+        TemplateError：模板结构错误，信息中包含条目序号和字段
+    """
+    if isinstance(entries, CompiledTemplate) and entries.config == config and entries.device == device:
+        return entries
+    entry_type = ENTRY_TYPES.get(config)
+    if entry_type is None:
+        raise TemplateError(f"未知的模板目录：{config}")
+    if not isinstance(entries, (list, tuple)):
+        raise TemplateError("模板内容必须是列表")
+    compile_entry = _COMPILERS[config]
+    compiled = []
+    for index, item in enumerate(entries):
+        if isinstance(item, tuple) and hasattr(item, "_asdict"):
+            item = item._asdict()
+        if not isinstance(item, dict):
+            raise TemplateError("模板数据不是对象", index)
+        missing = [field for field in entry_type._fields if field not in item]
+        if missing:
+            raise TemplateError(f"缺少字段 {'、'.join(missing)}", index)
+        compiled.append(compile_entry(item, index, device))
+    return CompiledTemplate(compiled, config, device)
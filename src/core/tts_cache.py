@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import logging
+logger = logging.getLogger(__name__)
+
+#edge_tts 默认输出的音频格式，参与缓存键计算
+OUTPUT_FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+#语音缓存占用空间上限（字节）
+SYNTH_CACHE_MAX_BYTES = 500 * 1024 * 1024
+#缓存文件扩展名
+CACHE_SUFFIX = ".audio"
+
+
+class SynthesisCache:
+    """
+    按内容寻址的语音合成缓存
+    缓存键为 (文本, 语音, 语速, 音高, 输出格式) 的哈希，即实际传给语音服务的全部参数，
+    占用空间超过上限时按最近最少使用的顺序淘汰
+    """
+    def __init__(self, cache_dir, max_bytes=SYNTH_CACHE_MAX_BYTES):
+        """
+        :param cache_dir: 缓存目录
+        :param max_bytes: 缓存占用空间上限
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = None    #key -> 文件大小，按使用时间从旧到新排列
+        self._total = 0
+
+    @staticmethod
+    def make_key(text, voice, rate="+0%", pitch="+0Hz", output_format=OUTPUT_FORMAT):
+        """
+        计算缓存键
+        """
+        payload = json.dumps([text, voice, rate, pitch, output_format], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}{CACHE_SUFFIX}"
+
+    def _load_entries(self):
+        """首次使用时扫描缓存目录，按修改时间恢复使用顺序"""
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        self._total = 0
+        if not self.cache_dir.exists():
+            return
+        files = []
+        for path in self.cache_dir.glob(f"*{CACHE_SUFFIX}"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, path.stem, st.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total += size
+
+    def fetch(self, key, dest):
+        """
+        缓存命中时将缓存文件硬链接（不支持时复制）到 dest
+        :return: 是否命中
+        """
+        with self._lock:
+            self._load_entries()
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+        src = self._path(key)
+        dest = Path(dest)
+        temp = dest.with_name(dest.name + ".part")
+        try:
+            if temp.exists():
+                temp.unlink()
+            try:
+                os.link(src, temp)
+            except OSError:
+                shutil.copyfile(src, temp)
+            os.replace(temp, dest)
+            os.utime(src)   #更新使用时间，重启后仍能恢复淘汰顺序
+        except OSError as e:
+            #缓存文件被外部删除或无法读取，按未命中处理
+            logger.warning(f"读取语音缓存失败，重新合成：{e}")
+            try:
+                temp.unlink(missing_ok=True)
+            except OSError:
+                pass
+            if not src.exists():
+                with self._lock:
+                    size = self._entries.pop(key, 0)
+                    self._total -= size
+            return False
+        return True
+
+    def store(self, key, src):
+        """
+        将合成好的文件复制到缓存，并淘汰超出上限的旧缓存
+        """
+        path = self._path(key)
+        temp = path.with_name(path.name + ".tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(src, temp)
+            os.replace(temp, path)
+            size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"写入语音缓存失败：{e}")
+            return
+        with self._lock:
+            self._load_entries()
+            self._total += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的缓存，直到占用空间不超过上限"""
+        while self._total > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            logger.debug(f"淘汰语音缓存：{key}")
@@ -0,0 +1,80 @@
+import asyncio
+import random
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+#请求耗时低于该值（秒）时认为服务状态良好，可以增加并发
+LATENCY_TARGET = 5.0
+#出错时并发数乘以该系数
+DECREASE_FACTOR = 0.5
+#两次降低并发之间的最短间隔（秒），避免同一波错误把并发连续减半
+DECREASE_COOLDOWN = 1.0
+#重试退避的基础时间和上限（秒）
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+
+
+class AdaptiveLimiter:
+    """
+    AIMD（加性增、乘性减）自适应并发控制
+    默认从最大并发数开始，与固定并发相同；请求出错时并发上限减半，
+    之后请求成功且耗时正常时，每完成约一个并发窗口的请求，并发上限加 1，直到恢复到最大并发数
+    """
+    def __init__(self, maximum=20, minimum=1, initial=None,
+                 latency_target=LATENCY_TARGET, decrease_factor=DECREASE_FACTOR,
+                 decrease_cooldown=DECREASE_COOLDOWN):
+        """
+        :param maximum: 最大并发数
+        :param minimum: 最小并发数
+        :param initial: 初始并发数，默认为最大并发数
+        :param latency_target: 判断服务状态良好的请求耗时（秒）
+        :param decrease_factor: 出错时的并发缩减系数
+        :param decrease_cooldown: 两次缩减之间的最短间隔（秒）
+        """
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        if initial is None:
+            initial = self.maximum
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.in_flight = 0
+        self.peak = int(self.limit)
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        """等待可用的并发名额"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, ok, latency):
+        """
+        归还并发名额并根据结果调整并发上限
+        :param ok: 请求是否成功
+        :param latency: 请求耗时（秒）
+        """
+        async with self._cond:
+            self.in_flight -= 1
+            if not ok:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self._last_decrease = now
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    logger.info(f"语音请求出错，并发降至 {int(self.limit)}")
+            elif latency <= self.latency_target:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.peak = max(self.peak, int(self.limit))
+            self._cond.notify_all()
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """
+    带随机抖动的指数退避时间（full jitter）
+    :param attempt: 已失败的次数，从 0 开始
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
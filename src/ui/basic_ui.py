@@ -113,4 +113,57 @@ class BasicUI:
                 "frame": group_frame,
                 "btn": btn,
             }
-        
\ No newline at end of file
+        
+    def add_progress(
+            self, parent, row, col=0,
+            cancel_command="", length=100, colspan=1, sticky='w'
+        ):
+        """
+        添加一组 [进度条 + 进度文字 + 取消按钮] 控件，默认隐藏，返回 dict 以便后续控制。
+        - parent: 父容器
+        - row, col: 放置在父容器的 grid 行列
+        - cancel_command: 取消按钮调用的函数
+        - length: 进度条长度
+        - colspan: 该组控件在父容器上跨越的列数
+        - sticky: 对齐方式（默认左对齐）
+        """
+        group_frame = ttk.Frame(parent)
+        group_frame.grid(row=row, column=col, columnspan=colspan, sticky=sticky, padx=5, pady=3)
+
+        bar = ttk.Progressbar(group_frame, mode='determinate', length=length)
+        bar.grid(row=0, column=0, sticky='w')
+        var = tk.StringVar()
+        label = ttk.Label(group_frame, textvariable=var)
+        label.grid(row=0, column=1, sticky='w', padx=5)
+        btn = ttk.Button(group_frame, text="取消", command=cancel_command, width=4)
+        btn.grid(row=0, column=2, sticky='w')
+        group_frame.grid_remove()
+
+        return {
+            "frame": group_frame,
+            "bar": bar,
+            "var": var,
+            "btn": btn
+        }
+
+    def update_progress(self, progress, done, total, rate, eta):
+        """
+        刷新进度控件：已完成/总数、每秒条数和预计剩余时间
+        """
+        progress["bar"]["maximum"] = total or 1
+        progress["bar"]["value"] = done
+        text = f"{done}/{total} {rate:.0f}条/秒"
+        if eta is not None:
+            text += f" 剩余{eta:.0f}秒"
+        progress["var"].set(text)
+
+    def show_count(self, frame, title, total, loaded):
+        """
+        在 LabelFrame 标题中显示表格行数，未全部加载时同时显示已加载行数
+        """
+        if not total:
+            frame.configure(text=title)
+        elif loaded >= total:
+            frame.configure(text=f"{title}（共{total}行）")
+        else:
+            frame.configure(text=f"{title}（共{total}行，已显示{loaded}行）")
@@ -0,0 +1,132 @@
+import asyncio
+import queue
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+#界面线程检查后台任务消息的间隔（毫秒）
+POLL_INTERVAL = 100
+
+
+class Job:
+    """
+    后台任务句柄
+    任务函数通过 progress() 报告进度，通过 cancel_event 判断是否被取消
+    """
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        self.start_time = time.monotonic()
+        self.future = None
+        self._messages = queue.Queue()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """请求取消任务，异步任务会直接取消协程"""
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def progress(self, done, total):
+        """报告进度，可在任意线程中调用"""
+        self._messages.put(("progress", done, total))
+
+    def _finish(self, result, error):
+        self._messages.put(("done", result, error))
+
+
+class JobRunner:
+    """
+    后台任务执行器
+    CSV 生成等同步任务在工作线程中执行，语音合成在常驻的 asyncio 事件循环线程中执行，
+    进度和结果通过 after() 交回界面线程，回调中可以安全操作控件
+    """
+    _loop = None
+    _loop_lock = threading.Lock()
+
+    def __init__(self, widget):
+        """
+        :param widget: 用于 after() 调度的 Tk 控件
+        """
+        self.widget = widget
+
+    @classmethod
+    def event_loop(cls):
+        """获取常驻的 asyncio 事件循环，第一次使用时启动"""
+        with cls._loop_lock:
+            if cls._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="AsyncJobLoop", daemon=True)
+                thread.start()
+                cls._loop = loop
+            return cls._loop
+
+    def run_thread(self, func, on_done, on_progress=None):
+        """
+        在工作线程中执行 func(job)
+        :param on_done: 结束后在界面线程调用 on_done(result, error, cancelled)
+        :param on_progress: 在界面线程调用 on_progress(done, total, rate, eta)
+        """
+        job = Job()
+
+        def worker():
+            try:
+                result = func(job)
+            except Exception as e:
+                logger.exception("后台任务执行失败")
+                job._finish(None, e)
+                return
+            job._finish(result, None)
+
+        threading.Thread(target=worker, name="GenerateJob", daemon=True).start()
+        self._poll(job, on_done, on_progress)
+        return job
+
+    def run_async(self, coro_factory, on_done, on_progress=None):
+        """
+        在常驻事件循环中执行 coro_factory(job) 返回的协程
+        :param on_done: 结束后在界面线程调用 on_done(result, error, cancelled)
+        :param on_progress: 在界面线程调用 on_progress(done, total, rate, eta)
+        """
+        job = Job()
+        job.future = asyncio.run_coroutine_threadsafe(coro_factory(job), self.event_loop())
+
+        def finished(future):
+            if future.cancelled():
+                job._finish(None, None)
+                return
+            error = future.exception()
+            job._finish(None if error else future.result(), error)
+
+        job.future.add_done_callback(finished)
+        self._poll(job, on_done, on_progress)
+        return job
+
+    def _poll(self, job, on_done, on_progress):
+        """在界面线程中处理任务消息，只刷新最新的进度"""
+        latest = None
+        while True:
+            try:
+                message = job._messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "done":
+                if latest and on_progress:
+                    self._report(job, latest, on_progress)
+                on_done(message[1], message[2], job.cancelled)
+                return
+            latest = message
+        if latest and on_progress:
+            self._report(job, latest, on_progress)
+        self.widget.after(POLL_INTERVAL, self._poll, job, on_done, on_progress)
+
+    def _report(self, job, message, on_progress):
+        _, done, total = message
+        elapsed = time.monotonic() - job.start_time
+        rate = done / elapsed if elapsed > 0 else 0
+        eta = (total - done) / rate if rate > 0 and total else None
+        on_progress(done, total, rate, eta)
@@ -0,0 +1,90 @@
+import logging
+logger = logging.getLogger(__name__)
+
+#每页加载的行数，滚动到底部时加载下一页
+PAGE_SIZE = 500
+#每次空闲时插入的行数
+BATCH_SIZE = 100
+
+
+class PagedTable:
+    """
+    按需加载的 Treeview 预览
+    数据只保存引用，先加载第一页，滚动接近底部时再加载下一页，
+    每页在空闲时分批插入，大数据量时界面保持可操作
+    """
+    def __init__(self, tree, row_values, on_count=None, page_size=PAGE_SIZE, batch_size=BATCH_SIZE):
+        """
+        :param tree: ttk.Treeview
+        :param row_values: 将一行数据转换为 Treeview values 的函数
+        :param on_count: 行数变化回调 on_count(总行数, 已加载行数)
+        :param page_size: 每页行数
+        :param batch_size: 每批插入的行数
+        """
+        self.tree = tree
+        self.row_values = row_values
+        self.on_count = on_count
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.data = []
+        self.loaded = 0
+        self.target = 0
+        self._pending = None
+        self.tree.configure(yscrollcommand=self._on_yview)
+
+    def clear(self):
+        """一次性清空表格并停止未完成的加载"""
+        if self._pending is not None:
+            self.tree.after_cancel(self._pending)
+            self._pending = None
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.data = []
+        self.loaded = 0
+        self.target = 0
+
+    def set_data(self, data):
+        """
+        设置预览数据并加载第一页
+        Raises:
+            第一行数据无法转换时抛出 row_values 的异常，表格保持清空
+        """
+        self.clear()
+        if data:
+            self.row_values(data[0])    #提前检查数据格式
+        self.data = data
+        self._notify()
+        self.load_next_page()
+
+    def load_next_page(self):
+        """加载下一页"""
+        if self.target >= len(self.data):
+            return
+        self.target = min(len(self.data), self.target + self.page_size)
+        if self._pending is None:
+            self._insert_batch()
+
+    def _insert_batch(self):
+        self._pending = None
+        end = min(self.target, self.loaded + self.batch_size)
+        try:
+            for row in self.data[self.loaded:end]:
+                self.tree.insert('', 'end', values=self.row_values(row))
+        except Exception as e:
+            logger.error(f"表格数据加载异常：{e}")
+            self.target = self.loaded
+            return
+        self.loaded = end
+        self._notify()
+        if self.loaded < self.target:
+            self._pending = self.tree.after(1, self._insert_batch)
+
+    def _on_yview(self, first, last):
+        """滚动接近底部时加载下一页"""
+        if float(last) >= 0.9 and self.loaded >= self.target:
+            self.load_next_page()
+
+    def _notify(self):
+        if self.on_count:
+            self.on_count(len(self.data), self.loaded)
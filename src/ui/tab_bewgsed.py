@@ -4,6 +4,9 @@ from tkinter import ttk, filedialog, messagebox
 from src.ui.basic_ui import BasicUI
 from src.core.template_manager import TemplateManager
 from src.core.csv_manager import CSVManager
+from src.core.output_writers import OUTPUT_FORMATS
+from src.ui.job_runner import JobRunner
+from src.ui.paged_table import PagedTable
 
 import logging
 logger = logging.getLogger(__name__)
@@ -13,6 +16,8 @@ class TabBEWGSED(ttk.Frame, BasicUI):
         super().__init__(parent)
         self.template_manager = TemplateManager(base_dir)
         self.csv_manager = CSVManager(base_dir)
+        self.job_runner = JobRunner(self)
+        self.job = None
         self.main_ui()
 
     def main_ui(self):
@@ -54,6 +59,11 @@ class TabBEWGSED(ttk.Frame, BasicUI):
             self.template_table.heading(col, text=text)
             self.template_table.column(col, width=width, anchor="center")
         self.template_table.grid(row=1, column=0, columnspan=4, sticky='nsew', pady=(9,5))
+        self.template_pager = PagedTable(
+            self.template_table,
+            lambda item: (item.name, item.desc, item.type, item.addbyte, item.addbit),
+            on_count=lambda total, loaded: self.show_count(frame, "配置文件选择", total, loaded)
+        )
 
         # 让表格可伸缩
         frame.grid_rowconfigure(2, weight=1)
@@ -66,8 +76,7 @@ class TabBEWGSED(ttk.Frame, BasicUI):
         device = self.device_cb['var'].get()
         self.template_cb['combobox']['values'] = self.template_manager.get_templates_by_device(device, config="config_bewgsed")
         #更新参数区的内容
-        for row in self.template_table.get_children():  #清空表格
-            self.template_table.delete(row)
+        self.template_pager.clear()  #清空表格
         self.template_cb['var'].set("") #清空模板选择
 
     def on_template_selected(self,event=None):
@@ -83,14 +92,9 @@ class TabBEWGSED(ttk.Frame, BasicUI):
         """
         模板数据加载到表格中
         """
-        for row in self.template_table.get_children():
-            self.template_table.delete(row)
         try:
-            for item in self.template_data:
-                self.template_table.insert('', 'end', values=(item['name'], item['desc'], item['type'], item['addbyte'], item['addbit']))
+            self.template_pager.set_data(self.template_data)
         except Exception as e:
-            for row in self.template_table.get_children():
-                self.template_table.delete(row)
             logger.error(f"加载模板异常{e}")
             messagebox.showwarning("加载出错", f"加载模板异常{e}", icon="error")
 
@@ -108,6 +112,11 @@ class TabBEWGSED(ttk.Frame, BasicUI):
             self.csv_table.heading(col, text=text)
             self.csv_table.column(col, width=width, anchor="center")
         self.csv_table.grid(row=1, column=0, sticky='nsew', padx=5, pady=(8,5))
+        self.csv_pager = PagedTable(
+            self.csv_table,
+            lambda row: (row['设备代号'], row['设备描述'], row['拼接地址']),
+            on_count=lambda total, loaded: self.show_count(frame, "CSV 数据导入", total, loaded)
+        )
 
         frame.grid_rowconfigure(1, weight=1)
         frame.grid_columnconfigure(0, weight=1)
@@ -126,11 +135,8 @@ class TabBEWGSED(ttk.Frame, BasicUI):
         """
         选择的SCV数据加载到表格中
         """
-        for row in self.csv_table.get_children():
-            self.csv_table.delete(row)
         try:
-            for row in self.csv_data:
-                self.csv_table.insert('', 'end', values=(row['设备代号'], row['设备描述'], row['拼接地址']))
+            self.csv_pager.set_data(self.csv_data)
         except Exception as e:
             logger.error(f"导入数据异常{e}")
             messagebox.showwarning("导入出错", f"导入数据异常{e}", icon="error")
@@ -147,8 +153,35 @@ class TabBEWGSED(ttk.Frame, BasicUI):
         self.drive = self.add_combobox(frame, "驱动", row=0, col=2, listbox=self.drive_siemens, width=25)
         #self.drive["combobox"].bind('<<ComboboxSelected>>', self.on_link_selected)  # 选择完成事件   
         self.db_num = self.add_input(frame, "DB块号", row=0, col=3, inivar="3", entry_width=5)
+        self.output_format = self.add_combobox(frame, "输出格式", row=1, col=0, listbox=list(OUTPUT_FORMATS), width=8)
+        #已有点表目录，不为空时生成前做冲突检查
+        self.conflict_dir = self.add_input(frame, "已有点表", row=1, col=1, entry_width=10)
+        self.add_button(frame, "...", row=1, col=2, command=self.select_conflict_dir, width=3)
         
 
+    def select_conflict_dir(self):
+        """
+        选择冲突检查的已有点表目录，取消选择时清空（不检查）
+        """
+        self.conflict_dir["var"].set(filedialog.askdirectory())
+
+    def with_conflict_check(self, generate, check_rows):
+        """
+        填写了已有点表目录时，生成前先与已有点表做冲突检查
+        有冲突或读取失败时不输出，原因和冲突报告保存在 csv_manager.last_error 中
+        Args:
+            generate：后台任务的生成函数
+            check_rows：将生成的数据行
+        """
+        conflict_dir = self.conflict_dir["var"].get()
+        if not conflict_dir:
+            return generate
+        def checked(job):
+            if not self.csv_manager.check_conflicts_against([conflict_dir], check_rows):
+                return None
+            return generate(job)
+        return checked
+
     def on_link_selected(self, event=None):
         """
         链路选择完成事件
@@ -165,8 +198,11 @@ class TabBEWGSED(ttk.Frame, BasicUI):
     def create_generate_section(self, row, column, columnspan=1):
         frame = ttk.Frame(self)
         frame.grid(row=row, column=column, columnspan=columnspan, sticky='ew', padx=10, pady=5)
-        btn = ttk.Button(frame, text="生成点表文件", command=self.on_generate_selected)
-        btn.pack(anchor='center')
+        self.generate_btn = ttk.Button(frame, text="生成点表文件", command=self.on_generate_selected)
+        self.generate_btn.grid(row=0, column=0)
+        self.progress = self.add_progress(frame, row=0, col=1, cancel_command=self.on_cancel_selected)
+        frame.grid_columnconfigure(0, weight=1)
+        frame.grid_columnconfigure(1, weight=1)
 
     def on_generate_selected(self):
         """
@@ -182,11 +218,49 @@ class TabBEWGSED(ttk.Frame, BasicUI):
             "db_num": self.db_num["var"].get(),  #DB块号
             "device": self.device_cb["var"].get(),  #设备类型
         }
-        #执行数据处理
-        self.csv_manager.rows_bewgsed(self.template_data, inputs)
+        if self.job is not None:
+            return
+        #执行数据处理，数据行边生成边写入
+        rows = self.csv_manager.iter_rows_bewgsed(self.template_data, inputs)
+        total = len(self.template_data) * len(self.csv_data)
         #文件名称
         file_name = f"{self.device_cb["var"].get()}_{self.template_cb["var"].get()[:-5]}"
-        #输出文件
-        output_path = self.csv_manager.generate_output("output_bewgsde", file_name)
+        output_format = self.output_format["var"].get()
+        generate = self.with_conflict_check(
+            lambda job: self.csv_manager.generate_output(
+                "output_bewgsde", file_name, rows,
+                progress=lambda count: job.progress(count, total), cancel_event=job.cancel_event,
+                output_format=output_format),
+            self.csv_manager.iter_rows_bewgsed(self.template_data, inputs))
+        #输出文件，在后台线程中执行
+        self.job = self.job_runner.run_thread(
+            generate,
+            self.on_generate_done,
+            lambda *args: self.update_progress(self.progress, *args)
+        )
+        self.generate_btn.state(['disabled'])
+        self.update_progress(self.progress, 0, total, 0, None)
+        self.progress["frame"].grid()
+
+    def on_generate_done(self, output_path, error, cancelled):
+        """
+        后台生成结束事件
+        """
+        self.job = None
+        self.progress["frame"].grid_remove()
+        self.generate_btn.state(['!disabled'])
         if output_path:
             messagebox.showinfo("生成成功", output_path)
+        elif cancelled:
+            messagebox.showinfo("已取消", "已取消生成，未保存文件")
+        elif error is not None:
+            messagebox.showwarning("警告", f"生成失败：{error}")
+        elif self.csv_manager.last_error:
+            messagebox.showwarning("警告", self.csv_manager.last_error)
+
+    def on_cancel_selected(self):
+        """
+        取消生成按钮事件
+        """
+        if self.job is not None:
+            self.job.cancel()
@@ -1,10 +1,11 @@
-import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import asyncio
+import queue
 
 from src.ui.basic_ui import BasicUI
-from src.core.edgetts_manager import EdgeTTSManager
+from src.core.edgetts_manager import EdgeTTSManager, DEFAULT_VOICE
 from src.core.csv_manager import CSVManager
+from src.ui.job_runner import JobRunner
+from src.ui.paged_table import PagedTable
 
 import logging
 logger = logging.getLogger(__name__)
@@ -14,14 +15,56 @@ class TabEdgeTTS(ttk.Frame, BasicUI):
         super().__init__(parent)   
         self.csv_manager = CSVManager(base_dir)
         self.EdgeTTS = EdgeTTSManager(base_dir)
-        try:
-            asyncio.run(self.EdgeTTS.fetch_voices())
-            self.list_voices = self.EdgeTTS.list_voices()
-        except Exception as e:
-            self.list_voices = []
-            logger.error(f"获取语音列表失败: {e}")
-            messagebox.showwarning("错误", "获取语音列表失败，请检查网络连接。语音生成功能不可用！", icon="error")
+        self.job_runner = JobRunner(self)
+        self.job = None
+        #先用本地缓存的语音列表启动界面，过期或没有缓存时后台刷新
+        self.EdgeTTS.load_voice_cache()
+        self.list_voices = self.EdgeTTS.list_voices()
         self.main_ui()
+        if self.EdgeTTS.voices_expired():
+            self.start_voice_refresh()
+
+    def start_voice_refresh(self):
+        """
+        后台获取最新语音列表，结果通过队列交回界面线程
+        """
+        self.voice_queue = queue.Queue()
+        self.EdgeTTS.refresh_voices_background(lambda voices, error: self.voice_queue.put((voices, error)))
+        self.after(200, self.poll_voice_refresh)
+
+    def poll_voice_refresh(self):
+        """
+        检查后台语音列表刷新结果
+        """
+        try:
+            voices, error = self.voice_queue.get_nowait()
+        except queue.Empty:
+            self.after(200, self.poll_voice_refresh)
+            return
+        if error is not None:
+            if not self.list_voices:
+                messagebox.showwarning("错误", "获取语音列表失败，请检查网络连接。语音生成功能不可用！", icon="error")
+            return
+        self.update_voice_list()
+
+    def update_voice_list(self):
+        """
+        语音列表更新后刷新下拉框，保留当前已选择的语音
+        """
+        self.list_voices = self.EdgeTTS.list_voices()
+        self.voices_com['combobox']['values'] = self.list_voices
+        if self.voices_com['var'].get() not in self.list_voices:
+            index = self.default_voice_index()
+            self.voices_com['var'].set(self.list_voices[index] if index >= 0 else "")
+        self.on_voices_selected()
+
+    def default_voice_index(self):
+        """
+        默认语音在列表中的位置
+        """
+        if DEFAULT_VOICE in self.list_voices:
+            return self.list_voices.index(DEFAULT_VOICE)
+        return 0 if self.list_voices else -1
 
     def main_ui(self):
         """布局 Tab 页面"""
@@ -43,6 +86,11 @@ class TabEdgeTTS(ttk.Frame, BasicUI):
             self.csv_table.heading(col, text=text)
             self.csv_table.column(col, width=width, anchor="center")
         self.csv_table.grid(row=1, column=0, sticky='nsew', pady=5)
+        self.csv_pager = PagedTable(
+            self.csv_table,
+            lambda row: (row['文本'],),
+            on_count=lambda total, loaded: self.show_count(frame, "文本数据导入", total, loaded)
+        )
 
 
     def load_csv_file(self):
@@ -59,11 +107,8 @@ class TabEdgeTTS(ttk.Frame, BasicUI):
         """
         选择的SCV数据加载到表格中
         """
-        for row in self.csv_table.get_children():
-            self.csv_table.delete(row)
         try:
-            for row in self.csv_data:
-                self.csv_table.insert('', 'end', values=(row['文本']))
+            self.csv_pager.set_data(self.csv_data)
         except Exception as e:
             logger.error(f"导入数据异常{e}")
             messagebox.showwarning("导入出错", f"导入数据异常{e}", icon="error")
@@ -73,7 +118,7 @@ class TabEdgeTTS(ttk.Frame, BasicUI):
         frame = ttk.LabelFrame(self, text="语音参数", padding=10)
         frame.grid(row=row, column=column,  sticky='nsew', padx=10, pady=5)
 
-        self.voices_com = self.add_combobox(frame, "语言", row=0, col=0, listbox=self.list_voices, width=30, inivar=510)
+        self.voices_com = self.add_combobox(frame, "语言", row=0, col=0, listbox=self.list_voices, width=30, inivar=self.default_voice_index())
         self.voices_com["combobox"].bind('<<ComboboxSelected>>', self.on_voices_selected)
         #获取默认语言
         voice = self.voices_com["var"].get()
@@ -94,6 +139,7 @@ class TabEdgeTTS(ttk.Frame, BasicUI):
         self.one_btn.grid(row=4, column=0, columnspan=3, sticky='nsew', pady=5)
         self.batch_btn = ttk.Button(frame, text="批量语音生成", command=self.on_batch_generate_selected)
         self.batch_btn.grid(row=5, column=0, columnspan=3, sticky='nsew', pady=5)
+        self.progress = self.add_progress(frame, row=6, col=0, colspan=3, cancel_command=self.on_cancel_selected, length=200)
 
     def on_voices_selected(self, event=None):
         """
@@ -142,10 +188,22 @@ class TabEdgeTTS(ttk.Frame, BasicUI):
         if self.text_in['var'].get() == "":
             messagebox.showwarning("警告", "请先输入要转化为语音的文本！")
             return
-        output_path = asyncio.run(self.EdgeTTS.generate_speech(
-            text=self.text_in['var'].get(),
-            voice=self.voices_com['var'].get()
-            ))
+        if self.job is not None:
+            return
+        text = self.text_in['var'].get()
+        voice = self.voices_com['var'].get()
+        self.job = self.job_runner.run_async(
+            lambda job: self.EdgeTTS.generate_speech(text=text, voice=voice),
+            self.on_one_generate_done
+        )
+        self.set_buttons_state('disabled')
+
+    def on_one_generate_done(self, output_path, error, cancelled):
+        """
+        单条语音生成结束事件
+        """
+        self.job = None
+        self.set_buttons_state('!disabled')
         if not output_path:
             messagebox.showwarning("错误", "语音生成失败！")
         else:
@@ -158,11 +216,51 @@ class TabEdgeTTS(ttk.Frame, BasicUI):
         if  not getattr(self, 'csv_data', None):
             messagebox.showwarning("警告", "请先加载语音文本的SCV文件！")
             return
-        output_dir, count = asyncio.run(self.EdgeTTS.generate_batch(
-            text_list=[item.get("文本", "") for item in self.csv_manager.csv_data],
-            voice=self.voices_com['var'].get()
-        ))
-        if  count == 0:
+        if self.job is not None:
+            return
+        text_list = [item.get("文本", "") for item in self.csv_manager.csv_data]
+        voice = self.voices_com['var'].get()
+        #在后台事件循环中执行，界面不卡顿
+        self.job = self.job_runner.run_async(
+            lambda job: self.EdgeTTS.generate_batch(text_list=text_list, voice=voice, progress=job.progress),
+            self.on_batch_generate_done,
+            lambda *args: self.update_progress(self.progress, *args)
+        )
+        self.set_buttons_state('disabled')
+        self.update_progress(self.progress, 0, len(self.EdgeTTS.plan_batch(text_list)), 0, None)
+        self.progress["frame"].grid()
+
+    def on_batch_generate_done(self, result, error, cancelled):
+        """
+        批量语音生成结束事件
+        """
+        self.job = None
+        self.progress["frame"].grid_remove()
+        self.set_buttons_state('!disabled')
+        stats = self.EdgeTTS.cache_stats
+        failed = [text for text, status in self.EdgeTTS.batch_status.items() if status["status"] == "failed"]
+        if cancelled:
+            messagebox.showinfo("已取消", f"已取消批量语音生成，已完成{len(self.EdgeTTS.batch_status) - len(failed)}条，"
+                                        f"文件夹路径：{self.EdgeTTS.output_dir}")
+            return
+        if error is not None or not result or result[1] == 0:
             messagebox.showwarning("错误", "语音生成失败！")
-        else:
-            messagebox.showinfo("生成成功", f"生成完成：{count}条语音，文件夹路径：{output_dir}")
+            return
+        output_dir, count = result
+        messagebox.showinfo("生成成功", f"生成完成：{count}条语音（缓存命中{stats['hits']}条，"
+                                        f"新合成{stats['misses'] - len(failed)}条，失败{len(failed)}条），"
+                                        f"文件夹路径：{output_dir}")
+
+    def on_cancel_selected(self):
+        """
+        取消批量生成按钮事件
+        """
+        if self.job is not None:
+            self.job.cancel()
+
+    def set_buttons_state(self, state):
+        """
+        后台任务执行期间禁用生成按钮
+        """
+        self.one_btn.state([state])
+        self.batch_btn.state([state])
@@ -4,6 +4,9 @@ from tkinter import ttk, filedialog, messagebox
 from src.ui.basic_ui import BasicUI
 from src.core.template_manager import TemplateManager
 from src.core.csv_manager import CSVManager
+from src.core.output_writers import OUTPUT_FORMATS
+from src.ui.job_runner import JobRunner
+from src.ui.paged_table import PagedTable
 
 import logging
 logger = logging.getLogger(__name__)
@@ -13,6 +16,8 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
         super().__init__(parent)
         self.template_manager = TemplateManager(base_dir)
         self.csv_manager = CSVManager(base_dir)
+        self.job_runner = JobRunner(self)
+        self.job = None
         self.main_ui()
 
     def main_ui(self):
@@ -52,6 +57,11 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
             self.template_table.heading(col, text=text)
             self.template_table.column(col, width=width, anchor="center")
         self.template_table.grid(row=2, column=0, columnspan=2, sticky='nsew', pady=5)
+        self.template_pager = PagedTable(
+            self.template_table,
+            lambda item: (item.name, item.desc, item.type, item.access, item.address),
+            on_count=lambda total, loaded: self.show_count(frame, "配置文件", total, loaded)
+        )
 
         # 让表格可伸缩
         frame.grid_rowconfigure(2, weight=1)
@@ -65,8 +75,7 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
         self.template_cb['combobox']['values'] = self.template_manager.get_templates_by_device(device, config="config_kingscada")
         #更新参数区的内容
         if device == "SIEMENS" :
-            for row in self.template_table.get_children():  #清空表格
-                self.template_table.delete(row)
+            self.template_pager.clear()  #清空表格
             self.template_cb['var'].set("") #清空模板选择
             self.deviceseries['combobox']['values'] = self.deviceseries_siemens #更新设备系列选项
             self.channeldriver['combobox']['values'] = self.channeldriver_siemens   #更新通道驱动选项
@@ -74,8 +83,7 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
             self.channeldriver['var'].set(self.channeldriver_siemens[0])    #设置默认值
             self.db_num["frame"].grid() #显示DB块号输入框
         if device == "AB" :
-            for row in self.template_table.get_children():
-                self.template_table.delete(row)
+            self.template_pager.clear()
             self.template_cb['var'].set("")
             self.deviceseries['combobox']['values'] = self.deviceseries_ab
             self.channeldriver['combobox']['values'] = self.channeldriver_ab
@@ -96,11 +104,8 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
         """
         模板数据加载到表格中
         """
-        for row in self.template_table.get_children():
-            self.template_table.delete(row)
         try:
-            for item in self.template_data:
-                self.template_table.insert('', 'end', values=(item['name'], item['desc'], item['type'], item['access'], item['address']))
+            self.template_pager.set_data(self.template_data)
         except Exception as e:
             logger.error(f"加载模板异常{e}")
             messagebox.showwarning("加载出错", f"加载模板异常{e}", icon="error")
@@ -113,8 +118,9 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
         btn = ttk.Button(frame, text="选择CSV文件", command=self.load_csv_file)
         btn.grid(row=0, column=0, sticky='w')
 
-        btn = ttk.Button(frame, text="批量点表生成", command=self.on_generate_selected)
-        btn.grid(row=0, column=0, sticky='e')
+        self.generate_btn = ttk.Button(frame, text="批量点表生成", command=self.on_generate_selected)
+        self.generate_btn.grid(row=0, column=0, sticky='e')
+        self.progress = self.add_progress(frame, row=0, col=0, cancel_command=self.on_cancel_selected, length=80, sticky='')
 
         self.csv_table = ttk.Treeview(frame, columns=("code","desc","offset"), show="headings", height=8)
         cols = {"code": ("设备代号", 150), "desc": ("设备名称", 180), "offset": ("拼接地址", 120)}
@@ -122,6 +128,11 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
             self.csv_table.heading(col, text=text)
             self.csv_table.column(col, width=width, anchor="center")
         self.csv_table.grid(row=1, column=0, sticky='nsew', pady=5)
+        self.csv_pager = PagedTable(
+            self.csv_table,
+            lambda row: (row['设备代号'], row['设备描述'], row['拼接地址']),
+            on_count=lambda total, loaded: self.show_count(frame, "批量生成", total, loaded)
+        )
 
         frame.grid_rowconfigure(1, weight=1)
         frame.grid_columnconfigure(0, weight=1)
@@ -134,17 +145,15 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
         if not filepath:
             return
         self.csv_data = self.csv_manager.load_csv(filepath)
+        self.csv_path = filepath
         self.refresh_csv_table()
 
     def refresh_csv_table(self):
         """
         选择的SCV数据加载到表格中
         """
-        for row in self.csv_table.get_children():
-            self.csv_table.delete(row)
         try:
-            for row in self.csv_data:
-                self.csv_table.insert('', 'end', values=(row['设备代号'], row['设备描述'], row['拼接地址']))
+            self.csv_pager.set_data(self.csv_data)
         except Exception as e:
             logger.error(f"导入数据异常{e}")
             messagebox.showwarning("导入出错", f"导入数据异常{e}", icon="error")
@@ -170,14 +179,65 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
             "device": self.device_cb["var"].get(),
             "group_name_en": self.group_name_en["var"].get()
         }
-        #执行数据处理
-        self.csv_manager.rows_kingscdada(self.template_data, inputs, self.csv_data)
+        if self.job is not None:
+            return
+        total = len(self.template_data) * len(self.csv_data)
         #文件名称
         file_name = f"{self.device_cb["var"].get()}_{self.template_cb["var"].get()[:-5]}"
-        #输出文件
-        output_path = self.csv_manager.generate_output("output_kingscada", file_name)
+        incremental = self.incremental["var"].get()
+        output_format = self.output_format["var"].get()
+        if incremental == "禁用":
+            #执行数据处理，数据行边生成边写入
+            rows = self.csv_manager.iter_rows_kingscdada(self.template_data, inputs, self.csv_data)
+            generate = lambda job: self.csv_manager.generate_output(
+                "output_kingscada", file_name, rows,
+                progress=lambda count: job.progress(count, total), cancel_event=job.cancel_event,
+                output_format=output_format)
+        else:
+            #增量生成，已有变量沿用上一次的 TagID
+            template_data, csv_data, csv_path = self.template_data, self.csv_data, self.csv_path
+            generate = lambda job: self.csv_manager.generate_incremental(
+                "output_kingscada", file_name, template_data, inputs, csv_data, csv_path,
+                delta=incremental == "启用并输出增量表",
+                progress=lambda count: job.progress(count, total), cancel_event=job.cancel_event,
+                output_format=output_format)
+        #冲突检查使用按模板生成的数据行，增量生成时同样检查
+        generate = self.with_conflict_check(
+            generate, self.csv_manager.iter_rows_kingscdada(self.template_data, inputs, self.csv_data))
+        #输出文件，在后台线程中执行
+        self.job = self.job_runner.run_thread(
+            generate,
+            self.on_generate_done,
+            lambda *args: self.update_progress(self.progress, *args)
+        )
+        self.generate_btn.state(['disabled'])
+        self.one_btn.state(['disabled'])
+        self.update_progress(self.progress, 0, total, 0, None)
+        self.progress["frame"].grid()
+
+    def on_generate_done(self, output_path, error, cancelled):
+        """
+        后台生成结束事件
+        """
+        self.job = None
+        self.progress["frame"].grid_remove()
+        self.generate_btn.state(['!disabled'])
+        self.one_btn.state(['!disabled'])
         if output_path:
             messagebox.showinfo("生成成功", output_path)
+        elif cancelled:
+            messagebox.showinfo("已取消", "已取消生成，未保存文件")
+        elif error is not None:
+            messagebox.showwarning("警告", f"生成失败：{error}")
+        elif self.csv_manager.last_error:
+            messagebox.showwarning("警告", self.csv_manager.last_error)
+
+    def on_cancel_selected(self):
+        """
+        取消生成按钮事件
+        """
+        if self.job is not None:
+            self.job.cancel()
 
     # ---------------- 参数区 ----------------
     def create_input_section(self, row, column, columnspan=1):
@@ -193,6 +253,10 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
         self.link["combobox"].bind('<<ComboboxSelected>>', self.on_link_selected)
         self.link_com = self.add_input(frame, "串口号", row=1, col=1, inivar="11")
         self.link_ip = self.add_input(frame, "IP地址", row=1, col=1, inivar="192.168.10.11") 
+        self.output_format = self.add_combobox(frame, "输出格式", row=1, col=2, listbox=list(OUTPUT_FORMATS))
+        #已有点表目录，不为空时生成前做冲突检查
+        self.conflict_dir = self.add_input(frame, "已有点表", row=1, col=3, entry_width=12)
+        self.add_button(frame, "...", row=1, col=4, command=self.select_conflict_dir, width=3)
 
         self.deviceseries_siemens = ["S7-1500", "S7-1200", "S7-300(TCP)"]
         self.channeldriver_siemens = ["S71500Tcp", "S71200Tcp", "S7_TCP"]
@@ -202,6 +266,30 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
         self.deviceseries = self.add_combobox(frame, "设备系列", row=2, col=0, listbox=self.deviceseries_siemens)
         self.channeldriver = self.add_combobox(frame, "通道驱动", row=2, col=1, listbox=self.channeldriver_siemens)
         self.db_num = self.add_input(frame, "DB块号", row=2, col=2, inivar="3")
+        self.incremental = self.add_combobox(frame, "增量生成", row=2, col=3, listbox=["禁用", "启用", "启用并输出增量表"])
+
+    def select_conflict_dir(self):
+        """
+        选择冲突检查的已有点表目录，取消选择时清空（不检查）
+        """
+        self.conflict_dir["var"].set(filedialog.askdirectory())
+
+    def with_conflict_check(self, generate, check_rows):
+        """
+        填写了已有点表目录时，生成前先与已有点表做冲突检查
+        有冲突或读取失败时不输出，原因和冲突报告保存在 csv_manager.last_error 中
+        Args:
+            generate：后台任务的生成函数
+            check_rows：将生成的数据行
+        """
+        conflict_dir = self.conflict_dir["var"].get()
+        if not conflict_dir:
+            return generate
+        def checked(job):
+            if not self.csv_manager.check_conflicts_against([conflict_dir], check_rows):
+                return None
+            return generate(job)
+        return checked
 
     def on_link_selected(self, event=None):
         """
@@ -226,8 +314,8 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
 
         frame.columnconfigure(3, weight=1)
 
-        one_btn = ttk.Button(frame, text="单组点表生成", command=self.one_generate_selected)
-        one_btn.grid(row=0, column=4, sticky='e')
+        self.one_btn = ttk.Button(frame, text="单组点表生成", command=self.one_generate_selected)
+        self.one_btn.grid(row=0, column=4, sticky='e')
 
     def one_generate_selected(self):
         """
@@ -236,6 +324,8 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
         if not getattr(self, 'template_data', None) or not self.one_name["var"].get() or not self.one_desc["var"].get() or not self.one_add["var"].get():
             messagebox.showwarning("警告", "请先加载模板和输入参考数据！")
             return
+        if self.job is not None:
+            return
         inputs = {
             "start_id": self.start_id["var"].get(),
             "ip": self.link_ip["var"].get(),
@@ -258,11 +348,25 @@ class TabKingSCDAD(ttk.Frame, BasicUI):
                 "拼接地址":self.one_add["var"].get()
             }
         ]
-        #执行数据处理
-        self.csv_manager.rows_kingscdada(self.template_data, inputs, one_data)
+        total = len(self.template_data)
+        #执行数据处理，数据行边生成边写入
+        rows = self.csv_manager.iter_rows_kingscdada(self.template_data, inputs, one_data)
         #文件名称
         file_name = f"{self.device_cb["var"].get()}_{self.template_cb["var"].get()[:-5]}"
-        #输出文件
-        output_path = self.csv_manager.generate_output("output_kingscada", file_name)
-        if output_path:
-            messagebox.showinfo("生成成功", output_path)
+        output_format = self.output_format["var"].get()
+        generate = self.with_conflict_check(
+            lambda job: self.csv_manager.generate_output(
+                "output_kingscada", file_name, rows,
+                progress=lambda count: job.progress(count, total), cancel_event=job.cancel_event,
+                output_format=output_format),
+            self.csv_manager.iter_rows_kingscdada(self.template_data, inputs, one_data))
+        #输出文件，与批量生成相同在后台线程中执行，避免与进行中的任务同时使用 csv_manager
+        self.job = self.job_runner.run_thread(
+            generate,
+            self.on_generate_done,
+            lambda *args: self.update_progress(self.progress, *args)
+        )
+        self.generate_btn.state(['disabled'])
+        self.one_btn.state(['disabled'])
+        self.update_progress(self.progress, 0, total, 0, None)
+        self.progress["frame"].grid()
@@ -1,18 +1,43 @@
 import os
+import time
 import tkinter as tk
 from tkinter import ttk
 
 from src.ui.basic_ui import BasicUI
-from src.ui.tab_kingscada import TabKingSCDAD
-from src.ui.tab_bewgsed import TabBEWGSED
-from src.ui.tab_edgetts import TabEdgeTTS
 
 import logging
 logger = logging.getLogger(__name__)
 
+
+#各标签页在第一次打开时才导入和创建，导入写在函数内便于打包工具识别
+def create_kingscada_tab(parent, base_dir):
+    from src.ui.tab_kingscada import TabKingSCDAD
+    return TabKingSCDAD(parent, base_dir)
+
+def create_bewgsed_tab(parent, base_dir):
+    from src.ui.tab_bewgsed import TabBEWGSED
+    return TabBEWGSED(parent, base_dir)
+
+def create_edgetts_tab(parent, base_dir):
+    from src.ui.tab_edgetts import TabEdgeTTS
+    return TabEdgeTTS(parent, base_dir)
+
+#标签页名称和创建函数
+TAB_FACTORIES = {
+    "KingSCADA点表生成": create_kingscada_tab,
+    "北控SED上传点表生成": create_bewgsed_tab,
+    "批量文本转语音": create_edgetts_tab,
+}
+
+
 class MainUI(BasicUI):
-    def __init__(self, root, base_dir):
+    def __init__(self, root, base_dir, start_time=None):
+        """
+        :param start_time: 程序启动时的 time.perf_counter()，用于统计窗口显示耗时
+        """
         self.root = root
+        self.base_dir = base_dir
+        self.start_time = time.perf_counter() if start_time is None else start_time
         #窗口标题
         self.root.title("SCADA Tools")
         #窗口大小
@@ -31,12 +56,59 @@ class MainUI(BasicUI):
         self.tab_control = ttk.Notebook(root)
         self.tab_control.pack(expand=1, fill="both")
 
-        # Tabs
-        self.tabs = {
-            "KingSCADA点表生成": TabKingSCDAD(self.tab_control, base_dir),
-            "北控SED上传点表生成": TabBEWGSED(self.tab_control, base_dir),
-            "批量文本转语音": TabEdgeTTS(self.tab_control, base_dir)
-        }
+        # Tabs：先放入空白页，切换到该页时再创建
+        self.tabs = {name: None for name in TAB_FACTORIES}
+        self.frames = {}
+        for name in TAB_FACTORIES:
+            frame = ttk.Frame(self.tab_control)
+            self.tab_control.add(frame, text=name)
+            self.frames[str(frame)] = name
+        self.tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        #窗口显示后再创建第一个标签页
+        self.shown = False
+        self.root.bind("<Map>", self.on_window_mapped, add="+")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_window_mapped(self, event):
+        """窗口第一次显示，等界面绘制完成后再创建页面"""
+        if event.widget is not self.root or self.shown:
+            return
+        self.shown = True
+        self.root.after_idle(self.on_window_shown)
+
+    def on_window_shown(self):
+        """窗口显示后记录启动耗时并创建当前标签页"""
+        logger.info(f"启动耗时：窗口显示 {(time.perf_counter() - self.start_time) * 1000:.0f} ms")
+        self.on_tab_changed()
+        logger.info(f"启动耗时：首个页面可用 {(time.perf_counter() - self.start_time) * 1000:.0f} ms")
+
+    def on_tab_changed(self, event=None):
+        """
+        标签页切换事件，第一次打开时创建页面
+        """
+        if not self.shown:
+            return
+        selected = self.tab_control.select()
+        name = self.frames.get(selected)
+        if name is None or self.tabs[name] is not None:
+            return
+        start = time.perf_counter()
+        frame = self.tab_control.nametowidget(selected)
+        try:
+            tab = TAB_FACTORIES[name](frame, self.base_dir)
+        except Exception as e:
+            logger.exception(f"页面初始化失败：{name}")
+            ttk.Label(frame, text=f"页面初始化失败：{e}").pack(padx=10, pady=10)
+            self.tabs[name] = e
+            return
+        tab.pack(expand=1, fill="both")
+        self.tabs[name] = tab
+        logger.info(f"页面初始化：{name} {(time.perf_counter() - start) * 1000:.0f} ms")
 
-        for name, tab in self.tabs.items():
-            self.tab_control.add(tab, text=name)
+    def on_close(self):
+        """
+        关闭窗口事件，停止模板目录的后台刷新后退出
+        """
+        from src.core.template_manager import TemplateStore
+        TemplateStore.stop_all(timeout=1)
+        self.root.destroy()